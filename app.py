@@ -1,15 +1,16 @@
 # app.py
 # Final Code for the IBM Z Datathon 2025 - AquaSentry Project (with Partial Data Handling)
 
+import io
 import streamlit as st
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import accuracy_score, classification_report
-from sklearn.utils import class_weight
-import matplotlib.pyplot as plt
-import seaborn as sns
+from aquasentry_ml import analysis as ml_analysis
+from aquasentry_ml import predict as ml_predict
+from aquasentry_ml import train as ml_train
+from aquasentry_ml.artifacts import ArtifactNotFound, registry
+from aquasentry_ml.cache import prediction_cache
+from aquasentry_ml.data import load_dataset
 
 # --- 1. Page Configuration ---
 st.set_page_config(
@@ -20,32 +21,46 @@ st.set_page_config(
 )
 
 # --- 2. Caching for Performance ---
-@st.cache_data
-def load_data(file_path):
-    df = pd.read_csv(file_path)
-    df = df.dropna()
-    return df
-
-@st.cache_resource
-def train_model(df):
-    X = df.drop('Potability', axis=1)
-    y = df['Potability']
-    
-    # Calculate feature means for imputation
-    feature_means = X.mean()
-
-    classes = np.array([0, 1])
-    weights = class_weight.compute_class_weight(class_weight='balanced', classes=classes, y=y)
-    class_weights_dict = {0: weights[0], 1: weights[1]}
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-    model = RandomForestClassifier(n_estimators=100, random_state=42, class_weight=class_weights_dict)
-    model.fit(X_train, y_train)
-
-    return model, X_test, y_test, feature_means
-
-# --- 3. Load Data and Train Model ---
-df = load_data("water_quality.csv")
-model, X_test, y_test, feature_means = train_model(df)
+@st.cache_data(show_spinner=False)
+def model_analysis(version, _artifact):
+    # Chart rendered once per model version (and stored with the artifact), not on every rerun
+    return ml_analysis.model_analysis(_artifact)
+
+@st.cache_data(show_spinner=False)
+def data_analysis(file_path, source, _dataset):
+    # Keyed on the CSV's size/mtime, so an updated file is summarized again
+    return ml_analysis.data_analysis(_dataset, file_path)
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def score_batch(content, version, _artifact):
+    # Keyed on the uploaded bytes and model version, so slider reruns do not rescore the file.
+    # Each entry holds a scored copy of the upload plus its CSV, so only the last few are kept.
+    samples = pd.read_csv(io.BytesIO(content), low_memory=False)
+    X, absent = ml_predict.frame_to_matrix(samples, _artifact.features)
+    # One vectorized pass over all rows; the interactive prediction cache is left to the sidebar
+    scored = ml_predict.predict(_artifact, X)
+    results = samples.copy()
+    results['Prediction'] = np.where(scored['labels'] == 1, 'Safe', 'Unsafe')
+    results['Probability Safe'] = scored['probabilities'].round(4)
+    results['Confidence'] = scored['confidence'].round(4)
+    results['Values Filled'] = (~scored['known']).sum(axis=1)
+    results['Reasons'] = ml_predict.reason_text(scored['reasons'])
+    return results, absent, results.to_csv(index=False).encode()
+
+def load_model():
+    # The model is trained offline (python -m aquasentry_ml.train) and loaded from its
+    # artifact; the registry swaps in a newly published version without a restart
+    try:
+        return registry().current()
+    except ArtifactNotFound:
+        with st.spinner("No trained model found, training one (first run only)..."):
+            ml_train.main([])
+        return registry().current()
+
+# --- 3. Load Data and Model ---
+# Memory-mapped binary cache of the CSV (built on first use); rows with missing values are kept
+dataset = load_dataset("water_quality.csv")
+artifact = load_model()
 
 # --- 4. Sidebar for User Inputs (UPGRADED for partial data) ---
 st.sidebar.header("🎛️ Water Sample Parameters")
@@ -83,78 +98,104 @@ user_inputs_df, known_inputs = get_user_inputs()
 # --- 5. Main Page Layout ---
 st.title("💧 AquaSentry - AI Water Quality Predictor")
 st.markdown("Welcome to **AquaSentry**, your real-time solution for ensuring water safety.")
-main_tab, analysis_tab, vision_tab = st.tabs(["Prediction Tool", "Deeper Analysis", "Project Vision"])
+main_tab, batch_tab, analysis_tab, vision_tab = st.tabs(["Prediction Tool", "Batch Prediction", "Deeper Analysis", "Project Vision"])
 
 with main_tab:
     st.header("🔬 Real-Time Prediction")
     st.markdown("Use the checkboxes in the sidebar to include only the data you have, then click 'Predict'.")
 
-    st.markdown("#### Your Input Sample (unknowns will be filled with average values):")
-    # Impute missing values before displaying and predicting
-    imputed_inputs_df = user_inputs_df.fillna(feature_means)
+    st.markdown("#### Your Input Sample (unknowns are estimated from the values you provided):")
+    # Same imputation as the prediction: conditional estimates from the known parameters
+    imputed, _, reliability = ml_predict.fill_missing(artifact, user_inputs_df[artifact.features].to_numpy(dtype=float))
+    imputed_inputs_df = pd.DataFrame(imputed, columns=artifact.features)
     st.dataframe(imputed_inputs_df, use_container_width=True)
+    if reliability[0] < 1:
+        st.caption(f"With the missing parameters estimated, about {reliability[0]:.0%} of the sample's information is available; "
+                   "the confidence below is reduced accordingly.")
     
     predict_button = st.button("Predict Water Potability", type="primary")
 
     if predict_button:
         with st.spinner("Analyzing water sample..."):
-            prediction = model.predict(imputed_inputs_df)[0]
-            prediction_proba = model.predict_proba(imputed_inputs_df)
+            # One forest pass (or a cache hit for a repeated sample) gives both the label and its confidence
+            scored = ml_predict.predict(artifact, user_inputs_df[artifact.features].to_numpy(dtype=float), cache=prediction_cache)
 
-            if prediction == 1:
-                st.success(f"**✅ SAFE TO DRINK** (Confidence: {prediction_proba[0][1]:.2%})")
+            if scored['labels'][0] == 1:
+                st.success(f"**✅ SAFE TO DRINK** (Confidence: {scored['confidence'][0]:.2%})")
                 st.balloons()
             else:
-                st.error(f"**❌ UNSAFE TO DRINK** (Confidence: {prediction_proba[0][0]:.2%})")
+                st.error(f"**❌ UNSAFE TO DRINK** (Confidence: {scored['confidence'][0]:.2%})")
+                # Only data the user actually provided is checked (see aquasentry_ml.predict.REASON_RULES)
                 reasons = []
-                # Only check reasons for data the user actually provided
-                if 'ph' in known_inputs and not (6.5 <= imputed_inputs_df['ph'].iloc[0] <= 8.5):
-                    reasons.append(f"the user-provided **pH level ({imputed_inputs_df['ph'].iloc[0]:.2f})** is outside the safe range")
-                if 'Solids' in known_inputs and imputed_inputs_df['Solids'].iloc[0] > 1000:
-                    reasons.append(f"the user-provided **Total Dissolved Solids ({imputed_inputs_df['Solids'].iloc[0]:,.0f} ppm)** are too high")
-                if 'Sulfate' in known_inputs and imputed_inputs_df['Sulfate'].iloc[0] > 250:
-                    reasons.append(f"the user-provided **Sulfate level ({imputed_inputs_df['Sulfate'].iloc[0]:.2f} mg/L)** is too high")
-                if 'Turbidity' in known_inputs and imputed_inputs_df['Turbidity'].iloc[0] > 5:
-                    reasons.append(f"the user-provided **Turbidity ({imputed_inputs_df['Turbidity'].iloc[0]:.2f} NTU)** is too high")
-                
+                for j in scored['reasons'][0].nonzero()[0]:
+                    feature = ml_predict.REASON_RULES[j][0]
+                    label, problem = ml_predict.format_reason(j, user_inputs_df[feature].iloc[0])
+                    reasons.append(f"the user-provided **{label}** {problem}")
+
                 if reasons:
                     st.warning(f"**Primary Reason:** The water is likely unsafe because {reasons[0]}.")
                 else:
                     st.warning("**Reason:** Based on the provided data, a combination of factors indicates the water is unsafe.")
 
+with batch_tab:
+    st.header("📁 Batch Prediction")
+    st.markdown("Upload a CSV with one water sample per row. Columns are matched by name "
+                f"({', '.join(artifact.features)}); blank or missing values are estimated from the other values.")
+    uploaded = st.file_uploader("Water samples (CSV)", type="csv")
+
+    if uploaded is not None:
+        try:
+            with st.spinner("Scoring samples..."):
+                results, absent, results_csv = score_batch(uploaded.getvalue(), artifact.version, artifact)
+        except (pd.errors.ParserError, pd.errors.EmptyDataError, UnicodeDecodeError) as e:
+            st.error(f"Could not read the CSV: {e}")
+        else:
+            if len(absent) == len(artifact.features):
+                st.error("None of the expected columns were found in the file.")
+            else:
+                if absent:
+                    st.warning(f"Columns not found, estimated from the other values: {', '.join(absent)}")
+                safe_count = int((results['Prediction'] == 'Safe').sum())
+                col1, col2, col3 = st.columns(3)
+                col1.metric("Samples", f"{len(results):,}")
+                col2.metric("Safe to Drink", f"{safe_count:,}")
+                col3.metric("Unsafe to Drink", f"{len(results) - safe_count:,}")
+
+                # Rendering a huge table in the browser is slow; the download has every row
+                preview_rows = 1000
+                st.dataframe(results.head(preview_rows), use_container_width=True)
+                if len(results) > preview_rows:
+                    st.caption(f"Showing the first {preview_rows:,} of {len(results):,} rows.")
+                st.download_button("Download Results (CSV)", results_csv,
+                                   file_name="aquasentry_predictions.csv", mime="text/csv")
+
 with analysis_tab:
     # (This section remains unchanged)
     st.header("📊 Understanding the Model")
     sub_tab1, sub_tab2, sub_tab3 = st.tabs(["Feature Importance", "Model Performance", "Data Overview"])
     
+    # Precomputed per model/data version (aquasentry_ml.analysis); reruns only display them
+    model_report = model_analysis(artifact.version, artifact)
+    data_report = data_analysis("water_quality.csv", dataset.meta['source'], dataset)
+
     with sub_tab1:
         st.markdown("#### Which factors are most important for prediction?")
-        importance = pd.Series(model.feature_importances_, index=df.drop('Potability', axis=1).columns)
-        importance_df = importance.reset_index().rename(columns={'index': 'Feature', 0: 'Importance'}).sort_values(by='Importance', ascending=False)
-        fig, ax = plt.subplots(figsize=(10, 6))
-        sns.set_style("whitegrid")
-        bar_plot = sns.barplot(x='Importance', y='Feature', data=importance_df, palette='viridis', ax=ax, orient='h')
-        for i in bar_plot.patches:
-            ax.text(i.get_width() + .005, i.get_y() + .5, str(round(i.get_width(), 4)), fontsize=10, color='gray')
-        ax.set_title("Feature Importance in Water Potability", fontsize=16)
-        st.pyplot(fig)
+        st.image(model_report['importance_png'], use_container_width=True)
 
     with sub_tab2:
         st.markdown("#### How well does our AI model perform?")
-        y_pred = model.predict(X_test)
-        accuracy = accuracy_score(y_test, y_pred)
-        st.metric(label="Model Accuracy on Test Data", value=f"{accuracy:.2%}")
+        # Measured on the held-out split when the model was trained
+        st.metric(label="Model Accuracy on Test Data", value=f"{artifact.metrics['accuracy']:.2%}")
+        cache_stats = prediction_cache.stats()
+        st.caption(f"Model version {artifact.version} · prediction cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
         st.text("Classification Report:")
-        report = classification_report(y_test, y_pred, output_dict=True)
-        st.dataframe(pd.DataFrame(report).transpose())
+        st.dataframe(pd.DataFrame(artifact.metrics['classification_report']).transpose())
 
     with sub_tab3:
         st.markdown("#### Quick Look at the Training Data")
-        st.dataframe(df.describe())
+        st.dataframe(data_report['describe'])
         st.markdown("##### Correlation Matrix")
-        fig, ax = plt.subplots(figsize=(10, 7))
-        sns.heatmap(df.corr(), annot=True, fmt=".2f", cmap='coolwarm', ax=ax)
-        st.pyplot(fig)
+        st.image(data_report['correlation_png'], use_container_width=True)
 
 with vision_tab:
     # (This section remains unchanged)
@@ -1,7 +1,9 @@
 import axios from 'axios';
 
+export const API_BASE_URL = 'http://127.0.0.1:8000/api/';
+
 const api = axios.create({
-    baseURL: 'http://127.0.0.1:8000/api/',
+    baseURL: API_BASE_URL,
     headers: {
         'Content-Type': 'application/json',
     },
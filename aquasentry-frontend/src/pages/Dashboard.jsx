@@ -1,6 +1,7 @@
 import React from 'react';
 import { ShieldCheck, AlertOctagon, Activity, Users } from 'lucide-react';
 import { Link } from 'react-router-dom';
+import { API_BASE_URL } from '../api';
 
 const Dashboard = () => {
     const [stats, setStats] = React.useState({
@@ -9,25 +10,18 @@ const Dashboard = () => {
         statusColor: 'text-slate-400',
         satelliteAlerts: 0,
         sensorAnomalies: 0,
-        healthReports: 0
+        healthReports: 0,
+        outbreakClusters: 0
     });
 
     React.useEffect(() => {
-        const fetchStats = async () => {
-            try {
-                // In a real app, this would be a dedicated endpoint
-                // For now, we simulate fetching aggregated stats or use a new endpoint if available
-                // Let's assume we added 'dashboard-stats/' endpoint
-                const res = await import('../api').then(module => module.default.get('dashboard-stats/'));
-                setStats(res.data);
-            } catch (err) {
-                console.error("Failed to load dashboard stats", err);
-            }
-        };
-        
-        fetchStats();
-        const interval = setInterval(fetchStats, 5000); // Live update
-        return () => clearInterval(interval);
+        // Status changes are pushed by the backend as they happen
+        const source = new EventSource(`${API_BASE_URL}stream/sensors/`);
+        source.addEventListener('dashboard', (event) => {
+            setStats(JSON.parse(event.data));
+        });
+        source.onerror = (err) => console.error("Failed to load dashboard stats", err);
+        return () => source.close();
     }, []);
 
     return (
@@ -94,6 +88,9 @@ const Dashboard = () => {
                     <h3 className="text-xl font-bold text-white mb-1 group-hover:text-blue-400 transition-colors">Population Health</h3>
                     <p className="text-sm text-slate-400 mb-4">Symptom reporting & analysis.</p>
                     <div className="text-2xl font-bold text-white">{stats.healthReports} <span className="text-sm font-normal text-slate-500">Total Reports</span></div>
+                    {stats.outbreakClusters > 0 && (
+                        <div className="text-sm font-bold text-red-400 mt-1">{stats.outbreakClusters} Outbreak Cluster{stats.outbreakClusters > 1 ? 's' : ''} Detected</div>
+                    )}
                 </Link>
             </div>
         </div>
@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from 'react';
-import api from '../api';
+import api, { API_BASE_URL } from '../api';
 import { LineChart, Line, XAxis, YAxis, CartesianGrid, Tooltip, ResponsiveContainer } from 'recharts';
 import { Activity, Clock } from 'lucide-react';
 
@@ -7,18 +7,38 @@ const IoTSensors = () => {
     const [sensors, setSensors] = useState([]);
 
     useEffect(() => {
-        const fetchData = async () => {
+        let source = null;
+        let cancelled = false;
+
+        const connect = async () => {
+            let lastId = null;
             try {
-                const res = await api.get('sensors/');
-                setSensors(res.data);
+                // Seed the view with the newest page, then follow the live stream from there
+                const res = await api.get('sensors/', { params: { page_size: 20 } });
+                setSensors(res.data.results);
+                if (res.data.results.length > 0) {
+                    lastId = Math.max(...res.data.results.map(r => r.id));
+                }
             } catch (err) {
                 console.error("Error fetching sensor data", err);
             }
+            if (cancelled) return;
+
+            // EventSource reconnects on its own and resumes with Last-Event-ID
+            const url = lastId !== null ? `${API_BASE_URL}stream/sensors/?last_id=${lastId}` : `${API_BASE_URL}stream/sensors/`;
+            source = new EventSource(url);
+            source.addEventListener('reading', (event) => {
+                const reading = JSON.parse(event.data);
+                setSensors(prev => [reading, ...prev].slice(0, 20));
+            });
+            source.onerror = (err) => console.error("Sensor stream interrupted", err);
         };
 
-        fetchData();
-        const interval = setInterval(fetchData, 5000); // Poll every 5 seconds
-        return () => clearInterval(interval);
+        connect();
+        return () => {
+            cancelled = true;
+            if (source) source.close();
+        };
     }, []);
 
     const recentData = sensors.slice(0, 20).reverse(); // Show last 20 readings
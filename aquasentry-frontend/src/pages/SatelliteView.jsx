@@ -9,7 +9,7 @@ const SatelliteView = () => {
     const fetchImages = async () => {
         try {
             const res = await api.get('satellite/');
-            setImages(res.data);
+            setImages(res.data.results);
         } catch (err) {
             console.error("Error fetching images", err);
         }
@@ -19,6 +19,18 @@ const SatelliteView = () => {
         fetchImages();
     }, []);
 
+    // Analysis runs on the backend worker; poll the job until it settles
+    const waitForJob = async (job) => {
+        while (job.status === 'queued' || job.status === 'running') {
+            await new Promise(resolve => setTimeout(resolve, 1000));
+            job = (await api.get(`jobs/${job.id}/`)).data;
+        }
+        if (job.status === 'failed') {
+            throw new Error(job.last_error);
+        }
+        return job;
+    };
+
     const handleUpload = async (e) => {
         const file = e.target.files[0];
         if (!file) return;
@@ -29,10 +41,12 @@ const SatelliteView = () => {
 
         setUploading(true);
         try {
-            await api.post('satellite/', formData, {
+            const res = await api.post('satellite/', formData, {
                 headers: { 'Content-Type': 'multipart/form-data' }
             });
             fetchImages();
+            await waitForJob(res.data);
+            fetchImages();
         } catch (err) {
             console.error("Upload failed", err);
             alert("Upload failed");
@@ -78,7 +92,8 @@ const SatelliteView = () => {
                             
                             setUploading(true);
                             try {
-                                await api.post('satellite/fetch_live/', { location_name: name, lat, lon });
+                                const res = await api.post('satellite/fetch_live/', { location_name: name, lat, lon });
+                                await waitForJob(res.data);
                                 fetchImages();
                             } catch (err) {
                                 alert("Fetch failed. Ensure Sentinel API Keys are set in backend.");
@@ -146,13 +161,13 @@ const SatelliteView = () => {
                                 <div className="bg-slate-800 p-2 rounded">
                                     <span className="block text-slate-500 text-xs">Chlorophyll</span>
                                     <span className={`font-mono font-bold ${img.chlorophyll_index > 30 ? 'text-yellow-400' : 'text-white'}`}>
-                                        {img.chlorophyll_index}%
+                                        {img.chlorophyll_index ?? "…"}%
                                     </span>
                                 </div>
                                 <div className="bg-slate-800 p-2 rounded">
                                     <span className="block text-slate-500 text-xs">Turbidity</span>
                                     <span className={`font-mono font-bold ${img.turbidity_index > 30 ? 'text-orange-400' : 'text-white'}`}>
-                                        {img.turbidity_index}%
+                                        {img.turbidity_index ?? "…"}%
                                     </span>
                                 </div>
                             </div>
@@ -166,7 +181,7 @@ const SatelliteView = () => {
                                             style={{ width: `${img.risk_score}%` }}
                                         />
                                     </div>
-                                    <span className="text-xs font-bold text-white">{img.risk_score}</span>
+                                    <span className="text-xs font-bold text-white">{img.risk_score ?? "Analyzing…"}</span>
                                 </div>
                             </div>
                         </div>
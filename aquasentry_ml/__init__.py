@@ -0,0 +1,12 @@
+"""
+Water potability model shared by the Streamlit app (app.py) and the Django backend.
+
+Train and publish a model with `python -m aquasentry_ml.train`; load the current
+one with `aquasentry_ml.artifacts.registry().current()`.
+"""
+
+FEATURES = [
+    'ph', 'Hardness', 'Solids', 'Chloramines', 'Sulfate',
+    'Conductivity', 'Organic_carbon', 'Trihalomethanes', 'Turbidity',
+]
+TARGET = 'Potability'
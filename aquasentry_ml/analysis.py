@@ -0,0 +1,180 @@
+"""
+Precomputed content for the app's analysis tab.
+
+Everything is computed once per model version (feature importance chart) or per
+data version (describe table, correlation matrix and heatmap) and stored next to
+what it describes: <artifact>/analysis/ and <csv>.cache/analysis/. Later calls,
+in this process or any other, only read the files.
+
+The data statistics are streamed block by block over the memory-mapped rows, so
+memory does not grow with the CSV: counts, means, standard deviations, extremes
+and pairwise-complete correlations are exact; the quartiles come from a seeded
+sample of at most QUANTILE_SAMPLE_ROWS rows (exact for smaller datasets).
+"""
+import io
+import json
+import os
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import seaborn as sns
+from matplotlib.figure import Figure
+
+from . import FEATURES, TARGET
+from .data import cache_dir
+
+ANALYSIS_FORMAT = 2
+ANALYSIS_DIR = 'analysis'
+BLOCK_ROWS = 1_000_000
+QUANTILE_SAMPLE_ROWS = 1_000_000
+
+def _render_png(fig):
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', bbox_inches='tight')
+    return buffer.getvalue()
+
+def _write(directory, files, meta):
+    """
+    Writes the files, then meta.json last: a directory without a matching
+    meta.json is treated as missing and recomputed.
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    (directory / 'meta.json').unlink(missing_ok=True)
+    for name, content in files.items():
+        staging = directory / f".{name}.tmp"
+        staging.write_bytes(content)
+        os.replace(staging, directory / name)
+    staging = directory / '.meta.json.tmp'
+    staging.write_text(json.dumps(meta, indent=2))
+    os.replace(staging, directory / 'meta.json')
+
+def _read_meta(directory, **expected):
+    try:
+        meta = json.loads((directory / 'meta.json').read_text())
+    except (FileNotFoundError, ValueError):
+        return None
+    if meta.get('format') != ANALYSIS_FORMAT or any(meta.get(k) != v for k, v in expected.items()):
+        return None
+    return meta
+
+def importance_figure(importance):
+    """
+    Horizontal bar chart of feature importances, most important first.
+    """
+    importance_df = (pd.Series(importance).rename_axis('Feature').reset_index(name='Importance')
+                     .sort_values(by='Importance', ascending=False))
+    # Figure (not pyplot): no global figure registry, safe from any thread
+    fig = Figure(figsize=(10, 6))
+    with sns.axes_style("whitegrid"):
+        ax = fig.subplots()
+    bar_plot = sns.barplot(x='Importance', y='Feature', hue='Feature', data=importance_df, palette='viridis', ax=ax, orient='h', legend=False)
+    for i in bar_plot.patches:
+        ax.text(i.get_width() + .005, i.get_y() + .5, str(round(i.get_width(), 4)), fontsize=10, color='gray')
+    ax.set_title("Feature Importance in Water Potability", fontsize=16)
+    return fig
+
+def correlation_figure(corr):
+    fig = Figure(figsize=(10, 7))
+    ax = fig.subplots()
+    sns.heatmap(corr, annot=True, fmt=".2f", cmap='coolwarm', ax=ax)
+    return fig
+
+def model_analysis(artifact):
+    """
+    Feature importances (from the training metrics) and their chart as PNG bytes,
+    for one artifact version.
+    """
+    directory = Path(artifact.path) / ANALYSIS_DIR
+    meta = _read_meta(directory, version=artifact.version)
+    if meta is None:
+        importance = artifact.metrics.get('feature_importances')
+        if importance is None:
+            importance = dict(zip(artifact.features, (float(v) for v in artifact.model.feature_importances_)))
+        meta = {'format': ANALYSIS_FORMAT, 'version': artifact.version, 'feature_importances': importance}
+        _write(directory, {'feature_importance.png': _render_png(importance_figure(importance))}, meta)
+    return {
+        'feature_importances': meta['feature_importances'],
+        'importance_png': (directory / 'feature_importance.png').read_bytes(),
+    }
+
+def _block(dataset, rows):
+    # Features and label side by side as float64, in FEATURES + [TARGET] order
+    return np.column_stack([np.asarray(dataset.X[rows], dtype=float), np.asarray(dataset.y[rows], dtype=float)])
+
+def describe_and_corr(dataset, block_rows=BLOCK_ROWS, sample_rows=QUANTILE_SAMPLE_ROWS, seed=0):
+    """
+    DataFrame.describe() and DataFrame.corr() of dataset.frame(), without building
+    the frame. Returns (describe, corr, rows used for the quartiles).
+    """
+    columns = FEATURES + [TARGET]
+    d = len(columns)
+    first = _block(dataset, slice(0, min(block_rows, len(dataset))))
+    # Sums are taken around a per-column shift, so float64 does not lose precision
+    shift = np.nan_to_num(np.nanmean(first, axis=0)) if len(first) else np.zeros(d)
+    pairs = np.zeros((d, d))
+    sums = np.zeros((d, d))
+    squares = np.zeros((d, d))
+    products = np.zeros((d, d))
+    low = np.full(d, np.inf)
+    high = np.full(d, -np.inf)
+    for start in range(0, len(dataset), block_rows):
+        values = first if start == 0 else _block(dataset, slice(start, start + block_rows))
+        known = ~np.isnan(values)
+        Z = np.where(known, values - shift, 0.0)
+        K = known.astype(float)
+        # [i, j] entries cover the rows where both column i and column j are known
+        pairs += K.T @ K
+        sums += Z.T @ K
+        squares += (Z * Z).T @ K
+        products += Z.T @ Z
+        low = np.fmin(low, np.where(known, values, np.inf).min(axis=0))
+        high = np.fmax(high, np.where(known, values, -np.inf).max(axis=0))
+
+    count = np.diag(pairs)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = shift + np.diag(sums) / count
+        std = np.sqrt(np.maximum(np.diag(squares) - np.diag(sums) ** 2 / count, 0) / (count - 1))
+        covariance = products - sums * sums.T / pairs
+        spread = np.sqrt(np.maximum(squares - sums ** 2 / pairs, 0) * np.maximum(squares.T - sums.T ** 2 / pairs, 0))
+        corr = np.clip(covariance / spread, -1, 1)
+    np.fill_diagonal(corr, np.where(np.diag(spread) > 0, 1.0, np.nan))
+
+    rows = np.arange(len(dataset))
+    if len(dataset) > sample_rows:
+        rows = np.sort(np.random.default_rng(seed).choice(len(dataset), sample_rows, replace=False))
+    sample = np.concatenate([_block(dataset, rows[i:i + block_rows]) for i in range(0, len(rows), block_rows)]) if len(rows) else np.empty((0, d))
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # all-NaN columns
+        quartiles = np.nanpercentile(sample, [25, 50, 75], axis=0) if len(sample) else np.full((3, d), np.nan)
+
+    missing = count == 0
+    describe = pd.DataFrame(
+        [count, mean, std, np.where(missing, np.nan, low), *quartiles, np.where(missing, np.nan, high)],
+        index=['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max'], columns=columns,
+    )
+    return describe, pd.DataFrame(corr, index=columns, columns=columns), len(rows)
+
+def data_analysis(dataset, csv_path):
+    """
+    describe() and corr() of the dataset (features and label) and the correlation
+    heatmap as PNG bytes, for one version of the CSV (see describe_and_corr).
+    """
+    directory = cache_dir(csv_path) / ANALYSIS_DIR
+    meta = _read_meta(directory, source=dataset.meta['source'])
+    if meta is None:
+        describe, corr, sample_rows = describe_and_corr(dataset)
+        meta = {
+            'format': ANALYSIS_FORMAT,
+            'source': dataset.meta['source'],
+            'quantile_sample_rows': sample_rows,
+            'describe': json.loads(describe.to_json(orient='split')),
+            'corr': json.loads(corr.to_json(orient='split')),
+        }
+        _write(directory, {'correlation.png': _render_png(correlation_figure(corr))}, meta)
+    return {
+        'describe': pd.DataFrame(**meta['describe']),
+        'corr': pd.DataFrame(**meta['corr']),
+        'correlation_png': (directory / 'correlation.png').read_bytes(),
+    }
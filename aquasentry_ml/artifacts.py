@@ -0,0 +1,168 @@
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import joblib
+import pandas as pd
+
+from .compiled import compile_model
+from .imputation import ConditionalImputer
+
+ARTIFACT_FORMAT = 1
+DEFAULT_ARTIFACT_DIR = Path(__file__).resolve().parent.parent / 'models' / 'potability'
+LATEST_FILE = 'LATEST'
+MODEL_FILE = 'model.joblib'
+META_FILE = 'meta.json'
+
+class ArtifactNotFound(Exception):
+    pass
+
+class Artifact:
+    """
+    One published model version: the fitted estimator plus what was recorded
+    alongside it at training time (feature order and means, test split metrics,
+    imputation statistics). Tree ensembles are also compiled to flat arrays for
+    fast inference.
+    """
+    def __init__(self, path, model, meta):
+        self.path = path
+        self.model = model
+        self.meta = meta
+        self.version = meta['version']
+        self.features = meta['features']
+        self.feature_means = meta['feature_means']
+        self.metrics = meta['metrics']
+        self.compiled = compile_model(model)
+        # Artifacts trained before conditional imputation fall back to the means
+        self.imputer = ConditionalImputer.from_meta(meta['imputation']) if meta.get('imputation') else None
+
+    def predict_proba(self, X):
+        """
+        Class probabilities for a float matrix in self.features order. Uses the
+        compiled forest when the model is a tree ensemble (identical output).
+        """
+        if self.compiled is not None:
+            return self.compiled.predict_proba(X)
+        return self.model.predict_proba(pd.DataFrame(X, columns=self.features))
+
+    def __repr__(self):
+        return f"<Artifact {self.version}>"
+
+def save_artifact(model, feature_means, metrics, directory=None, extra=None, keep=5):
+    """
+    Publishes a new version under directory/<version>/ and points LATEST at it.
+    The version directory is complete before LATEST changes, so readers never see
+    a half-written artifact. Only the newest `keep` versions are kept on disk.
+    Returns the version string.
+    """
+    directory = Path(directory or DEFAULT_ARTIFACT_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    version = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    suffix = 1
+    while (directory / version).exists():
+        suffix += 1
+        version = f"{version.split('-')[0]}-{suffix}"
+
+    meta = {
+        'format': ARTIFACT_FORMAT,
+        'version': version,
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'features': list(feature_means.keys()),
+        'feature_means': {name: float(value) for name, value in feature_means.items()},
+        'metrics': metrics,
+        **(extra or {}),
+    }
+
+    staging = directory / f".{version}.tmp"
+    staging.mkdir()
+    # Uncompressed so load_artifact can memory-map the tree arrays
+    joblib.dump(model, staging / MODEL_FILE)
+    with open(staging / META_FILE, 'w') as f:
+        json.dump(meta, f, indent=2)
+    staging.rename(directory / version)
+
+    pointer = directory / f".{LATEST_FILE}.tmp"
+    pointer.write_text(version)
+    os.replace(pointer, directory / LATEST_FILE)
+
+    if keep:
+        for old in list_versions(directory)[:-keep]:
+            shutil.rmtree(directory / old, ignore_errors=True)
+    return version
+
+def list_versions(directory=None):
+    directory = Path(directory or DEFAULT_ARTIFACT_DIR)
+    if not directory.is_dir():
+        return []
+    return sorted(p.name for p in directory.iterdir() if p.is_dir() and not p.name.startswith('.'))
+
+def latest_version(directory=None):
+    try:
+        return (Path(directory or DEFAULT_ARTIFACT_DIR) / LATEST_FILE).read_text().strip() or None
+    except FileNotFoundError:
+        return None
+
+def load_artifact(version=None, directory=None):
+    """
+    Loads a version (default: LATEST). Plain numpy arrays in the pickle are
+    memory-mapped read-only; scikit-learn trees copy their nodes on unpickling.
+    """
+    directory = Path(directory or DEFAULT_ARTIFACT_DIR)
+    version = version or latest_version(directory)
+    if not version:
+        raise ArtifactNotFound(f"No model artifact in {directory}. Run `python -m aquasentry_ml.train` first.")
+    path = directory / version
+    try:
+        with open(path / META_FILE) as f:
+            meta = json.load(f)
+        model = joblib.load(path / MODEL_FILE, mmap_mode='r')
+    except FileNotFoundError as e:
+        raise ArtifactNotFound(f"Model artifact {version} is incomplete: {e}")
+    return Artifact(path, model, meta)
+
+class ModelRegistry:
+    """
+    Process-wide holder of the current artifact. Loads lazily on first use and
+    re-reads the LATEST pointer at most every check_interval seconds, so a newly
+    trained version is picked up without restarting the process.
+    """
+    def __init__(self, directory=None, check_interval=2.0):
+        self.directory = Path(directory or DEFAULT_ARTIFACT_DIR)
+        self.check_interval = check_interval
+        self._artifact = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def current(self):
+        artifact = self._artifact
+        if artifact is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return artifact
+        with self._lock:
+            if self._artifact is None or time.monotonic() - self._checked_at >= self.check_interval:
+                version = latest_version(self.directory)
+                if self._artifact is None or (version and version != self._artifact.version):
+                    self._artifact = load_artifact(version, self.directory)
+                self._checked_at = time.monotonic()
+            return self._artifact
+
+    @property
+    def version(self):
+        return self.current().version
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+def registry(directory=None, check_interval=2.0):
+    """
+    Shared ModelRegistry for a directory (default: models/potability at the repo root).
+    """
+    directory = Path(directory or DEFAULT_ARTIFACT_DIR).resolve()
+    with _registries_lock:
+        if directory not in _registries:
+            _registries[directory] = ModelRegistry(directory, check_interval)
+        return _registries[directory]
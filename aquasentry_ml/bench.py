@@ -0,0 +1,52 @@
+"""
+Microbenchmark: scikit-learn predict_proba vs. the compiled forest.
+
+    python -m aquasentry_ml.bench [--sizes 1 100 100000] [--repeat 20]
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from .artifacts import registry
+
+def _time(fn, repeat):
+    # Best of `repeat` runs, in seconds
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 100, 100_000])
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--artifacts', default=None, help='Artifact directory (default: models/potability)')
+    args = parser.parse_args(argv)
+
+    artifact = registry(args.artifacts).current()
+    if artifact.compiled is None:
+        raise SystemExit(f"Model {type(artifact.model).__name__} is not a tree ensemble; nothing to compare")
+    rng = np.random.default_rng(0)
+    means = np.array([artifact.feature_means[name] for name in artifact.features])
+
+    print(f"Model {artifact.version}: {artifact.compiled.n_estimators} trees, "
+          f"{len(artifact.compiled.feature):,} nodes, depth {artifact.compiled.depth}")
+    print(f"{'batch':>8} {'sklearn ms':>12} {'compiled ms':>12} {'speedup':>8} {'rows/s':>12}  identical")
+    for size in args.sizes:
+        X = means * rng.lognormal(0, 0.3, (size, len(means)))
+        frame = pd.DataFrame(X, columns=artifact.features)
+        repeat = max(1, args.repeat if size < 10_000 else args.repeat // 10)
+
+        reference = artifact.model.predict_proba(frame)
+        identical = np.array_equal(reference, artifact.compiled.predict_proba(X))
+        sklearn_s = _time(lambda: artifact.model.predict_proba(frame), repeat)
+        compiled_s = _time(lambda: artifact.compiled.predict_proba(X), repeat)
+        print(f"{size:>8} {sklearn_s * 1000:>12.3f} {compiled_s * 1000:>12.3f} "
+              f"{sklearn_s / compiled_s:>7.1f}x {size / compiled_s:>12,.0f}  {'yes' if identical else 'NO'}")
+
+if __name__ == '__main__':
+    main()
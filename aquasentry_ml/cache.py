@@ -0,0 +1,95 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Quantization step per feature, about a tenth of the Streamlit slider steps.
+# Samples that agree to this precision share a cache entry.
+QUANTUM = {
+    'ph': 0.01,
+    'Hardness': 0.1,
+    'Solids': 1.0,
+    'Chloramines': 0.01,
+    'Sulfate': 0.1,
+    'Conductivity': 0.1,
+    'Organic_carbon': 0.01,
+    'Trihalomethanes': 0.1,
+    'Turbidity': 0.001,
+}
+
+DEFAULT_MAX_ENTRIES = 10000
+
+class PredictionCache:
+    """
+    Bounded LRU of model probabilities keyed on the quantized, imputed feature
+    vector. Entries belong to one model version: the first lookup against a
+    different version empties the cache, so a newly published artifact never
+    serves stale results.
+    """
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def quantize(X, features):
+        quantum = np.array([QUANTUM.get(name, 1e-6) for name in features])
+        return np.round(X / quantum) * quantum
+
+    def predict_proba(self, artifact, X):
+        """
+        Probabilities for imputed rows X (artifact.features order). Rows are scored
+        at their quantized values, so a hit and a miss give the same answer; all
+        misses go to the model in one call.
+        """
+        X = self.quantize(np.asarray(X, dtype=float), artifact.features)
+        keys = [row.tobytes() for row in X]
+        proba = np.empty((len(X), len(artifact.model.classes_)))
+        missing = []
+        with self._lock:
+            if self._version != artifact.version:
+                self._entries.clear()
+                self._version = artifact.version
+            for i, key in enumerate(keys):
+                cached = self._entries.get(key)
+                if cached is None:
+                    missing.append(i)
+                else:
+                    self._entries.move_to_end(key)
+                    proba[i] = cached
+            self.hits += len(X) - len(missing)
+            self.misses += len(missing)
+
+        if missing:
+            computed = artifact.predict_proba(X[missing])
+            proba[missing] = computed
+            with self._lock:
+                if self._version == artifact.version:
+                    for i, row in zip(missing, computed):
+                        self._entries[keys[i]] = row
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+        return proba
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'model_version': self._version,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+            }
+
+# Shared by every caller in this process (Streamlit sessions, API requests)
+prediction_cache = PredictionCache()
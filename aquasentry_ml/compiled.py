@@ -0,0 +1,115 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier
+
+# Batches up to this size are walked level by level over the flat arrays. Larger
+# ones call each tree's compiled predict() directly, which is faster once per-call
+# overhead no longer dominates (see `python -m aquasentry_ml.bench`).
+FLAT_MAX_BATCH = 1
+
+# Rows per work unit for large batches; chunks run on threads (tree traversal releases the GIL)
+CHUNK_SIZE = 8192
+
+class CompiledForest:
+    """
+    A fitted RandomForest (or ExtraTrees) classifier flattened into one set of
+    NumPy node arrays for all trees: feature, threshold, right child, missing-value
+    direction and leaf class fractions (left children are always node + 1).
+
+    predict_proba skips scikit-learn's per-call input validation and joblib
+    dispatch, and reproduces RandomForestClassifier.predict_proba exactly: inputs
+    are compared as float32 like sklearn's trees, NaNs follow each node's
+    missing-value direction, and tree outputs are summed in estimator order
+    before dividing.
+    """
+    def __init__(self, forest):
+        if forest.n_outputs_ != 1:
+            raise ValueError("Only single-output forests can be compiled")
+        self._trees = [estimator.tree_ for estimator in forest.estimators_]
+        offsets = np.cumsum([0] + [tree.node_count for tree in self._trees])
+        total = offsets[-1]
+
+        self.feature = np.zeros(total, dtype=np.intp)
+        self.threshold = np.empty(total)
+        self.right = np.empty(total, dtype=np.intp)
+        self.missing_left = np.zeros(total, dtype=bool)
+        self.value = np.empty((total, forest.n_classes_))
+        for tree, offset in zip(self._trees, offsets):
+            nodes = slice(offset, offset + tree.node_count)
+            leaf = tree.children_left == -1
+            # Leaves always "go right" to themselves, so every tree can be stepped max-depth times
+            self.feature[nodes] = np.where(leaf, 0, tree.feature)
+            self.threshold[nodes] = np.where(leaf, -np.inf, tree.threshold)
+            self.right[nodes] = np.where(leaf, np.arange(offset, offset + tree.node_count), tree.children_right + offset)
+            self.missing_left[nodes] = ~leaf & tree.missing_go_to_left.astype(bool)
+            self.value[nodes] = tree.value[:, 0, :forest.n_classes_]
+
+        self.roots = offsets[:-1].astype(np.intp)
+        self.depth = max(tree.max_depth for tree in self._trees)
+        self.classes_ = np.asarray(forest.classes_)
+
+    @property
+    def n_estimators(self):
+        return len(self.roots)
+
+    def apply(self, X):
+        """
+        Flat leaf index per (tree, sample): shape (n_estimators, n_samples).
+        """
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if len(X) <= FLAT_MAX_BATCH:
+            return self._apply_flat(X)
+        return np.stack([tree.apply(X) for tree in self._trees]) + self.roots[:, None]
+
+    def _apply_flat(self, X):
+        flat = X.ravel()
+        base = np.tile(np.arange(len(X)) * X.shape[1], self.n_estimators)
+        node = np.repeat(self.roots, len(X))
+        has_nan = np.isnan(flat).any()
+        for _ in range(self.depth):
+            x = flat[base + self.feature[node]]
+            # float32 input against the float64 threshold, as in sklearn's Tree.apply
+            go_right = x > self.threshold[node]
+            if has_nan:
+                go_right = np.where(np.isnan(x), ~self.missing_left[node], go_right)
+            node = np.where(go_right, self.right[node], node + 1)
+        return node.reshape(self.n_estimators, len(X))
+
+    def _proba_chunk(self, X):
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        proba = np.zeros((len(X), len(self.classes_)))
+        # Sequential accumulation in estimator order keeps the sums bit-identical
+        if len(X) <= FLAT_MAX_BATCH:
+            for tree_leaves in self._apply_flat(X):
+                proba += self.value[tree_leaves]
+        else:
+            n_classes = len(self.classes_)
+            for tree in self._trees:
+                proba += tree.predict(X)[:, :n_classes]
+        return proba
+
+    def predict_proba(self, X):
+        X = np.asarray(X)
+        if X.ndim != 2:
+            raise ValueError("X must be a 2-D array of shape (n_samples, n_features)")
+        if len(X) <= CHUNK_SIZE:
+            proba = self._proba_chunk(X)
+        else:
+            chunks = [X[start:start + CHUNK_SIZE] for start in range(0, len(X), CHUNK_SIZE)]
+            with ThreadPoolExecutor(min(os.cpu_count() or 1, len(chunks))) as pool:
+                proba = np.concatenate(list(pool.map(self._proba_chunk, chunks)))
+        proba /= self.n_estimators
+        return proba
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1))
+
+def compile_model(model):
+    """
+    CompiledForest for a single-output RandomForest/ExtraTrees classifier, else None.
+    """
+    if isinstance(model, (RandomForestClassifier, ExtraTreesClassifier)) and model.n_outputs_ == 1:
+        return CompiledForest(model)
+    return None
@@ -0,0 +1,130 @@
+"""
+Streaming access to water-quality CSVs of any size.
+
+The CSV is parsed once, in chunks with float32 dtypes, into a binary cache next
+to it (<name>.cache/): a row-major float32 feature matrix, a uint8 label vector
+and the per-feature means, all computed in the same pass. Later loads
+memory-map the cache, so they are near-instant and only touch the pages that
+are read. Rows with missing features are kept (NaN); only rows without a label
+are dropped.
+"""
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from . import FEATURES, TARGET
+
+CACHE_FORMAT = 1
+DEFAULT_CHUNK_ROWS = 200_000
+
+def cache_dir(csv_path):
+    csv_path = Path(csv_path)
+    return csv_path.with_name(csv_path.name + '.cache')
+
+def iter_csv_chunks(csv_path, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Yields (X float32 [n, len(FEATURES)], y uint8 [n]) per chunk, NaN for missing features.
+    """
+    dtypes = {name: np.float32 for name in FEATURES + [TARGET]}
+    reader = pd.read_csv(csv_path, usecols=FEATURES + [TARGET], dtype=dtypes, chunksize=chunk_rows)
+    for chunk in reader:
+        labelled = chunk[TARGET].notna().to_numpy()
+        yield (
+            chunk[FEATURES].to_numpy(dtype=np.float32)[labelled],
+            chunk[TARGET].to_numpy()[labelled].astype(np.uint8),
+        )
+
+def _source_stamp(csv_path):
+    stat = os.stat(csv_path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+def convert(csv_path, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Streams the CSV into the binary cache. Peak memory is one chunk.
+    Returns the cache metadata.
+    """
+    directory = cache_dir(csv_path)
+    directory.mkdir(exist_ok=True)
+    # Invalidate first, so nobody maps the old metadata onto the new files
+    (directory / 'meta.json').unlink(missing_ok=True)
+    rows = 0
+    sums = np.zeros(len(FEATURES))
+    counts = np.zeros(len(FEATURES), dtype=np.int64)
+    positives = 0
+    with open(directory / 'features.f32.tmp', 'wb') as features, open(directory / 'labels.u8.tmp', 'wb') as labels:
+        for X, y in iter_csv_chunks(csv_path, chunk_rows):
+            features.write(np.ascontiguousarray(X).tobytes())
+            labels.write(y.tobytes())
+            known = ~np.isnan(X)
+            # float64 accumulators, so the means do not drift on large files
+            sums += np.where(known, X, 0).sum(axis=0, dtype=np.float64)
+            counts += known.sum(axis=0)
+            positives += int(y.sum())
+            rows += len(y)
+
+    meta = {
+        'format': CACHE_FORMAT,
+        'source': _source_stamp(csv_path),
+        'rows': rows,
+        'features': FEATURES,
+        'feature_means': {name: float(s / c) if c else None for name, s, c in zip(FEATURES, sums, counts)},
+        'missing': {name: int(rows - c) for name, c in zip(FEATURES, counts)},
+        'class_counts': {'0': rows - positives, '1': positives},
+    }
+    os.replace(directory / 'features.f32.tmp', directory / 'features.f32')
+    os.replace(directory / 'labels.u8.tmp', directory / 'labels.u8')
+    with open(directory / 'meta.json', 'w') as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+class Dataset:
+    """
+    Memory-mapped view of a converted CSV: X (float32, NaN = missing), y (uint8)
+    and the statistics gathered during conversion.
+    """
+    def __init__(self, directory, meta):
+        self.meta = meta
+        self.rows = meta['rows']
+        self.feature_means = meta['feature_means']
+        self.class_counts = {int(k): v for k, v in meta['class_counts'].items()}
+        shape = (self.rows, len(FEATURES))
+        # np.memmap cannot map an empty file
+        self.X = np.memmap(directory / 'features.f32', dtype=np.float32, mode='r', shape=shape) if self.rows else np.empty(shape, np.float32)
+        self.y = np.memmap(directory / 'labels.u8', dtype=np.uint8, mode='r', shape=(self.rows,)) if self.rows else np.empty(0, np.uint8)
+
+    def __len__(self):
+        return self.rows
+
+    def impute(self, X):
+        """
+        Copy of X (float32) with NaNs replaced by the dataset means.
+        """
+        means = np.array([self.feature_means[name] for name in FEATURES], dtype=np.float32)
+        return np.where(np.isnan(X), means, X).astype(np.float32)
+
+    def frame(self):
+        """
+        The full dataset as a DataFrame (float32 features, int label).
+        """
+        df = pd.DataFrame(np.asarray(self.X), columns=FEATURES)
+        df[TARGET] = np.asarray(self.y).astype(np.int64)
+        return df
+
+def load_dataset(csv_path, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Dataset for a CSV, converting it first if there is no cache or the CSV changed.
+    """
+    directory = cache_dir(csv_path)
+    try:
+        with open(directory / 'meta.json') as f:
+            meta = json.load(f)
+        if meta.get('format') != CACHE_FORMAT or meta.get('source') != _source_stamp(csv_path) or meta.get('features') != FEATURES:
+            meta = None
+    except FileNotFoundError:
+        meta = None
+    if meta is None:
+        meta = convert(csv_path, chunk_rows)
+    return Dataset(directory, meta)
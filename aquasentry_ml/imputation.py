@@ -0,0 +1,117 @@
+"""
+Missing-value imputation from the features that are known.
+
+The training data is summarized by its feature means and covariance. Treating the
+features as jointly Gaussian, the best linear estimate of the missing features M
+given the known ones K is
+
+    x_M = mean_M + cov_MK cov_KK^-1 (x_K - mean_K)
+
+For 9 features there are only 2^9 = 512 known/missing masks, so the regression
+coefficients, intercepts and residual variances of every mask are computed once
+when the imputer is built. Imputing a batch is then a table lookup and a dot
+product per distinct mask.
+"""
+import numpy as np
+
+from . import FEATURES
+
+BLOCK_ROWS = 1_000_000
+
+# Eigenvalue floor, relative to the largest, when repairing the pairwise covariance
+EIGENVALUE_FLOOR = 1e-6
+
+class ConditionalImputer:
+    """
+    Per-mask linear imputation. Masks are indexed by the bit pattern of known
+    features (bit i set = feature i known).
+
+    reliability[mask] is the share of the total (standardized) feature variance
+    that is known or explained by the known features: 1 with nothing missing,
+    0 with everything missing. predict() uses it to shrink confidence.
+    """
+    def __init__(self, features, mean, cov):
+        self.features = list(features)
+        self.mean = np.asarray(mean, dtype=float)
+        # The covariance as fitted; to_meta stores this one, so loading repairs it exactly once
+        self.raw_cov = np.asarray(cov, dtype=float)
+        self.cov = _nearest_psd(self.raw_cov)
+        d = len(self.features)
+        variance = np.diag(self.cov)
+
+        self.coef = np.zeros((2 ** d, d, d))
+        self.intercept = np.zeros((2 ** d, d))
+        self.reliability = np.ones(2 ** d)
+        for mask in range(2 ** d):
+            known = (mask >> np.arange(d)) & 1 == 1
+            K, M = np.flatnonzero(known), np.flatnonzero(~known)
+            if not len(M):
+                continue
+            if len(K):
+                B = np.linalg.solve(self.cov[np.ix_(K, K)], self.cov[np.ix_(K, M)]).T
+                self.coef[mask][np.ix_(M, K)] = B
+                self.intercept[mask, M] = self.mean[M] - B @ self.mean[K]
+                residual = np.diag(self.cov[np.ix_(M, M)] - B @ self.cov[np.ix_(K, M)])
+            else:
+                self.intercept[mask, M] = self.mean[M]
+                residual = variance[M]
+            unexplained = np.clip(residual / variance[M], 0, 1) if variance[M].all() else np.ones(len(M))
+            self.reliability[mask] = 1 - unexplained.sum() / d
+
+    def impute(self, X):
+        """
+        Fills NaNs in X (self.features order). Returns (imputed copy, known mask,
+        reliability per row).
+        """
+        X = np.asarray(X, dtype=float)
+        known = ~np.isnan(X)
+        index = known @ (1 << np.arange(len(self.features)))
+        imputed = np.where(known, X, 0.0)
+        complete = 2 ** len(self.features) - 1
+        # One dot product per distinct mask; known columns get zero coefficients and intercepts
+        order = np.argsort(index, kind='stable')
+        masks, starts = np.unique(index[order], return_index=True)
+        for mask, rows in zip(masks, np.split(order, starts[1:])):
+            if mask != complete:
+                imputed[rows] += imputed[rows] @ self.coef[mask].T + self.intercept[mask]
+        return imputed, known, self.reliability[index]
+
+    def to_meta(self):
+        return {'features': self.features, 'mean': self.mean.tolist(), 'cov': self.raw_cov.tolist()}
+
+    @classmethod
+    def from_meta(cls, meta):
+        return cls(meta['features'], meta['mean'], meta['cov'])
+
+def _nearest_psd(cov):
+    # Pairwise-complete covariances need not be positive definite; clip the spectrum
+    cov = (cov + cov.T) / 2
+    values, vectors = np.linalg.eigh(cov)
+    floor = EIGENVALUE_FLOOR * values.max() if values.max() > 0 else EIGENVALUE_FLOOR
+    values = np.maximum(values, floor)
+    return (vectors * values) @ vectors.T
+
+def fit_imputer(dataset, block_rows=BLOCK_ROWS):
+    """
+    ConditionalImputer from a Dataset (aquasentry_ml.data), streamed block by block
+    over the memory-mapped rows. Each covariance entry uses the rows where both
+    features are present (pairwise-complete).
+    """
+    mean = np.array([dataset.feature_means[name] for name in FEATURES], dtype=float)
+    d = len(FEATURES)
+    pairs = np.zeros((d, d))
+    sums = np.zeros((d, d))
+    products = np.zeros((d, d))
+    for start in range(0, len(dataset), block_rows):
+        # Centered on the means first, so the float64 sums do not lose precision
+        X = np.asarray(dataset.X[start:start + block_rows], dtype=float) - mean
+        known = ~np.isnan(X)
+        Z = np.where(known, X, 0.0)
+        K = known.astype(float)
+        pairs += K.T @ K
+        sums += Z.T @ K  # sums[i, j]: feature i over rows where i and j are known
+        products += Z.T @ Z
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = (products - sums * sums.T / pairs) / (pairs - 1)
+    cov[pairs < 2] = 0.0
+    return ConditionalImputer(FEATURES, mean, cov)
@@ -0,0 +1,125 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+# Threshold rules behind the "why is it unsafe" explanation, checked only for
+# values the user actually supplied: (feature, violated(values), label format, problem)
+REASON_RULES = [
+    ('ph', lambda v: (v < 6.5) | (v > 8.5), "pH level ({:.2f})", "is outside the safe range"),
+    ('Solids', lambda v: v > 1000, "Total Dissolved Solids ({:,.0f} ppm)", "are too high"),
+    ('Sulfate', lambda v: v > 250, "Sulfate level ({:.2f} mg/L)", "is too high"),
+    ('Turbidity', lambda v: v > 5, "Turbidity ({:.2f} NTU)", "is too high"),
+]
+
+def to_matrix(samples, features):
+    """
+    Turns a list of {feature: value} dicts into a float matrix in model feature order.
+    Missing keys and None become NaN. Raises ValueError on unknown features or
+    non-numeric values.
+    """
+    index = {name: i for i, name in enumerate(features)}
+    X = np.full((len(samples), len(features)), np.nan)
+    for row, sample in enumerate(samples):
+        if not isinstance(sample, dict):
+            raise ValueError(f"Sample {row} must be an object of feature values")
+        for name, value in sample.items():
+            if name not in index:
+                raise ValueError(f"Sample {row}: unknown feature '{name}' (expected {', '.join(features)})")
+            if value is None:
+                continue
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+                raise ValueError(f"Sample {row}: {name} must be a finite number or null")
+            X[row, index[name]] = value
+    return X
+
+def frame_to_matrix(df, features):
+    """
+    Float matrix in model feature order from a DataFrame (e.g. an uploaded CSV).
+    Absent columns, blanks and non-numeric cells become NaN, to be imputed.
+    Returns (X, names of absent feature columns).
+    """
+    absent = [name for name in features if name not in df.columns]
+    X = np.full((len(df), len(features)), np.nan)
+    for i, name in enumerate(features):
+        if name not in absent:
+            X[:, i] = pd.to_numeric(df[name], errors='coerce').to_numpy(dtype=float)
+    X[~np.isfinite(X)] = np.nan
+    return X, absent
+
+def impute(X, feature_means, features):
+    """
+    Fills NaNs with the training means (what app.py does with fillna(feature_means)).
+    Returns (imputed copy, known mask).
+    """
+    known = ~np.isnan(X)
+    means = np.array([feature_means[name] for name in features])
+    return np.where(known, X, means), known
+
+def fill_missing(artifact, X):
+    """
+    Imputes with the artifact's conditional imputer (aquasentry_ml.imputation), or
+    with the training means for artifacts trained without one.
+    Returns (imputed copy, known mask, reliability per row in [0, 1]).
+    """
+    if artifact.imputer is not None:
+        return artifact.imputer.impute(X)
+    imputed, known = impute(X, artifact.feature_means, artifact.features)
+    return imputed, known, np.ones(len(X))
+
+def reason_masks(X, known, features):
+    """
+    Boolean matrix (rows x REASON_RULES): rule violated by a supplied value.
+    """
+    masks = np.zeros((len(X), len(REASON_RULES)), dtype=bool)
+    for j, (name, violated, _, _) in enumerate(REASON_RULES):
+        col = features.index(name)
+        with np.errstate(invalid='ignore'):
+            masks[:, j] = known[:, col] & violated(X[:, col])
+    return masks
+
+def reason_text(masks, separator='; '):
+    """
+    One string per row naming its violated rules ("pH level is outside the safe range; ..."),
+    built a rule at a time over all rows. Empty for rows without a reason.
+    """
+    text = np.full(len(masks), '', dtype=object)
+    for j, (_, _, label, problem) in enumerate(REASON_RULES):
+        phrase = f"{label.split(' (')[0]} {problem}"
+        hit = masks[:, j]
+        text[hit] = np.where(text[hit] == '', phrase, text[hit] + separator + phrase)
+    return text
+
+def format_reason(rule, value):
+    """
+    (label, problem) for one violated rule, e.g. ("pH level (9.10)", "is outside the safe range").
+    """
+    _, _, label, problem = REASON_RULES[rule]
+    return label.format(value), problem
+
+def predict(artifact, X, cache=None):
+    """
+    Scores a raw feature matrix (NaN = unknown) with one vectorized forest pass.
+    With a cache (aquasentry_ml.cache.PredictionCache), only rows it has not seen
+    for this model version reach the model.
+    Returns:
+        dict: {'imputed', 'known', 'labels' (1 = safe), 'probabilities' (P(safe)),
+               'confidence' (probability of the predicted label, shrunk towards chance
+               by the share of information lost to missing features), 'reliability',
+               'reasons' (rule masks, only set for unsafe rows)}
+    """
+    imputed, known, reliability = fill_missing(artifact, X)
+    proba = artifact.predict_proba(imputed) if cache is None else cache.predict_proba(artifact, imputed)
+    # Same tie-breaking as RandomForestClassifier.predict
+    labels = artifact.model.classes_.take(np.argmax(proba, axis=1))
+    masks = reason_masks(imputed, known, artifact.features) & (labels == 0)[:, None]
+    chance = 1 / proba.shape[1]
+    return {
+        'imputed': imputed,
+        'known': known,
+        'labels': labels,
+        'probabilities': proba[:, list(artifact.model.classes_).index(1)],
+        'confidence': chance + (proba.max(axis=1) - chance) * reliability,
+        'reliability': reliability,
+        'reasons': masks,
+    }
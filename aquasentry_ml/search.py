@@ -0,0 +1,225 @@
+"""
+Hyperparameter search over model families, estimator counts and depths.
+
+    python -m aquasentry_ml.search [--strategy halving|grid] [--min-accuracy 0.65]
+
+Every candidate is fit on its own process (all cores), then timed and scored the
+way it would be served. The report (JSON) lists fit time, single-row and batch
+prediction cost, pickled size and accuracy per candidate, and the fastest
+candidate that meets --min-accuracy.
+"""
+import argparse
+import itertools
+import json
+import math
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import ExtraTreesClassifier, HistGradientBoostingClassifier, RandomForestClassifier
+from sklearn.metrics import accuracy_score
+from threadpoolctl import threadpool_limits
+
+from . import FEATURES
+from .artifacts import DEFAULT_ARTIFACT_DIR
+from .compiled import compile_model
+from .data import load_dataset
+from .imputation import ConditionalImputer, fit_imputer
+from .train import DEFAULT_CSV, _filler, test_mask
+
+FAMILIES = {
+    'random_forest': RandomForestClassifier,
+    'extra_trees': ExtraTreesClassifier,
+    'hist_gradient_boosting': HistGradientBoostingClassifier,
+}
+
+GRID = {
+    'random_forest': {'n_estimators': [50, 100, 200], 'max_depth': [None, 10, 20]},
+    'extra_trees': {'n_estimators': [50, 100, 200], 'max_depth': [None, 10, 20]},
+    'hist_gradient_boosting': {'max_iter': [100, 200], 'max_depth': [None, 6], 'learning_rate': [0.05, 0.1]},
+}
+
+VALIDATION_FRACTION = 0.2
+LATENCY_SAMPLES = 200  # single-row predictions timed per candidate
+
+def candidates(families=None):
+    for family in families or GRID:
+        grid = GRID[family]
+        for values in itertools.product(*grid.values()):
+            yield {'family': family, 'params': dict(zip(grid, values))}
+
+def _split(dataset, seed):
+    """
+    (fit rows in a seeded order, validation rows, test rows). The test rows are
+    the same ones train.py holds out; validation is carved from the rest.
+    """
+    is_test = test_mask(len(dataset), seed)
+    train_rows = np.flatnonzero(~is_test)
+    is_validation = test_mask(len(train_rows), seed + 1, VALIDATION_FRACTION)
+    fit_rows = np.random.default_rng(seed).permutation(train_rows[~is_validation])
+    return fit_rows, train_rows[is_validation], np.flatnonzero(is_test)
+
+def _build(candidate, seed):
+    estimator = FAMILIES[candidate['family']]
+    params = dict(candidate['params'], class_weight='balanced', random_state=seed)
+    if candidate['family'] != 'hist_gradient_boosting':
+        params['n_jobs'] = 1  # parallelism comes from the process pool
+    return estimator(**params)
+
+def evaluate_candidate(csv_path, candidate, rows, seed, imputation=None):
+    """
+    Runs in a worker process: fits one candidate on the first `rows` fit rows and
+    measures it. `imputation` is the search's ConditionalImputer.to_meta() (mean
+    fill without it). Returns the report entry.
+    """
+    # One core per worker; the pool provides the parallelism
+    with threadpool_limits(1):
+        dataset = load_dataset(csv_path)
+        fill = _filler(dataset, ConditionalImputer.from_meta(imputation) if imputation else None)
+        fit_rows, validation_rows, test_rows = _split(dataset, seed)
+        fit_rows = np.sort(fit_rows[:rows])
+        X_fit = pd.DataFrame(fill(dataset.X[fit_rows]), columns=FEATURES)
+        model = _build(candidate, seed)
+
+        started = time.perf_counter()
+        model.fit(X_fit, np.asarray(dataset.y[fit_rows]))
+        fit_seconds = time.perf_counter() - started
+
+        # Imputed as train.py does and scored the way Artifact.predict_proba serves it
+        compiled = compile_model(model)
+        def predict_proba(X):
+            return compiled.predict_proba(X) if compiled is not None else model.predict_proba(pd.DataFrame(X, columns=FEATURES))
+
+        X_val = fill(dataset.X[validation_rows])
+        X_test = fill(dataset.X[test_rows])
+        started = time.perf_counter()
+        val_pred = model.classes_.take(np.argmax(predict_proba(X_val), axis=1))
+        batch_seconds = time.perf_counter() - started
+        test_pred = model.classes_.take(np.argmax(predict_proba(X_test), axis=1))
+
+        single = []
+        for row in X_val[:LATENCY_SAMPLES]:
+            started = time.perf_counter()
+            predict_proba(row[None, :])
+            single.append(time.perf_counter() - started)
+
+    return {
+        **candidate,
+        'rows': int(len(fit_rows)),
+        'fit_seconds': round(fit_seconds, 4),
+        'predict_ms_single_p50': round(float(np.median(single)) * 1000, 4),
+        'predict_rows_per_second': round(len(X_val) / batch_seconds) if batch_seconds else None,
+        'model_bytes': len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)),
+        'val_accuracy': round(float(accuracy_score(dataset.y[validation_rows], val_pred)), 4),
+        'test_accuracy': round(float(accuracy_score(dataset.y[test_rows], test_pred)), 4),
+    }
+
+def _run_round(pool, csv_path, pending, rows, seed, imputation, round_number, log):
+    futures = {pool.submit(evaluate_candidate, csv_path, candidate, rows, seed, imputation): candidate for candidate in pending}
+    results = []
+    for future in as_completed(futures):
+        candidate = futures[future]
+        try:
+            result = future.result()
+        except Exception as e:
+            result = {**candidate, 'rows': rows, 'error': str(e)}
+        result['round'] = round_number
+        results.append(result)
+        log(result)
+    return results
+
+def search(csv_path, strategy='halving', families=None, workers=None, eta=3, min_rows=200, seed=42, log=print):
+    """
+    Grid: every candidate on all fit rows. Successive halving: every candidate on a
+    small sample, then the best 1/eta (by validation accuracy) on eta times more rows,
+    until the last round uses all fit rows.
+    Returns the list of report entries (one per candidate per round).
+    """
+    dataset = load_dataset(csv_path)
+    total_rows = len(_split(dataset, seed)[0])
+    # Fit once, shared by every candidate: they are compared on the imputation train.py uses
+    imputation = fit_imputer(dataset).to_meta()
+    pending = list(candidates(families))
+    if strategy == 'grid':
+        schedule = [total_rows]
+    else:
+        rounds = max(1, math.ceil(math.log(len(pending), eta)))
+        schedule = [max(min(min_rows, total_rows), total_rows // eta ** (rounds - 1 - r)) for r in range(rounds)]
+
+    results = []
+    with ProcessPoolExecutor(workers or os.cpu_count()) as pool:
+        for round_number, rows in enumerate(schedule):
+            round_results = _run_round(pool, csv_path, pending, rows, seed, imputation, round_number, log)
+            results += round_results
+            ranked = sorted((r for r in round_results if 'error' not in r), key=lambda r: r['val_accuracy'], reverse=True)
+            pending = [{'family': r['family'], 'params': r['params']} for r in ranked[:max(1, math.ceil(len(ranked) / eta))]]
+    return results
+
+def summarize(results, min_accuracy=None):
+    """
+    The most accurate final-round entry, and the fastest (single-row latency) entry
+    whose validation accuracy is at least min_accuracy.
+    """
+    fitted = [r for r in results if 'error' not in r]
+    final = [r for r in fitted if r['round'] == max(x['round'] for x in fitted)]
+    summary = {'best_accuracy': max(final, key=lambda r: r['val_accuracy'], default=None)}
+    if min_accuracy is not None:
+        # Only entries trained on all fit rows; small-sample accuracy is not comparable
+        eligible = [r for r in fitted if r['val_accuracy'] >= min_accuracy and r['rows'] == max(x['rows'] for x in fitted)]
+        summary['fastest_meeting_accuracy'] = min(eligible, key=lambda r: r['predict_ms_single_p50'], default=None)
+    return summary
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--csv', default=str(DEFAULT_CSV), help='Training data')
+    parser.add_argument('--strategy', choices=['halving', 'grid'], default='halving')
+    parser.add_argument('--families', nargs='+', choices=list(FAMILIES), default=None)
+    parser.add_argument('--workers', type=int, default=None, help='Processes (default: CPU count)')
+    parser.add_argument('--eta', type=int, default=3, help='Successive halving keeps 1/eta per round')
+    parser.add_argument('--min-accuracy', type=float, default=None, help='Report the fastest candidate at or above this validation accuracy')
+    parser.add_argument('--report', default=str(DEFAULT_ARTIFACT_DIR.parent / 'search_report.json'))
+    args = parser.parse_args(argv)
+
+    def log(result):
+        if 'error' in result:
+            print(f"❌ {result['family']} {result['params']}: {result['error']}")
+        else:
+            print(f"  round {result['round']} {result['family']:<22} {json.dumps(result['params']):<50} rows {result['rows']:>7,} "
+                  f"fit {result['fit_seconds']:>7.2f}s  1-row {result['predict_ms_single_p50']:>7.3f} ms  "
+                  f"{result['model_bytes'] / 1e6:>7.2f} MB  val {result['val_accuracy']:.2%}")
+
+    started = time.perf_counter()
+    results = search(args.csv, args.strategy, args.families, args.workers, args.eta, log=log)
+    report = {
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'source': Path(args.csv).name,
+        'strategy': args.strategy,
+        'workers': args.workers or os.cpu_count(),
+        'wall_seconds': round(time.perf_counter() - started, 2),
+        'min_accuracy': args.min_accuracy,
+        **summarize(results, args.min_accuracy),
+        'candidates': results,
+    }
+    Path(args.report).parent.mkdir(parents=True, exist_ok=True)
+    with open(args.report, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    best = report['best_accuracy']
+    print(f"✅ {len(results)} fits in {report['wall_seconds']}s; report written to {args.report}")
+    if best:
+        print(f"   Most accurate: {best['family']} {best['params']} (val {best['val_accuracy']:.2%})")
+    if args.min_accuracy is not None:
+        fastest = report['fastest_meeting_accuracy']
+        if fastest:
+            print(f"   Fastest at >= {args.min_accuracy:.0%}: {fastest['family']} {fastest['params']} "
+                  f"({fastest['predict_ms_single_p50']:.3f} ms/row, val {fastest['val_accuracy']:.2%})")
+        else:
+            print(f"   No candidate reached {args.min_accuracy:.0%}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""
+Trains the potability model and publishes it as a new artifact version.
+
+    python -m aquasentry_ml.train [--csv water_quality.csv] [--out models/potability]
+"""
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score, classification_report
+
+from . import FEATURES
+from .artifacts import DEFAULT_ARTIFACT_DIR, save_artifact
+from .compiled import compile_model
+from .data import load_dataset
+from .imputation import fit_imputer
+
+DEFAULT_CSV = Path(__file__).resolve().parent.parent / 'water_quality.csv'
+TEST_FRACTION = 0.2
+
+# Datasets with more training rows than this are fit out of core: trees are added
+# TREES_PER_FIT at a time (warm start), each batch on a fresh random sample of
+# MAX_FIT_ROWS rows read from the memory-mapped dataset.
+MAX_FIT_ROWS = 1_000_000
+TREES_PER_FIT = 10
+
+# Rows per block when streaming over the dataset (split, evaluation)
+BLOCK_ROWS = 1_000_000
+
+def test_mask(n, seed=42, test_fraction=TEST_FRACTION):
+    """
+    Deterministic train/test split: True for held-out rows. Built block by block
+    from a hash of the row number, so it needs no random permutation of n rows.
+    """
+    mask = np.empty(n, dtype=bool)
+    for start in range(0, n, BLOCK_ROWS):
+        rows = np.arange(start, min(start + BLOCK_ROWS, n), dtype=np.uint64)
+        with np.errstate(over='ignore'):
+            hashed = (rows + np.uint64(seed)) * np.uint64(0x9E3779B97F4A7C15)
+        mask[start:start + BLOCK_ROWS] = (hashed >> np.uint64(40)) % np.uint64(10_000) < test_fraction * 10_000
+    return mask
+
+def _frame(X):
+    return pd.DataFrame(X, columns=FEATURES)
+
+def _filler(dataset, imputer):
+    # Training and evaluation fill missing values the same way predict() will
+    if imputer is None:
+        return dataset.impute
+    return lambda X: imputer.impute(X)[0]
+
+def train_model(dataset, n_estimators=100, random_state=42, max_fit_rows=MAX_FIT_ROWS, imputer=None):
+    """
+    Fits the RandomForest on the training rows of a Dataset (aquasentry_ml.data):
+    balanced class weights, missing values filled by the imputer
+    (aquasentry_ml.imputation), or with the dataset means without one.
+    Returns (model, test mask).
+    """
+    fill = _filler(dataset, imputer)
+    is_test = test_mask(len(dataset), random_state)
+    counts = dataset.class_counts
+    # Same as class_weight.compute_class_weight('balanced') over the full label column
+    class_weights = {label: len(dataset) / (2 * max(counts[label], 1)) for label in (0, 1)}
+
+    train_rows = np.flatnonzero(~is_test) if len(dataset) - is_test.sum() <= max_fit_rows else None
+    if train_rows is not None:
+        model = RandomForestClassifier(n_estimators=n_estimators, random_state=random_state, class_weight=class_weights)
+        model.fit(_frame(fill(dataset.X[train_rows])), np.asarray(dataset.y[train_rows]))
+        return model, is_test
+
+    # Out of core: memory stays at one sample of max_fit_rows rows
+    rng = np.random.default_rng(random_state)
+    model = RandomForestClassifier(n_estimators=0, random_state=random_state, class_weight=class_weights, warm_start=True)
+    while model.n_estimators < n_estimators:
+        rows = np.sort(rng.choice(len(dataset), size=min(max_fit_rows, len(dataset)), replace=False))
+        rows = rows[~is_test[rows]]
+        model.n_estimators = min(model.n_estimators + TREES_PER_FIT, n_estimators)
+        model.fit(_frame(fill(dataset.X[rows])), np.asarray(dataset.y[rows]))
+    return model, is_test
+
+def evaluate(model, dataset, is_test, imputer=None):
+    """
+    Held-out metrics, predicted block by block over the memory-mapped dataset.
+    """
+    fill = _filler(dataset, imputer)
+    predictor = compile_model(model)
+    y_true, y_pred = [], []
+    for start in range(0, len(dataset), BLOCK_ROWS):
+        held_out = is_test[start:start + BLOCK_ROWS]
+        X = fill(dataset.X[start:start + BLOCK_ROWS][held_out])
+        if not len(X):
+            continue
+        y_true.append(np.asarray(dataset.y[start:start + BLOCK_ROWS][held_out]))
+        y_pred.append(predictor.predict(X) if predictor is not None else model.predict(_frame(X)))
+    y_true, y_pred = np.concatenate(y_true), np.concatenate(y_pred)
+    return {
+        'accuracy': float(accuracy_score(y_true, y_pred)),
+        'classification_report': classification_report(y_true, y_pred, output_dict=True),
+        'feature_importances': dict(zip(FEATURES, (float(v) for v in model.feature_importances_))),
+        'test_size': int(len(y_true)),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--csv', default=str(DEFAULT_CSV), help='Training data')
+    parser.add_argument('--out', default=str(DEFAULT_ARTIFACT_DIR), help='Artifact directory')
+    parser.add_argument('--n-estimators', type=int, default=100)
+    parser.add_argument('--max-fit-rows', type=int, default=MAX_FIT_ROWS,
+                        help='Fit out of core above this many training rows')
+    parser.add_argument('--keep', type=int, default=5, help='Versions to keep on disk (0 keeps all)')
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    dataset = load_dataset(args.csv)
+    loaded = time.perf_counter()
+    imputer = fit_imputer(dataset)
+    model, is_test = train_model(dataset, n_estimators=args.n_estimators, max_fit_rows=args.max_fit_rows, imputer=imputer)
+    metrics = evaluate(model, dataset, is_test, imputer)
+    version = save_artifact(
+        model, dataset.feature_means, metrics, args.out, keep=args.keep,
+        extra={
+            'training_rows': int(len(dataset) - is_test.sum()),
+            'source': Path(args.csv).name,
+            'imputation': imputer.to_meta(),
+        },
+    )
+    print(f"✅ Published model {version} to {args.out} "
+          f"(accuracy {metrics['accuracy']:.2%}, {len(dataset):,} rows, "
+          f"load {loaded - started:.1f}s, total {time.perf_counter() - started:.1f}s)")
+    return version
+
+if __name__ == '__main__':
+    main()
@@ -2,6 +2,8 @@
 ASGI config for aquasentry_backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it with an ASGI server (e.g. ``uvicorn aquasentry_backend.asgi:application``)
+so the async Server-Sent Events endpoints in ``monitor`` can stream.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
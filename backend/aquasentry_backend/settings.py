@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
+import sys
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -138,6 +140,84 @@ EMAIL_HOST_PASSWORD = 'bpjw qydy bgoh qrbt'     # App Password provided by user
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 
 
+# Alert delivery (see monitor/email_service.py)
+# Reports are coalesced for COALESCE_SECONDS into one digest per region cell
+# (REGION_CELL degrees of lat/lon) and symptom type, and every digest due at the
+# same time is sent over a single SMTP connection. Delivery is one background thread
+# per process, not a pool: digests share that connection, and a pool would only add
+# parallel logins against the same SMTP rate limit. At most QUEUE_SIZE alerts wait
+# in memory; when the queue is full the request returns at once and the dispatcher
+# thread dead-letters the alert. Digests that still fail after MAX_ATTEMPTS sends
+# are stored as AlertDeadLetter rows.
+MONITOR_ALERTS = {
+    'COALESCE_SECONDS': 30,
+    'REGION_CELL': 0.1,
+    'QUEUE_SIZE': 1000,
+    'MAX_ATTEMPTS': 3,
+    'RETRY_SECONDS': 30,
+}
+
+
+# Outbreak clusters (see monitor/clusters.py)
+# Reports are counted per CELL_DEGREES grid cell (~1.1 km at 0.01), symptom type and
+# hour. A cell is hot when its 3x3 neighbourhood has at least MIN_CASES reports in the
+# last WINDOW_HOURS and at least MIN_RATIO times what its previous BASELINE_DAYS
+# predict; adjacent hot cells of one symptom type form a cluster. Changing
+# CELL_DEGREES requires `manage.py rebuild_report_cells`.
+MONITOR_CLUSTERS = {
+    'CELL_DEGREES': 0.01,
+    'WINDOW_HOURS': 24,
+    'BASELINE_DAYS': 7,
+    'MIN_CASES': 5,
+    'MIN_RATIO': 3.0,
+}
+
+
+# Data Retention (see monitor/retention.py, run with `manage.py apply_retention`)
+# Per-model policies. WaterSensor readings are compacted in tiers: raw rows older
+# than raw_days become hourly rollups, hourly rollups older than hourly_days become
+# daily rollups. Other models are simply range-deleted after raw_days.
+# None keeps data forever. slice_rows bounds the rows touched per transaction.
+MONITOR_RETENTION = {
+    'WaterSensor': {'raw_days': 7, 'hourly_days': 90, 'daily_days': None, 'slice_rows': 5000},
+    'HealthReport': {'raw_days': None},
+    'ReportCellBucket': {'raw_days': 30},
+    'SatelliteImage': {'raw_days': None},
+}
+
+
+# Sentinel Hub (see monitor/sentinel_service.py)
+# BASE_URL can point at a local stand-in for testing. Fetched imagery is cached on
+# disk, keyed by (bbox, time range, evalscript, size); entries expire after
+# CACHE_TTL seconds and the least recently used are evicted above CACHE_MAX_BYTES.
+SENTINEL_HUB = {
+    'BASE_URL': os.environ.get('SENTINEL_BASE_URL', 'https://services.sentinel-hub.com'),
+    'TIMEOUT': 60,
+    'CACHE_DIR': BASE_DIR / 'sentinel_cache',
+    'CACHE_TTL': 7 * 24 * 3600,
+    'CACHE_MAX_BYTES': 500 * 1024 * 1024,
+}
+
+
+# Potability model (see the aquasentry_ml package at the repository root)
+# Artifacts are published by `python -m aquasentry_ml.train`; the backend loads the
+# LATEST one on first use and re-checks the pointer every RELOAD_CHECK_SECONDS.
+# /api/predict/ accepts at most MAX_BATCH samples per request. New WaterSensor
+# readings are scored in the background in batches of up to SCORING_BATCH_SIZE,
+# waiting at most SCORING_BATCH_SECONDS for a batch to fill (monitor/scoring.py).
+REPO_ROOT = BASE_DIR.parent
+if str(REPO_ROOT) not in sys.path:
+    sys.path.append(str(REPO_ROOT))
+POTABILITY_MODEL = {
+    'ARTIFACT_DIR': REPO_ROOT / 'models' / 'potability',
+    'RELOAD_CHECK_SECONDS': 5,
+    'MAX_BATCH': 10000,
+    'SCORING_BATCH_SIZE': 1000,
+    'SCORING_BATCH_SECONDS': 0.5,
+    'SCORING_QUEUE_SIZE': 100000,
+}
+
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
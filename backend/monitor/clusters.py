@@ -0,0 +1,226 @@
+import math
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Sum
+from django.db.models.functions import Floor, TruncHour
+from django.utils import timezone
+from .models import HealthReport, ReportCellBucket
+
+# Floor on a neighbourhood's expected count, so cells with no history are not hot on a single report
+MIN_EXPECTED = 1.0
+
+# hot_cluster_count() results are reused for this long (the SSE hub asks every second)
+COUNT_CACHE_SECONDS = 10
+
+_count_cache = {'value': None, 'at': 0.0}
+
+def get_config():
+    return settings.MONITOR_CLUSTERS
+
+def cell_of(latitude, longitude, cell_degrees=None):
+    cell_degrees = cell_degrees or get_config()['CELL_DEGREES']
+    return math.floor(latitude / cell_degrees), math.floor(longitude / cell_degrees)
+
+def _bucket_key(report):
+    cell_lat, cell_lon = cell_of(report.latitude, report.longitude)
+    hour = report.submitted_at.replace(minute=0, second=0, microsecond=0)
+    return {'cell_lat': cell_lat, 'cell_lon': cell_lon, 'symptom_type': report.symptom_type, 'hour': hour}
+
+def _increment(key, severity):
+    updated = ReportCellBucket.objects.filter(**key).update(
+        count=F('count') + 1,
+        severity_sum=F('severity_sum') + severity,
+    )
+    if updated:
+        ReportCellBucket.objects.filter(**key, max_severity__lt=severity).update(max_severity=severity)
+    return updated
+
+def record_report(report):
+    """
+    Adds one report to its (cell, symptom, hour) bucket: a single-row UPDATE, or an
+    INSERT the first time the bucket is seen.
+    """
+    key = _bucket_key(report)
+    with transaction.atomic():
+        if not _increment(key, report.severity):
+            try:
+                with transaction.atomic():
+                    ReportCellBucket.objects.create(**key, count=1, severity_sum=report.severity, max_severity=report.severity)
+            except IntegrityError:
+                # Another writer created the bucket first
+                _increment(key, report.severity)
+    _count_cache['value'] = None
+
+def forget_report(report):
+    # max_severity is left as an upper bound; it is only used for display
+    ReportCellBucket.objects.filter(**_bucket_key(report)).update(
+        count=F('count') - 1,
+        severity_sum=F('severity_sum') - report.severity,
+    )
+    _count_cache['value'] = None
+
+def move_report(old, new):
+    """
+    Re-counts an edited report: `old` holds the values it was counted with. A no-op
+    unless the edit changed its bucket or severity.
+    """
+    if _bucket_key(old) == _bucket_key(new) and old.severity == new.severity:
+        return
+    with transaction.atomic():
+        forget_report(old)
+        record_report(new)
+
+def rebuild():
+    """
+    Recomputes every bucket from the HealthReport table (e.g. after changing CELL_DEGREES).
+    Returns the number of buckets written.
+    """
+    cell_degrees = get_config()['CELL_DEGREES']
+    rows = (
+        HealthReport.objects
+        .annotate(
+            cell_lat=Floor(F('latitude') / cell_degrees),
+            cell_lon=Floor(F('longitude') / cell_degrees),
+            hour=TruncHour('submitted_at'),
+        )
+        .values('cell_lat', 'cell_lon', 'symptom_type', 'hour')
+        .annotate(count=Count('id'), severity_sum=Sum('severity'), max_severity=Max('severity'))
+        .order_by()
+    )
+    with transaction.atomic():
+        ReportCellBucket.objects.all().delete()
+        buckets = [
+            ReportCellBucket(
+                cell_lat=int(row['cell_lat']), cell_lon=int(row['cell_lon']), symptom_type=row['symptom_type'],
+                hour=row['hour'], count=row['count'], severity_sum=row['severity_sum'], max_severity=row['max_severity'],
+            )
+            for row in rows
+        ]
+        ReportCellBucket.objects.bulk_create(buckets, batch_size=1000)
+    _count_cache['value'] = None
+    return len(buckets)
+
+def _cell_totals(start, end, symptom_type=None):
+    queryset = ReportCellBucket.objects.filter(hour__gte=start, hour__lt=end, count__gt=0)
+    if symptom_type:
+        queryset = queryset.filter(symptom_type=symptom_type)
+    rows = (
+        queryset.values('cell_lat', 'cell_lon', 'symptom_type')
+        .annotate(cases=Sum('count'), severity=Sum('severity_sum'), worst=Max('max_severity'))
+        .order_by()
+    )
+    return {(r['symptom_type'], r['cell_lat'], r['cell_lon']): r for r in rows}
+
+def _neighbourhood(totals, symptom, cell_lat, cell_lon, field):
+    return sum(
+        totals[(symptom, cell_lat + dy, cell_lon + dx)][field]
+        for dy in (-1, 0, 1) for dx in (-1, 0, 1)
+        if (symptom, cell_lat + dy, cell_lon + dx) in totals
+    )
+
+def _llr(observed, expected):
+    # Poisson log-likelihood ratio (Kulldorff scan statistic) for an excess of cases
+    if observed <= expected:
+        return 0.0
+    return observed * math.log(observed / expected) - (observed - expected)
+
+def hot_clusters(now=None, window_hours=None, symptom_type=None):
+    """
+    Current outbreak clusters, strongest first.
+
+    Works on the hourly cell buckets only, so the cost follows the number of active
+    cells in the window and baseline, not the number of reports.
+    Returns:
+        list: [{'symptom_type', 'cases', 'expected', 'score', 'max_severity', 'mean_severity',
+                'center': [lat, lon], 'bbox': [min_lon, min_lat, max_lon, max_lat], 'cells'}]
+    """
+    config = get_config()
+    now = now or timezone.now()
+    window_hours = window_hours or config['WINDOW_HOURS']
+    cell_degrees = config['CELL_DEGREES']
+
+    # The window covers the current partial hour plus the previous window_hours - 1 hours
+    window_end = now.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+    window_start = window_end - timedelta(hours=window_hours)
+    baseline_start = window_start - timedelta(days=config['BASELINE_DAYS'])
+    baseline_scale = window_hours / (config['BASELINE_DAYS'] * 24)
+
+    current = _cell_totals(window_start, window_end, symptom_type)
+    if not current:
+        return []
+    baseline = _cell_totals(baseline_start, window_start, symptom_type)
+
+    # 1. A cell is hot if its 3x3 neighbourhood is both busy and well above its own history
+    hot = {}
+    for (symptom, cell_lat, cell_lon) in current:
+        observed = _neighbourhood(current, symptom, cell_lat, cell_lon, 'cases')
+        expected = max(_neighbourhood(baseline, symptom, cell_lat, cell_lon, 'cases') * baseline_scale, MIN_EXPECTED)
+        if observed >= config['MIN_CASES'] and observed >= config['MIN_RATIO'] * expected:
+            hot[(symptom, cell_lat, cell_lon)] = _llr(observed, expected)
+
+    # 2. Join adjacent hot cells of the same symptom (8-connectivity) into clusters
+    clusters = []
+    seen = set()
+    for start in hot:
+        if start in seen:
+            continue
+        component = []
+        stack = [start]
+        seen.add(start)
+        while stack:
+            key = stack.pop()
+            component.append(key)
+            symptom, cell_lat, cell_lon = key
+            for dy in (-1, 0, 1):
+                for dx in (-1, 0, 1):
+                    neighbour = (symptom, cell_lat + dy, cell_lon + dx)
+                    if neighbour in hot and neighbour not in seen:
+                        seen.add(neighbour)
+                        stack.append(neighbour)
+        clusters.append(_describe(component, current, baseline, baseline_scale, cell_degrees))
+
+    clusters.sort(key=lambda c: c['score'], reverse=True)
+    return clusters
+
+def _describe(component, current, baseline, baseline_scale, cell_degrees):
+    # Cases are counted over the hot cells plus their neighbourhood, each cell once
+    cells = set()
+    for symptom, cell_lat, cell_lon in component:
+        for dy in (-1, 0, 1):
+            for dx in (-1, 0, 1):
+                key = (symptom, cell_lat + dy, cell_lon + dx)
+                if key in current:
+                    cells.add(key)
+
+    cases = sum(current[k]['cases'] for k in cells)
+    severity = sum(current[k]['severity'] for k in cells)
+    expected = max(sum(baseline[k]['cases'] for k in cells if k in baseline) * baseline_scale, MIN_EXPECTED)
+    lat_center = sum((k[1] + 0.5) * current[k]['cases'] for k in cells) / cases * cell_degrees
+    lon_center = sum((k[2] + 0.5) * current[k]['cases'] for k in cells) / cases * cell_degrees
+    return {
+        'symptom_type': component[0][0],
+        'cases': cases,
+        'expected': round(expected, 2),
+        'score': round(_llr(cases, expected), 2),
+        'max_severity': max(current[k]['worst'] for k in cells),
+        'mean_severity': round(severity / cases, 2),
+        'center': [round(lat_center, 5), round(lon_center, 5)],
+        'bbox': [
+            round(min(k[2] for k in cells) * cell_degrees, 5),
+            round(min(k[1] for k in cells) * cell_degrees, 5),
+            round((max(k[2] for k in cells) + 1) * cell_degrees, 5),
+            round((max(k[1] for k in cells) + 1) * cell_degrees, 5),
+        ],
+        'cells': len(cells),
+    }
+
+def hot_cluster_count():
+    """
+    Number of current clusters, cached briefly for the dashboard and live stream.
+    """
+    if _count_cache['value'] is None or time.monotonic() - _count_cache['at'] > COUNT_CACHE_SECONDS:
+        _count_cache['value'] = len(hot_clusters())
+        _count_cache['at'] = time.monotonic()
+    return _count_cache['value']
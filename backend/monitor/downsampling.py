@@ -0,0 +1,123 @@
+from datetime import timedelta
+from django.db.models import Count, Max, Min, Sum
+from django.db.models.functions import TruncDay, TruncHour, TruncMinute
+from .models import SensorReadingRollup, WaterSensor
+
+# Supported bucket sizes: (database truncation function, bucket width)
+BUCKETS = {
+    '1m': (TruncMinute, timedelta(minutes=1)),
+    '1h': (TruncHour, timedelta(hours=1)),
+    '1d': (TruncDay, timedelta(days=1)),
+}
+
+METRICS = ['ph', 'turbidity', 'temperature', 'dissolved_oxygen', 'conductivity']
+
+# Cap on buckets per sensor in one response (a month of hourly buckets is ~720)
+MAX_BUCKETS = 5000
+
+def bucket_count(bucket, start, end):
+    _, width = BUCKETS[bucket]
+    return int((end - start) / width) + 1
+
+def raw_buckets(bucket, start, end, sensor_id=None):
+    """
+    Aggregates raw readings in the database, one row per (sensor, bucket).
+    Sums are returned instead of means so partial buckets can be merged exactly.
+    """
+    trunc, _ = BUCKETS[bucket]
+    queryset = WaterSensor.objects.filter(timestamp__gte=start, timestamp__lt=end)
+    if sensor_id:
+        queryset = queryset.filter(sensor_id=sensor_id)
+
+    aggregates = {}
+    for metric in METRICS:
+        aggregates[f'{metric}_min'] = Min(metric)
+        aggregates[f'{metric}_max'] = Max(metric)
+        aggregates[f'{metric}_sum'] = Sum(metric)
+
+    return (
+        queryset
+        .annotate(bucket_start=trunc('timestamp'))
+        .values('sensor_id', 'bucket_start')
+        .annotate(count=Count('id'), **aggregates)
+        .order_by('sensor_id', 'bucket_start')
+    )
+
+# Compacted rollup tiers that can be re-bucketed into each requested bucket size
+ROLLUP_SOURCES = {
+    '1m': [],
+    '1h': ['1h'],
+    '1d': ['1h', '1d'],
+}
+
+def _rollup_buckets(bucket, start, end, sensor_id=None):
+    """
+    Re-buckets compacted SensorReadingRollup rows (see monitor.retention) in the database.
+    """
+    trunc, _ = BUCKETS[bucket]
+    queryset = SensorReadingRollup.objects.filter(
+        bucket__in=ROLLUP_SOURCES[bucket], bucket_start__gte=start, bucket_start__lt=end
+    )
+    if sensor_id:
+        queryset = queryset.filter(sensor_id=sensor_id)
+
+    aggregates = {'count': Sum('count')}
+    for metric in METRICS:
+        aggregates[f'{metric}_min'] = Min(f'{metric}_min')
+        aggregates[f'{metric}_max'] = Max(f'{metric}_max')
+        aggregates[f'{metric}_sum'] = Sum(f'{metric}_sum')
+
+    return (
+        queryset
+        .annotate(truncated_start=trunc('bucket_start'))
+        .values('sensor_id', 'truncated_start')
+        .annotate(**aggregates)
+        .order_by('sensor_id', 'truncated_start')
+    )
+
+def _merged_buckets(bucket, start, end, sensor_id=None):
+    """
+    Combines raw buckets with compacted rollups covering the same range.
+    A bucket can be partly compacted and partly raw, so both halves are merged.
+    """
+    merged = {}
+    for row in raw_buckets(bucket, start, end, sensor_id):
+        merged[(row['sensor_id'], row['bucket_start'])] = dict(row)
+
+    for row in _rollup_buckets(bucket, start, end, sensor_id):
+        key = (row['sensor_id'], row['truncated_start'])
+        current = merged.get(key)
+        if current is None:
+            merged[key] = dict(row, bucket_start=row['truncated_start'])
+            continue
+        current['count'] += row['count']
+        for metric in METRICS:
+            current[f'{metric}_min'] = min(current[f'{metric}_min'], row[f'{metric}_min'])
+            current[f'{metric}_max'] = max(current[f'{metric}_max'], row[f'{metric}_max'])
+            current[f'{metric}_sum'] += row[f'{metric}_sum']
+
+    return [merged[key] for key in sorted(merged)]
+
+def bucketed_history(bucket, start, end, sensor_id=None):
+    """
+    Returns per-sensor min/max/mean/count of every metric over fixed buckets in [start, end).
+    Older data is read from the compacted rollups; 1m buckets are only available
+    while the raw readings are retained.
+    Returns:
+        list: [{'sensor_id', 'bucket_start', 'count', 'ph': {'min', 'max', 'mean'}, ...}]
+    """
+    series = []
+    for row in _merged_buckets(bucket, start, end, sensor_id):
+        point = {
+            'sensor_id': row['sensor_id'],
+            'bucket_start': row['bucket_start'],
+            'count': row['count'],
+        }
+        for metric in METRICS:
+            point[metric] = {
+                'min': row[f'{metric}_min'],
+                'max': row[f'{metric}_max'],
+                'mean': round(row[f'{metric}_sum'] / row['count'], 4),
+            }
+        series.append(point)
+    return series
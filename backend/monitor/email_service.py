@@ -1,51 +1,296 @@
-from django.core.mail import send_mail
+from django.core.mail import EmailMessage, get_connection
 from django.conf import settings
+from django.db import close_old_connections
+import atexit
+from collections import deque
+import math
+import queue
 import threading
+import time
 
 def send_alert_email(report_instance):
     """
-    Sends an email alert for high-severity health reports.
-    Runs in a separate thread to avoid blocking the API response.
+    Queues an email alert for a health report. Alerts are coalesced into digests and
+    delivered by a background dispatcher, so the API response is never blocked on SMTP.
     """
     # For testing: Send email for ALL severity levels (usually < 7 returns)
-    if report_instance.severity < 1: 
+    if report_instance.severity < 1:
         print(f"ℹ️ Severity {report_instance.severity} is too low for alert.")
         return
 
-    subject = f"🚨 URGENT: High Severity Health Alert - {report_instance.get_symptom_type_display()}"
-    
-    message = f"""
+    dispatcher.submit(report_instance)
+
+def _alert_from_report(report):
+    # Plain values only: the dispatcher thread must not touch model instances
+    return {
+        'id': report.id,
+        'symptom_type': report.symptom_type,
+        'symptom_display': report.get_symptom_type_display(),
+        'severity': report.severity,
+        'latitude': report.latitude,
+        'longitude': report.longitude,
+        'submitted_at': str(report.submitted_at),
+        'notes': report.notes,
+    }
+
+def _region_cell(alert, cell):
+    return (
+        round(math.floor(alert['latitude'] / cell) * cell, 6),
+        round(math.floor(alert['longitude'] / cell) * cell, 6),
+    )
+
+def _single_message(alert):
+    return f"""
     CRITICAL HEALTH ALERT
     --------------------------------------------------
     A high-severity health issue has been reported in the monitoring system.
 
-    Category: {report_instance.get_symptom_type_display()}
-    Severity: {report_instance.severity}/10
-    Location: Lat {report_instance.latitude}, Lon {report_instance.longitude}
-    Timestamp: {report_instance.submitted_at}
-    
+    Category: {alert['symptom_display']}
+    Severity: {alert['severity']}/10
+    Location: Lat {alert['latitude']}, Lon {alert['longitude']}
+    Timestamp: {alert['submitted_at']}
+
     Notes:
-    {report_instance.notes}
+    {alert['notes']}
 
     --------------------------------------------------
-    Please investigate immediately. 
+    Please investigate immediately.
     Sent via AquaSentry System.
     """
-    
-    recipient_list = [settings.EMAIL_HOST_USER] # Send to self/admin for demo purposes
 
-    def _send():
+def build_digest(region, alerts):
+    """
+    Returns (subject, body) for one region cell / symptom type.
+    A single alert keeps the original one-report format.
+    """
+    first = alerts[0]
+    if len(alerts) == 1:
+        return f"🚨 URGENT: High Severity Health Alert - {first['symptom_display']}", _single_message(first)
+
+    worst = max(a['severity'] for a in alerts)
+    subject = f"🚨 URGENT: {len(alerts)} Health Alerts - {first['symptom_display']} near Lat {region[0]}, Lon {region[1]}"
+    lines = [
+        "",
+        "    HEALTH ALERT DIGEST",
+        "    --------------------------------------------------",
+        f"    {len(alerts)} reports of {first['symptom_display']} were received near Lat {region[0]}, Lon {region[1]}.",
+        f"    Highest severity: {worst}/10",
+        "",
+    ]
+    for alert in alerts:
+        lines.append(
+            f"    - {alert['submitted_at']} | Severity {alert['severity']}/10 | "
+            f"Lat {alert['latitude']}, Lon {alert['longitude']} | {alert['notes'] or ''}"
+        )
+    lines += [
+        "",
+        "    --------------------------------------------------",
+        "    Please investigate immediately. ",
+        "    Sent via AquaSentry System.",
+        "",
+    ]
+    return subject, "\n".join(lines)
+
+class AlertDispatcher:
+    """
+    Delivers health alerts from a single background thread.
+
+    Alerts wait in a bounded queue, are grouped by region cell and symptom type for
+    COALESCE_SECONDS, and every group that comes due is sent as one digest over a
+    shared SMTP connection. Failed digests are retried with backoff and end up in
+    AlertDeadLetter once MAX_ATTEMPTS is reached. See settings.MONITOR_ALERTS.
+
+    One thread rather than a pool on purpose: coalescing already turns a burst into a
+    few digests over one connection. submit() never blocks or writes to the database;
+    alerts that find the queue full are shed and the dispatcher thread dead-letters them.
+    """
+    def __init__(self):
+        self._queue = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._pending = {}  # (region, symptom_type) -> {'alerts', 'due', 'attempts'}; dispatcher thread only
+        self._shed = deque()  # Alerts that found the queue full, waiting to be dead-lettered
+
+    def submit(self, report):
+        self._ensure_running()
+        alert = _alert_from_report(report)
         try:
-            if settings.EMAIL_HOST_USER == 'YOUR_EMAIL_ADDRESS@gmail.com':
-                print("⚠️  Email not sent: EMAIL_HOST_USER not set in settings.py")
-                print(f"--- [SIMULATION] Email Content ---\n{message}\n----------------------------------")
-                return
+            self._queue.put_nowait(alert)
+        except queue.Full:
+            # The dispatcher is behind: it wakes up for the queued alerts (or their digests)
+            # and dead-letters these as well
+            self._shed.append(alert)
+            print(f"❌ Alert queue full; report {alert['id']} will be dead-lettered")
+
+    def flush(self, timeout=10):
+        """
+        Sends everything queued or pending right away, ignoring the coalescing window.
+        Returns False if the dispatcher did not finish within timeout seconds.
+        """
+        self._ensure_running()
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def _ensure_running(self):
+        with self._lock:
+            if self._queue is None:
+                self._queue = queue.Queue(maxsize=settings.MONITOR_ALERTS['QUEUE_SIZE'])
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='alert-dispatcher', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            if self._pending:
+                next_due = min(group['due'] for group in self._pending.values())
+                timeout = max(next_due - time.monotonic(), 0)
+            else:
+                timeout = None
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
 
-            send_mail(subject, message, settings.EMAIL_HOST_USER, recipient_list)
-            print(f"✅ Alert email sent to {recipient_list}")
+            force = False
+            flushed = None
+            if isinstance(item, threading.Event):
+                # Pull in whatever is still queued so flush() covers it
+                force, flushed = True, item
+                while True:
+                    try:
+                        queued = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if isinstance(queued, threading.Event):
+                        queued.set()
+                    else:
+                        self._add(queued)
+            elif item is not None:
+                self._add(item)
+
+            try:
+                self._dead_letter_shed()
+                self._send_due(force)
+            except Exception as e:
+                print(f"❌ Alert dispatcher error: {e}")
+                self._postpone_overdue()
+            finally:
+                close_old_connections()
+                if flushed:
+                    flushed.set()
+
+    def _dead_letter_shed(self):
+        region_cell = settings.MONITOR_ALERTS['REGION_CELL']
+        while self._shed:
+            alert = self._shed.popleft()
+            subject, body = build_digest(_region_cell(alert, region_cell), [alert])
+            _dead_letter(subject, body, [alert['id']], 0, "Alert queue full")
+
+    def _add(self, alert):
+        config = settings.MONITOR_ALERTS
+        key = (_region_cell(alert, config['REGION_CELL']), alert['symptom_type'])
+        group = self._pending.setdefault(key, {
+            'alerts': [],
+            'due': time.monotonic() + config['COALESCE_SECONDS'],
+            'attempts': 0,
+        })
+        group['alerts'].append(alert)
+
+    def _send_due(self, force=False):
+        now = time.monotonic()
+        due = [key for key, group in self._pending.items() if force or group['due'] <= now]
+        if not due:
+            return
+
+        recipient_list = [settings.EMAIL_HOST_USER] # Send to self/admin for demo purposes
+        digests = {}
+        for key in due:
+            try:
+                digests[key] = build_digest(key[0], self._pending[key]['alerts'])
+            except Exception as e:
+                # Not retried: the same alerts would fail the same way
+                alerts = self._pending.pop(key)['alerts']
+                _dead_letter(f"Health alerts near {key[0]} (digest failed)", "\n".join(repr(a) for a in alerts),
+                             [a['id'] for a in alerts], 0, f"build_digest failed: {e}", recipient_list)
+        due = list(digests)
+
+        if settings.EMAIL_HOST_USER == 'YOUR_EMAIL_ADDRESS@gmail.com':
+            print("⚠️  Email not sent: EMAIL_HOST_USER not set in settings.py")
+            for key in due:
+                subject, body = digests[key]
+                print(f"--- [SIMULATION] Email Content ---\n{subject}\n{body}\n----------------------------------")
+                del self._pending[key]
+            return
+
+        # One connection (one TLS handshake) for every digest due now
+        connection = get_connection(fail_silently=False)
+        try:
+            connection.open()
         except Exception as e:
-            print(f"❌ Failed to send email: {e}")
+            for key in due:
+                self._retry(key, digests[key], recipient_list, e)
+            return
+        try:
+            for key in due:
+                subject, body = digests[key]
+                try:
+                    connection.send_messages([
+                        EmailMessage(subject, body, settings.EMAIL_HOST_USER, recipient_list, connection=connection)
+                    ])
+                except Exception as e:
+                    self._retry(key, digests[key], recipient_list, e)
+                    continue
+                print(f"✅ Alert email sent to {recipient_list} ({len(self._pending[key]['alerts'])} report(s))")
+                del self._pending[key]
+        finally:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+    def _postpone_overdue(self):
+        # Last resort after an unexpected error: without it the overdue groups would be
+        # retried immediately, forever
+        retry_at = time.monotonic() + settings.MONITOR_ALERTS['RETRY_SECONDS']
+        for group in self._pending.values():
+            group['due'] = max(group['due'], retry_at)
+
+    def _retry(self, key, digest, recipient_list, error):
+        config = settings.MONITOR_ALERTS
+        group = self._pending[key]
+        group['attempts'] += 1
+        if group['attempts'] >= config['MAX_ATTEMPTS']:
+            del self._pending[key]
+            subject, body = digest
+            _dead_letter(subject, body, [a['id'] for a in group['alerts']], group['attempts'], error, recipient_list)
+            print(f"❌ Failed to send email after {group['attempts']} attempts, dead-lettered: {error}")
+            return
+        group['due'] = time.monotonic() + config['RETRY_SECONDS'] * 2 ** (group['attempts'] - 1)
+        print(f"❌ Failed to send email (attempt {group['attempts']}), will retry: {error}")
+
+def _dead_letter(subject, body, report_ids, attempts, error, recipients=None):
+    """
+    Stores an undeliverable digest. Never raises: if the row cannot be written either,
+    the digest is printed so the alerts are not lost silently.
+    """
+    from .models import AlertDeadLetter
+    try:
+        AlertDeadLetter.objects.create(
+            subject=subject[:255],
+            body=body,
+            recipients=recipients or [settings.EMAIL_HOST_USER],
+            report_ids=report_ids,
+            attempts=attempts,
+            error=str(error),
+        )
+    except Exception as e:
+        print(f"❌ Could not dead-letter reports {report_ids} ({e}); original error: {error}\n{subject}\n{body}")
+
+dispatcher = AlertDispatcher()
 
-    # Run asynchronously
-    email_thread = threading.Thread(target=_send)
-    email_thread.start()
+@atexit.register
+def _flush_on_exit():
+    # Best effort: don't drop the coalescing window's alerts on a clean shutdown
+    if dispatcher._thread is not None and dispatcher._thread.is_alive():
+        dispatcher.flush(timeout=5)
@@ -0,0 +1,46 @@
+from django.db import transaction
+from rest_framework import serializers
+from .models import WaterSensor
+from .serializers import WaterSensorSerializer
+from .scoring import scorer
+from .stream import hub
+
+# Rows per INSERT statement. SQLite caps bound parameters per statement,
+# so very large payloads are split into several INSERTs (same transaction).
+BULK_BATCH_SIZE = 500
+
+# Upper bound on readings accepted in one bulk request.
+MAX_BULK_ITEMS = 10000
+
+def ingest_readings(items):
+    """
+    Validates a list of raw sensor readings and stores the valid ones in a
+    single transaction using bulk_create.
+    Returns:
+        tuple: (created readings, errors) where errors is a list of
+        {'index': int, 'errors': dict} for every rejected item.
+    """
+    validator = WaterSensorSerializer()
+    readings = []
+    errors = []
+
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors.append({'index': index, 'errors': {'non_field_errors': ['Expected a JSON object.']}})
+            continue
+        try:
+            validated = validator.run_validation(item)
+        except serializers.ValidationError as e:
+            errors.append({'index': index, 'errors': e.detail})
+            continue
+        readings.append(WaterSensor(**validated))
+
+    if readings:
+        with transaction.atomic():
+            readings = WaterSensor.objects.bulk_create(readings, batch_size=BULK_BATCH_SIZE)
+            # bulk_create skips post_save; the dashboard reads the newest readings itself
+            # (monitor.rollups), so only the stream and the scorer need telling
+            transaction.on_commit(hub.notify)
+            transaction.on_commit(lambda: scorer.submit(readings))
+
+    return readings, errors
@@ -0,0 +1,241 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import timedelta
+from django.db import close_old_connections
+from django.db.models import F, Q
+from django.utils import timezone
+from .models import AnalysisJob
+from .sentinel_service import SentinelService, encode_png, simulated_scene
+from .sweep import DEFAULT_CONCURRENCY, run_sweep
+from .utils import analyze_image_array, analyze_image_bytes, limit_tile_workers
+
+# How long a running job stays claimed without news from its worker. Workers renew the
+# lease of their in-flight jobs every LEASE_RENEW_INTERVAL, so only jobs whose worker
+# died are reclaimed. A reclaimed job runs again from the start: analyses overwrite
+# the same scores, a repeated fetch stores one more SatelliteImage.
+LEASE = timedelta(minutes=10)
+LEASE_RENEW_INTERVAL = LEASE / 3
+
+# Delay before retry N is 2^(N-1) * RETRY_BACKOFF
+RETRY_BACKOFF = timedelta(seconds=30)
+
+def enqueue_analysis(image):
+    return AnalysisJob.objects.create(kind='analyze', satellite_image=image)
+
+def enqueue_sentinel_fetch(bbox, location_name):
+    return AnalysisJob.objects.create(kind='sentinel', payload={'bbox': bbox, 'location_name': location_name})
+
+def enqueue_sweep(regions, concurrency):
+    return AnalysisJob.objects.create(kind='sweep', payload={'regions': regions, 'concurrency': concurrency})
+
+def claim_jobs(limit, kinds=None):
+    """
+    Atomically claims up to `limit` jobs that are ready to run, including running
+    jobs whose lease expired (their worker died). Safe with several workers.
+    """
+    now = timezone.now()
+    ready = AnalysisJob.objects.filter(
+        Q(status='queued') | Q(status='running'), run_after__lte=now
+    )
+    if kinds:
+        ready = ready.filter(kind__in=kinds)
+
+    claimed = []
+    for job_id in ready.order_by('run_after').values_list('id', flat=True)[:limit]:
+        updated = AnalysisJob.objects.filter(
+            Q(status='queued') | Q(status='running'), id=job_id, run_after__lte=now
+        ).update(status='running', attempts=F('attempts') + 1, run_after=now + LEASE)
+        if updated:
+            claimed.append(AnalysisJob.objects.select_related('satellite_image').get(id=job_id))
+    return claimed
+
+def renew_leases(jobs):
+    """
+    Pushes the lease of still-running jobs forward, so a job that takes longer than
+    LEASE is not handed to another worker while this one is still on it.
+    """
+    ids = [job.id for job in jobs]
+    if ids:
+        AnalysisJob.objects.filter(id__in=ids, status='running').update(run_after=timezone.now() + LEASE)
+
+def complete_analysis(job, analysis):
+    image = job.satellite_image
+    image.chlorophyll_index = analysis['chlorophyll_index']
+    image.turbidity_index = analysis['turbidity_index']
+    image.risk_score = analysis['risk_score']
+    image.save(update_fields=['chlorophyll_index', 'turbidity_index', 'risk_score'])
+    _finish(job, dict(analysis, satellite_image=image.id))
+
+def complete_sentinel_fetch(job, image):
+    job.satellite_image = image
+    _finish(job, {
+        'satellite_image': image.id,
+        'chlorophyll_index': image.chlorophyll_index,
+        'turbidity_index': image.turbidity_index,
+        'risk_score': image.risk_score,
+    })
+
+def complete_sweep(job, report):
+    _finish(job, report)
+
+def fail(job, error):
+    """
+    Re-queues the job with exponential backoff, or marks it failed once attempts run out.
+    """
+    job.last_error = str(error)
+    if job.attempts < job.max_attempts:
+        job.status = 'queued'
+        job.run_after = timezone.now() + RETRY_BACKOFF * (2 ** (job.attempts - 1))
+    else:
+        job.status = 'failed'
+    job.save(update_fields=['status', 'run_after', 'last_error', 'updated_at'])
+
+def _finish(job, result):
+    job.status = 'done'
+    job.result = result
+    job.last_error = ''
+    job.save(update_fields=['status', 'result', 'satellite_image', 'last_error', 'updated_at'])
+
+def _read_image(image):
+    # Goes through the storage API rather than .path, so non-filesystem storages work too
+    with image.image.open('rb') as f:
+        return f.read()
+
+def _fetch_sentinel(bbox):
+    """
+    Network only; the analysis goes to the process pool and the INSERT happens in the
+    worker loop. Returns (content, pixels, simulated). A simulated scene (no credentials
+    configured) is analyzed from its RGB pixels; its PNG is only what gets stored.
+    """
+    if not SentinelService.is_configured():
+        data = simulated_scene()
+        return encode_png(data), data, True
+    return SentinelService.fetch_imagery_bytes(bbox), None, False
+
+def _analyze_fetched(pool, fetched):
+    content, pixels, _ = fetched
+    if pixels is not None:
+        return pool.submit(analyze_image_array, pixels, color_order='rgb')
+    return pool.submit(analyze_image_bytes, content)
+
+def _sweep(regions, concurrency):
+    try:
+        report = run_sweep(regions, concurrency)
+    finally:
+        close_old_connections()
+    if report['regions'] and not report['succeeded']:
+        raise RuntimeError(f"All {report['regions']} regions failed: {report['results'][0]['error']}")
+    return report
+
+class AnalysisWorker:
+    """
+    Runs queued jobs: OpenCV analysis in a process pool (CPU bound) and Sentinel
+    fetches and sweeps in a thread pool (network bound). A Sentinel job is fetched
+    on a thread, then analyzed on the process pool. All job bookkeeping happens on
+    the calling thread.
+    """
+    def __init__(self, processes=None, threads=4, poll_interval=1.0, log=print):
+        self.processes = processes or multiprocessing.cpu_count()
+        self.threads = threads
+        self.poll_interval = poll_interval
+        self.log = log
+
+    def run(self, once=False):
+        # spawn keeps the pool children free of the parent's DB connections and threads
+        # One tile thread per process: the pool already uses every core
+        process_pool = ProcessPoolExecutor(
+            self.processes, mp_context=multiprocessing.get_context('spawn'), initializer=limit_tile_workers
+        )
+        thread_pool = ThreadPoolExecutor(self.threads)
+        in_flight = {}   # future -> job
+        on_cpu = set()   # the futures in in_flight that run on the process pool
+        fetched = {}     # Sentinel job id -> (content, pixels, simulated) while its analysis runs
+        renewed_at = time.monotonic()
+        try:
+            while True:
+                free_cpu = self.processes - len(on_cpu)
+                free_io = self.threads - (len(in_flight) - len(on_cpu))
+                claimed = claim_jobs(free_cpu, kinds=['analyze']) if free_cpu > 0 else []
+                for job in claimed:
+                    if job.satellite_image is None:
+                        # Image was deleted after upload; nothing left to retry
+                        job.attempts = job.max_attempts
+                        fail(job, "Satellite image no longer exists")
+                        continue
+                    try:
+                        data = _read_image(job.satellite_image)
+                    except Exception as e:
+                        # Any storage error (missing file, SuspiciousFileOperation, ...) fails this job only
+                        self._failed(job, e)
+                        continue
+                    future = process_pool.submit(analyze_image_bytes, data)
+                    in_flight[future] = job
+                    on_cpu.add(future)
+                sentinel_jobs = claim_jobs(free_io, kinds=['sentinel', 'sweep']) if free_io > 0 else []
+                claimed += sentinel_jobs
+                for job in sentinel_jobs:
+                    payload = job.payload
+                    if job.kind == 'sweep':
+                        future = thread_pool.submit(_sweep, payload['regions'], payload.get('concurrency', DEFAULT_CONCURRENCY))
+                    else:
+                        future = thread_pool.submit(_fetch_sentinel, payload['bbox'])
+                    in_flight[future] = job
+
+                if not in_flight:
+                    if claimed:
+                        continue  # Every claimed job failed up front; look for more
+                    if once:
+                        return
+                    time.sleep(self.poll_interval)
+                    continue
+
+                if time.monotonic() - renewed_at >= LEASE_RENEW_INTERVAL.total_seconds():
+                    renew_leases(in_flight.values())
+                    renewed_at = time.monotonic()
+
+                done, _ = wait(in_flight, timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job = in_flight.pop(future)
+                    on_cpu.discard(future)
+                    if job.kind == 'sentinel' and job.id not in fetched:
+                        # Fetch finished: hand the CPU-bound analysis to the process pool
+                        try:
+                            fetched[job.id] = future.result()
+                        except Exception as e:
+                            self._failed(job, e)
+                            continue
+                        analysis = _analyze_fetched(process_pool, fetched[job.id])
+                        in_flight[analysis] = job
+                        on_cpu.add(analysis)
+                        continue
+                    self._record(job, future, fetched.pop(job.id, None))
+        finally:
+            thread_pool.shutdown(wait=True)
+            process_pool.shutdown(wait=True)
+
+    def _failed(self, job, error):
+        fail(job, error)
+        self.log(f"❌ Job {job.id} ({job.kind}) attempt {job.attempts} failed: {error}")
+
+    def _record(self, job, future, fetched=None):
+        try:
+            outcome = future.result()
+            if job.kind == 'sentinel':
+                content, _, simulated = fetched
+                payload = job.payload
+                outcome = SentinelService.store_image(
+                    content, outcome, payload['bbox'], payload.get('location_name', 'Target Area'), simulated
+                )
+        except Exception as e:
+            self._failed(job, e)
+            return
+        if job.kind == 'analyze':
+            complete_analysis(job, outcome)
+        elif job.kind == 'sweep':
+            complete_sweep(job, outcome)
+            self.log(f"✅ Job {job.id} (sweep) done: {outcome['succeeded']}/{outcome['regions']} regions in {outcome['wall_time']}s")
+            return
+        else:
+            complete_sentinel_fetch(job, outcome)
+        self.log(f"✅ Job {job.id} ({job.kind}) done: risk {job.result['risk_score']}")
@@ -0,0 +1,36 @@
+import time
+from django.core.management.base import BaseCommand
+from monitor import retention
+
+class Command(BaseCommand):
+    help = 'Compacts and deletes aged-out monitoring data according to settings.MONITOR_RETENTION'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', action='append', dest='models', help='Only apply the policy for this model (repeatable)')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be compacted or deleted')
+        parser.add_argument('--pause', type=float, default=0.05, help='Seconds to sleep between slices so ingest is never blocked for long')
+        parser.add_argument('--interval', type=int, default=0, help='Re-run every N seconds (scheduler mode); 0 runs once')
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                self._run_once(options)
+                if not options['interval']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.SUCCESS('Retention scheduler stopped.'))
+
+    def _run_once(self, options):
+        results = retention.apply_policies(
+            models=options['models'], pause=options['pause'], dry_run=options['dry_run']
+        )
+        prefix = '[DRY RUN] ' if options['dry_run'] else ''
+        for stats in results:
+            self.stdout.write(
+                f"{prefix}{stats.model_name}: {stats.rows_compacted} compacted, {stats.rows_deleted} deleted, "
+                f"{stats.rollups_written} rollups written in {stats.slices} slices "
+                f"({stats.seconds:.2f}s, {stats.rows_per_second:,.0f} rows/s)"
+            )
+        if not results:
+            self.stdout.write('No retention policies configured.')
@@ -0,0 +1,88 @@
+import io
+import shutil
+import tempfile
+import time
+import numpy as np
+from PIL import Image
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import override_settings
+from monitor.models import SatelliteImage
+from monitor.utils import analyze_image_array, analyze_image_bytes, analyze_water_image
+
+class _Rollback(Exception):
+    pass
+
+class Command(BaseCommand):
+    help = 'Compares per-image save+analyze time of the disk round trip vs in-memory analysis (changes are rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--images', type=int, default=50, help='Images per scenario')
+        parser.add_argument('--size', type=int, default=512, help='Image width and height in pixels')
+
+    def handle(self, *args, **options):
+        count, size = options['images'], options['size']
+        rng = np.random.default_rng(42)
+        arrays = [rng.integers(0, 256, (size, size, 3), dtype=np.uint8) for _ in range(count)]
+        encoded = [_png(data) for data in arrays]
+
+        media_root = tempfile.mkdtemp(prefix='aquasentry-bench-')
+        try:
+            with override_settings(MEDIA_ROOT=media_root):
+                try:
+                    with transaction.atomic():
+                        results = [
+                            ('mock: disk round trip', self._time(arrays, self._mock_before)),
+                            ('mock: analyze array', self._time(arrays, self._mock_after)),
+                            ('fetch: disk round trip', self._time(encoded, self._fetch_before)),
+                            ('fetch: analyze bytes', self._time(encoded, self._fetch_after)),
+                        ]
+                        raise _Rollback()
+                except _Rollback:
+                    pass
+        finally:
+            shutil.rmtree(media_root, ignore_errors=True)
+
+        self.stdout.write(f"{count} images, {size}x{size}")
+        self.stdout.write(f"{'scenario':<24} {'ms/image':>10}")
+        for name, ms in results:
+            self.stdout.write(f"{name:<24} {ms:>10.2f}")
+
+    def _time(self, inputs, step):
+        started = time.perf_counter()
+        for i, item in enumerate(inputs):
+            step(i, item)
+        return (time.perf_counter() - started) * 1000 / len(inputs)
+
+    # Previous SentinelService behaviour: save, read the file back, save again
+    def _mock_before(self, i, data):
+        instance = SatelliteImage(location_name='[BENCH]')
+        instance.image.save(f'bench_{i}.png', ContentFile(_png(data)))
+        instance.save()
+        self._apply(instance, analyze_water_image(instance.image.path))
+
+    def _fetch_before(self, i, content):
+        instance = SatelliteImage(location_name='[BENCH]')
+        instance.image.save(f'bench_{i}.png', ContentFile(content))
+        instance.save()
+        self._apply(instance, analyze_water_image(instance.image.path))
+
+    def _mock_after(self, i, data):
+        analysis = analyze_image_array(data, color_order='rgb')
+        SatelliteImage(location_name='[BENCH]', **analysis).image.save(f'bench_{i}.png', ContentFile(_png(data)))
+
+    def _fetch_after(self, i, content):
+        analysis = analyze_image_bytes(content)
+        SatelliteImage(location_name='[BENCH]', **analysis).image.save(f'bench_{i}.png', ContentFile(content))
+
+    def _apply(self, instance, analysis):
+        instance.chlorophyll_index = analysis['chlorophyll_index']
+        instance.turbidity_index = analysis['turbidity_index']
+        instance.risk_score = analysis['risk_score']
+        instance.save()
+
+def _png(data):
+    buffer = io.BytesIO()
+    Image.fromarray(data, 'RGB').save(buffer, format='PNG')
+    return buffer.getvalue()
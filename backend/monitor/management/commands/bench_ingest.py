@@ -0,0 +1,61 @@
+import json
+import random
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.test import APIClient
+
+class _Rollback(Exception):
+    pass
+
+class Command(BaseCommand):
+    help = 'Benchmarks single-reading POSTs against the bulk ingestion endpoint (changes are rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readings', type=int, default=2000, help='Readings to ingest per mode')
+        parser.add_argument('--batch-size', type=int, default=500, help='Readings per bulk request')
+
+    def handle(self, *args, **options):
+        total = options['readings']
+        batch_size = options['batch_size']
+        readings = [self._reading(i) for i in range(total)]
+        client = APIClient(HTTP_HOST='localhost')
+
+        results = {}
+        try:
+            with transaction.atomic():
+                start = time.perf_counter()
+                for reading in readings:
+                    client.post('/api/sensors/', reading, format='json')
+                results['single'] = time.perf_counter() - start
+
+                start = time.perf_counter()
+                for i in range(0, total, batch_size):
+                    client.post('/api/sensors/bulk/', readings[i:i + batch_size], format='json')
+                results['bulk (JSON)'] = time.perf_counter() - start
+
+                start = time.perf_counter()
+                for i in range(0, total, batch_size):
+                    body = "\n".join(json.dumps(r) for r in readings[i:i + batch_size])
+                    client.post('/api/sensors/bulk/', body, content_type='application/x-ndjson')
+                results['bulk (NDJSON)'] = time.perf_counter() - start
+
+                raise _Rollback()
+        except _Rollback:
+            pass
+
+        self.stdout.write(f"Ingested {total} readings per mode (batch size {batch_size}):")
+        for mode, elapsed in results.items():
+            self.stdout.write(f"  {mode:<14} {elapsed:8.3f}s  {total / elapsed:10.0f} readings/s")
+        speedup = results['single'] / results['bulk (JSON)']
+        self.stdout.write(self.style.SUCCESS(f"Bulk JSON ingestion is {speedup:.1f}x faster than single POSTs"))
+
+    def _reading(self, i):
+        return {
+            'sensor_id': f"BENCH-{i % 50:03d}",
+            'ph': round(random.uniform(6.0, 9.0), 2),
+            'turbidity': round(random.uniform(0.5, 8.0), 2),
+            'temperature': round(random.uniform(20.0, 30.0), 1),
+            'dissolved_oxygen': round(random.uniform(6.0, 9.0), 2),
+            'conductivity': round(random.uniform(300, 900), 0),
+        }
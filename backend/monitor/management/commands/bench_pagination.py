@@ -0,0 +1,74 @@
+import random
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework.test import APIClient
+from monitor.models import WaterSensor
+
+class _Rollback(Exception):
+    pass
+
+class Command(BaseCommand):
+    help = 'Measures /api/sensors/ list latency as the table grows to 1M rows (changes are rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000, help='Final table size')
+        parser.add_argument('--sensors', type=int, default=200, help='Distinct sensor ids')
+        parser.add_argument('--repeat', type=int, default=20, help='Requests per measurement')
+
+    def handle(self, *args, **options):
+        final_rows = options['rows']
+        self.sensors = options['sensors']
+        self.repeat = options['repeat']
+        self.client = APIClient(HTTP_HOST='localhost')
+
+        checkpoints = [n for n in (10_000, 100_000, final_rows) if n <= final_rows]
+        self.start_time = timezone.now() - timedelta(seconds=final_rows)
+
+        try:
+            with transaction.atomic():
+                inserted = 0
+                self.stdout.write(f"{'rows':>10} {'first page':>12} {'next page':>12} {'since=':>12} {'sensor_id=':>12}")
+                for target in checkpoints:
+                    self._insert(inserted, target)
+                    inserted = target
+                    self._measure(target)
+                raise _Rollback()
+        except _Rollback:
+            pass
+
+    def _insert(self, start, end, chunk=50_000):
+        table = WaterSensor._meta.db_table
+        sql = (
+            f"INSERT INTO {table} (sensor_id, timestamp, ph, turbidity, temperature, dissolved_oxygen, conductivity) "
+            "VALUES (%s, %s, %s, %s, %s, %s, %s)"
+        )
+        with connection.cursor() as cursor:
+            for chunk_start in range(start, end, chunk):
+                rows = []
+                for i in range(chunk_start, min(chunk_start + chunk, end)):
+                    ts = connection.ops.adapt_datetimefield_value(self.start_time + timedelta(seconds=i))
+                    rows.append((f"SENSOR-{i % self.sensors:04d}", ts, round(random.uniform(6.0, 9.0), 2),
+                                 round(random.uniform(0.5, 8.0), 2), 25.0, 7.5, 450.0))
+                cursor.executemany(sql, rows)
+
+    def _measure(self, rows):
+        first = self.client.get('/api/sensors/', {'page_size': 100}).json()
+        since = (self.start_time + timedelta(seconds=rows - 50)).isoformat()
+
+        timings = [
+            self._time('/api/sensors/', {'page_size': 100}),
+            self._time(first['next']),
+            self._time('/api/sensors/', {'since': since, 'page_size': 100}),
+            self._time('/api/sensors/', {'sensor_id': 'SENSOR-0007', 'page_size': 100}),
+        ]
+        self.stdout.write(f"{rows:>10} " + " ".join(f"{t * 1000:>10.2f}ms" for t in timings))
+
+    def _time(self, url, params=None):
+        start = time.perf_counter()
+        for _ in range(self.repeat):
+            response = self.client.get(url, params)
+            assert response.status_code == 200, response.status_code
+        return (time.perf_counter() - start) / self.repeat
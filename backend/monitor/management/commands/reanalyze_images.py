@@ -0,0 +1,160 @@
+import json
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, time as day_start
+from itertools import islice
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from monitor import rollups
+from monitor.models import SatelliteImage
+from monitor.utils import analyze_image_bytes, limit_tile_workers
+
+SCORE_FIELDS = ['chlorophyll_index', 'turbidity_index', 'risk_score']
+
+def _parse_moment(value, option):
+    """
+    ISO datetime or date (midnight) for --since/--until, in the current timezone if naive.
+    """
+    try:
+        moment = parse_datetime(value)
+        if moment is None:
+            day = parse_date(value)
+            moment = datetime.combine(day, day_start.min) if day else None
+    except ValueError:
+        moment = None
+    if moment is None:
+        raise CommandError(f"--{option} must be an ISO date or datetime (e.g. 2024-05-01 or 2024-05-01T12:00), got {value!r}")
+    return timezone.make_aware(moment) if timezone.is_naive(moment) else moment
+
+def _read(name):
+    # Storage API rather than .path(), so non-filesystem storages work too
+    with default_storage.open(name, 'rb') as f:
+        return f.read()
+
+class Command(BaseCommand):
+    help = 'Recomputes stored SatelliteImage scores with the current analyzer (parallel, resumable)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=None, help='Analysis processes (default: CPU count)')
+        parser.add_argument('--chunk', type=int, default=200, help='Rows written per bulk_update (and checkpoint)')
+        parser.add_argument('--location', help='Only images whose location_name contains this text')
+        parser.add_argument('--since', help='Only images captured at or after this ISO date')
+        parser.add_argument('--until', help='Only images captured before this ISO date')
+        parser.add_argument('--missing', action='store_true', help='Only images that have no scores yet')
+        parser.add_argument('--checkpoint', default=os.path.join(settings.BASE_DIR, 'reanalyze_checkpoint.json'),
+                            help='Progress file used to resume an interrupted run')
+        parser.add_argument('--restart', action='store_true', help='Ignore any existing checkpoint')
+
+    def handle(self, *args, **options):
+        filters = {k: options[k] for k in ('location', 'since', 'until', 'missing')}
+        queryset = SatelliteImage.objects.all()
+        if filters['location']:
+            queryset = queryset.filter(location_name__icontains=filters['location'])
+        if filters['since']:
+            queryset = queryset.filter(captured_at__gte=_parse_moment(filters['since'], 'since'))
+        if filters['until']:
+            queryset = queryset.filter(captured_at__lt=_parse_moment(filters['until'], 'until'))
+        if filters['missing']:
+            queryset = queryset.filter(risk_score__isnull=True)
+
+        # 1. Resume after the last committed id if the checkpoint belongs to the same filters
+        checkpoint_path = options['checkpoint']
+        state = {'filters': filters, 'last_id': 0, 'updated': 0, 'failed': 0}
+        if not options['restart'] and os.path.exists(checkpoint_path):
+            with open(checkpoint_path) as f:
+                saved = json.load(f)
+            if saved.get('filters') != filters:
+                raise CommandError(f"{checkpoint_path} was written for different filters {saved.get('filters')}; use --restart")
+            state = saved
+            self.stdout.write(f"Resuming after image {state['last_id']} ({state['updated']} already updated)")
+
+        queryset = queryset.filter(id__gt=state['last_id']).order_by('id')
+        total = queryset.count()
+        if not total:
+            self.stdout.write(self.style.SUCCESS('Nothing to re-analyze.'))
+            self._clear(checkpoint_path)
+            return
+        self.stdout.write(f"Re-analyzing {total} images...")
+
+        # 2. Read each file through the storage API here and analyze the bytes in a process
+        #    pool, consuming results in id order so the checkpoint is a simple high-water
+        #    mark. At most `window` images are in flight (and in memory).
+        processes = options['processes'] or multiprocessing.cpu_count()
+        chunk_size = options['chunk']
+        window = processes * 4
+        rows = queryset.values_list('id', 'image').iterator(chunk_size=chunk_size)
+        started = time.perf_counter()
+        done = 0
+        pending = []
+        completed = False
+        try:
+            with ProcessPoolExecutor(processes, mp_context=multiprocessing.get_context('spawn'), initializer=limit_tile_workers) as pool:
+                in_flight = deque()
+                while True:
+                    for image_id, name in islice(rows, window - len(in_flight)):
+                        try:
+                            in_flight.append((image_id, pool.submit(analyze_image_bytes, _read(name))))
+                        except Exception as e:
+                            in_flight.append((image_id, e))
+                    if not in_flight:
+                        break
+                    image_id, future = in_flight.popleft()
+                    try:
+                        if isinstance(future, Exception):
+                            raise future
+                        pending.append(SatelliteImage(id=image_id, **future.result()))
+                    except BrokenProcessPool:
+                        raise  # Not this image's fault; stop before the checkpoint passes it
+                    except Exception as e:
+                        # Missing, unreadable or undecodable file: report it and keep going
+                        state['failed'] += 1
+                        self.stderr.write(f"❌ Image {image_id}: {e}")
+                    state['last_id'] = image_id
+                    done += 1
+                    if done % chunk_size == 0:
+                        self._flush(pending, state, checkpoint_path)
+                        pending = []
+                        rate = done / (time.perf_counter() - started)
+                        self.stdout.write(f"  {done}/{total} images ({rate:.1f} images/s)")
+            completed = True
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('Interrupted; saving progress.'))
+        finally:
+            # However the loop ended, keep the scores computed so far and checkpoint them
+            self._flush(pending, state, checkpoint_path)
+        if not completed:
+            return
+
+        # 3. Refresh the dashboard rollup (bulk_update skips signals)
+        latest = SatelliteImage.objects.order_by('-id').first()
+        if latest:
+            rollups.record_satellite_image(latest)
+        self._clear(checkpoint_path)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Re-analyzed {done} images in {elapsed:.1f}s ({done / elapsed:.1f} images/s): "
+            f"{state['updated']} updated, {state['failed']} failed"
+        ))
+
+    def _flush(self, pending, state, checkpoint_path):
+        with transaction.atomic():
+            SatelliteImage.objects.bulk_update(pending, SCORE_FIELDS)
+        state['updated'] += len(pending)
+        # Written only after the rows commit, so a crash re-does at most one chunk
+        tmp_path = f"{checkpoint_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, checkpoint_path)
+
+    def _clear(self, checkpoint_path):
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from monitor import clusters
+
+class Command(BaseCommand):
+    help = 'Recomputes the outbreak cluster cell buckets from all health reports (run after changing CELL_DEGREES)'
+
+    def handle(self, *args, **options):
+        written = clusters.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} report cell buckets."))
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from monitor import rollups
+from monitor.models import DashboardRollup
+
+ROLLUP_FIELDS = [
+    'health_report_count',
+    'latest_satellite_id',
+    'latest_satellite_risk',
+]
+
+class Command(BaseCommand):
+    help = 'Checks the dashboard rollup against the raw tables and rebuilds it'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help='Only report drift, do not rewrite the rollup')
+
+    def handle(self, *args, **options):
+        if options['check']:
+            with transaction.atomic():
+                stored = DashboardRollup.objects.filter(pk=rollups.ROLLUP_PK).first()
+                expected = rollups.compute_rollup()
+        else:
+            stored, expected = rollups.rebuild()
+
+        if stored is None:
+            self.stdout.write(self.style.WARNING('No rollup stored yet.'))
+            drift = ROLLUP_FIELDS
+        else:
+            drift = [f for f in ROLLUP_FIELDS if getattr(stored, f) != getattr(expected, f)]
+            for field in drift:
+                self.stdout.write(f"  {field}: stored={getattr(stored, field)!r} expected={getattr(expected, field)!r}")
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS('Rollup is consistent with the raw tables.'))
+        elif options['check']:
+            raise CommandError(f"Rollup drifted on {len(drift)} field(s); run without --check to rebuild.")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Rollup rebuilt ({len(drift)} field(s) corrected)."))
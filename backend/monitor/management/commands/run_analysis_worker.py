@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from monitor.jobs import AnalysisWorker
+
+class Command(BaseCommand):
+    help = 'Runs queued satellite analysis jobs (OpenCV in a process pool, Sentinel fetches in threads)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=None, help='Analysis processes (default: CPU count)')
+        parser.add_argument('--threads', type=int, default=4, help='Concurrent Sentinel Hub fetches')
+        parser.add_argument('--poll', type=float, default=1.0, help='Seconds between queue polls when idle')
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is drained')
+
+    def handle(self, *args, **options):
+        worker = AnalysisWorker(
+            processes=options['processes'],
+            threads=options['threads'],
+            poll_interval=options['poll'],
+            log=self.stdout.write,
+        )
+        self.stdout.write(self.style.SUCCESS(f'Analysis worker started ({worker.processes} processes, {worker.threads} threads). Press Ctrl+C to stop.'))
+        try:
+            worker.run(once=options['once'])
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.SUCCESS('Analysis worker stopped.'))
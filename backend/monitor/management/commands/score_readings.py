@@ -0,0 +1,44 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from aquasentry_ml.artifacts import ArtifactNotFound
+from monitor.models import WaterSensor
+from monitor.scoring import SENSOR_FEATURES, score_rows
+
+class Command(BaseCommand):
+    help = 'Scores WaterSensor readings with the current potability model (backfill or full re-score)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Re-score every reading, not only unscored ones (e.g. after training a new model)')
+        parser.add_argument('--chunk', type=int, default=5000, help='Readings per model call and UPDATE transaction')
+
+    def handle(self, *args, **options):
+        queryset = WaterSensor.objects.all()
+        if not options['all']:
+            queryset = queryset.filter(potability__isnull=True)
+        total = queryset.count()
+        if not total:
+            self.stdout.write(self.style.SUCCESS('Nothing to score.'))
+            return
+
+        started = time.perf_counter()
+        scored = 0
+        last_id = 0
+        # Keyset pagination over id: each chunk is one SELECT, one model call, one UPDATE transaction
+        while True:
+            rows = list(
+                queryset.filter(id__gt=last_id).order_by('id')
+                .values_list('id', *SENSOR_FEATURES)[:options['chunk']]
+            )
+            if not rows:
+                break
+            try:
+                scored += score_rows(rows)
+            except ArtifactNotFound as e:
+                raise CommandError(str(e))
+            last_id = rows[-1][0]
+            self.stdout.write(f"  {scored}/{total} readings scored")
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Scored {scored} readings in {elapsed:.1f}s ({scored / max(elapsed, 1e-9):,.0f}/s)."
+        ))
@@ -1,7 +1,7 @@
 import time
 import random
 from django.core.management.base import BaseCommand
-from monitor.models import WaterSensor
+from monitor.ingest import ingest_readings
 
 class Command(BaseCommand):
     help = 'Simulates real-time IoT sensor data stream'
@@ -13,6 +13,7 @@ class Command(BaseCommand):
         
         try:
             while True:
+                readings = []
                 for sensor_id in sensor_ids:
                     # Generate random values with occasional "CONTAMINATION EVENT" (20% chance)
                     if random.random() < 0.2:
@@ -29,22 +30,21 @@ class Command(BaseCommand):
                     temp = round(random.uniform(20.0, 30.0), 1)
                     do = round(random.uniform(6.0, 9.0), 2)
                     
-                    WaterSensor.objects.create(
-                        sensor_id=sensor_id,
-                        ph=ph,
-                        turbidity=turbidity,
-                        temperature=temp,
-                        dissolved_oxygen=do,
-                        conductivity=cond
-                    )
+                    readings.append({
+                        'sensor_id': sensor_id,
+                        'ph': ph,
+                        'turbidity': turbidity,
+                        'temperature': temp,
+                        'dissolved_oxygen': do,
+                        'conductivity': cond,
+                    })
                     
                     self.stdout.write(f"Data packet sent from {sensor_id}: pH={ph}, Turbidity={turbidity}")
                 
-                # Keep database size manageable (optional cleanup)
-                if WaterSensor.objects.count() > 1000:
-                    oldest_ids = WaterSensor.objects.order_by('timestamp').values_list('id', flat=True)[:100]
-                    WaterSensor.objects.filter(id__in=oldest_ids).delete()
-                    
+                # One transaction per cycle instead of one INSERT per reading
+                ingest_readings(readings)
+
+                # Old readings are compacted by `manage.py apply_retention`, not deleted here
                 time.sleep(5) # Update every 5 seconds
         except KeyboardInterrupt:
             self.stdout.write(self.style.SUCCESS('Simulation stopped.'))
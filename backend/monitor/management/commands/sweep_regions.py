@@ -0,0 +1,54 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from monitor import sweep
+
+class Command(BaseCommand):
+    help = 'Fetches and analyzes many Sentinel-2 regions concurrently and reports per-region latency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bbox', action='append', default=[], help='min_lon,min_lat,max_lon,max_lat (repeatable)')
+        parser.add_argument('--polygon', help='JSON [[lon, lat], ...] or a path to a file containing it; tiled into bboxes')
+        parser.add_argument('--step', type=float, default=sweep.DEFAULT_STEP, help='Tile size in degrees for --polygon')
+        parser.add_argument('--name', default='Sweep', help='Location name prefix for polygon tiles')
+        parser.add_argument('--concurrency', type=int, default=sweep.DEFAULT_CONCURRENCY, help='Simultaneous Sentinel Hub requests')
+
+    def handle(self, *args, **options):
+        try:
+            regions = [
+                {'name': f"{options['name']} bbox {i + 1}", 'bbox': sweep.validate_bbox(b.split(','))}
+                for i, b in enumerate(options['bbox'])
+            ]
+            if options['polygon']:
+                regions += sweep.regions_from_polygon(_load_polygon(options['polygon']), options['step'], options['name'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        if not regions:
+            raise CommandError('Give at least one --bbox or a --polygon')
+
+        self.stdout.write(f"Sweeping {len(regions)} regions with {options['concurrency']} concurrent requests...")
+        report = sweep.run_sweep(regions, options['concurrency'], on_result=self._print_result)
+
+        latencies = sorted(r['latency'] for r in report['results'] if 'latency' in r)
+        summary = f"{report['succeeded']}/{report['regions']} regions in {report['wall_time']:.2f}s wall time"
+        if latencies:
+            summary += (
+                f" (per region: median {latencies[len(latencies) // 2]:.2f}s, max {latencies[-1]:.2f}s, "
+                f"serial estimate {sum(latencies):.2f}s)"
+            )
+        self.stdout.write(self.style.SUCCESS(summary))
+
+    def _print_result(self, result):
+        if 'error' in result:
+            self.stderr.write(f"❌ {result['name']}: {result['error']}")
+        else:
+            retries = f" ({result['attempts']} attempts)" if result['attempts'] > 1 else ''
+            self.stdout.write(f"  {result['name']:<24} risk {result['risk_score']:>6.2f}  {result['latency']:.2f}s{retries}")
+
+def _load_polygon(value):
+    if not value.lstrip().startswith('['):
+        with open(value) as f:
+            value = f.read()
+    try:
+        return json.loads(value)
+    except json.JSONDecodeError as e:
+        raise CommandError(f"Invalid polygon JSON: {e}")
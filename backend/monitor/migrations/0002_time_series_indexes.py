@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitor', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='healthreport',
+            index=models.Index(fields=['-submitted_at'], name='health_submitted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='satelliteimage',
+            index=models.Index(fields=['-captured_at'], name='satellite_captured_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='watersensor',
+            index=models.Index(fields=['sensor_id', '-timestamp'], name='sensor_id_timestamp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='watersensor',
+            index=models.Index(fields=['-timestamp'], name='sensor_timestamp_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitor', '0002_time_series_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('health_report_count', models.IntegerField(default=0)),
+                ('latest_satellite_id', models.BigIntegerField(blank=True, null=True)),
+                ('latest_satellite_risk', models.FloatField(default=0)),
+                ('recent_sensor_flags', models.JSONField(default=list, help_text='[id, is_critical] of the newest sensor readings')),
+                ('recent_report_flags', models.JSONField(default=list, help_text='[id, is_severe] of the newest health reports')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
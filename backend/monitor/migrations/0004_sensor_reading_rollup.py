@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitor', '0003_dashboard_rollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SensorReadingRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sensor_id', models.CharField(max_length=50)),
+                ('bucket', models.CharField(choices=[('1h', '1 hour'), ('1d', '1 day')], max_length=4)),
+                ('bucket_start', models.DateTimeField()),
+                ('count', models.IntegerField(default=0)),
+                ('ph_min', models.FloatField()),
+                ('ph_max', models.FloatField()),
+                ('ph_sum', models.FloatField()),
+                ('turbidity_min', models.FloatField()),
+                ('turbidity_max', models.FloatField()),
+                ('turbidity_sum', models.FloatField()),
+                ('temperature_min', models.FloatField()),
+                ('temperature_max', models.FloatField()),
+                ('temperature_sum', models.FloatField()),
+                ('dissolved_oxygen_min', models.FloatField()),
+                ('dissolved_oxygen_max', models.FloatField()),
+                ('dissolved_oxygen_sum', models.FloatField()),
+                ('conductivity_min', models.FloatField()),
+                ('conductivity_max', models.FloatField()),
+                ('conductivity_sum', models.FloatField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['bucket', 'bucket_start'], name='sensor_rollup_bucket_idx')],
+                'constraints': [models.UniqueConstraint(fields=('sensor_id', 'bucket', 'bucket_start'), name='unique_sensor_rollup_bucket')],
+            },
+        ),
+    ]
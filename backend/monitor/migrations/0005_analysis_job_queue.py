@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:54
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitor', '0004_sensor_reading_rollup'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='satelliteimage',
+            name='chlorophyll_index',
+            field=models.FloatField(blank=True, help_text='Detected chlorophyll percentage (0-100)', null=True),
+        ),
+        migrations.AlterField(
+            model_name='satelliteimage',
+            name='risk_score',
+            field=models.FloatField(blank=True, help_text='Calculated risk score (0-100)', null=True),
+        ),
+        migrations.AlterField(
+            model_name='satelliteimage',
+            name='turbidity_index',
+            field=models.FloatField(blank=True, help_text='Detected turbidity percentage (0-100)', null=True),
+        ),
+        migrations.CreateModel(
+            name='AnalysisJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('analyze', 'Analyze uploaded image'), ('sentinel', 'Fetch and analyze Sentinel-2 scene')], max_length=20)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=10)),
+                ('payload', models.JSONField(blank=True, default=dict)),
+                ('result', models.JSONField(blank=True, null=True)),
+                ('attempts', models.IntegerField(default=0)),
+                ('max_attempts', models.IntegerField(default=3)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now, help_text='Earliest run time; for running jobs, when the worker lease expires')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('satellite_image', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='analysis_jobs', to='monitor.satelliteimage')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'run_after'], name='analysis_job_queue_idx')],
+            },
+        ),
+    ]
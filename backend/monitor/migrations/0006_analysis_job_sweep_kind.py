@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitor', '0005_analysis_job_queue'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='analysisjob',
+            name='kind',
+            field=models.CharField(choices=[('analyze', 'Analyze uploaded image'), ('sentinel', 'Fetch and analyze Sentinel-2 scene'), ('sweep', 'Fetch and analyze many Sentinel-2 regions')], max_length=20),
+        ),
+    ]
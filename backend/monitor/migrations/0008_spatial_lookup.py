@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitor', '0007_alert_dead_letter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='satelliteimage',
+            name='max_lat',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='satelliteimage',
+            name='max_lon',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='satelliteimage',
+            name='min_lat',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='satelliteimage',
+            name='min_lon',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='healthreport',
+            index=models.Index(fields=['latitude', 'longitude'], name='health_lat_lon_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitor', '0008_spatial_lookup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportCellBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cell_lat', models.IntegerField(help_text='floor(latitude / CELL_DEGREES)')),
+                ('cell_lon', models.IntegerField(help_text='floor(longitude / CELL_DEGREES)')),
+                ('symptom_type', models.CharField(max_length=10)),
+                ('hour', models.DateTimeField()),
+                ('count', models.IntegerField(default=0)),
+                ('severity_sum', models.IntegerField(default=0)),
+                ('max_severity', models.IntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['hour'], name='report_cell_hour_idx')],
+                'constraints': [models.UniqueConstraint(fields=('cell_lat', 'cell_lon', 'symptom_type', 'hour'), name='unique_report_cell_bucket')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitor', '0009_report_cell_bucket'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='watersensor',
+            name='potability',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
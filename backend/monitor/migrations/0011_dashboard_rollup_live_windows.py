@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:39
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitor', '0010_water_sensor_potability'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='dashboardrollup',
+            name='recent_report_flags',
+        ),
+        migrations.RemoveField(
+            model_name='dashboardrollup',
+            name='recent_sensor_flags',
+        ),
+    ]
@@ -1,16 +1,70 @@
 from django.db import models
+from django.utils import timezone
 
 class SatelliteImage(models.Model):
     image = models.ImageField(upload_to='satellite_images/')
     captured_at = models.DateTimeField(auto_now_add=True)
-    chlorophyll_index = models.FloatField(help_text="Detected chlorophyll percentage (0-100)")
-    turbidity_index = models.FloatField(help_text="Detected turbidity percentage (0-100)")
-    risk_score = models.FloatField(help_text="Calculated risk score (0-100)")
+    # Filled in by the analysis worker (see monitor.jobs); empty until the analysis job finishes
+    chlorophyll_index = models.FloatField(null=True, blank=True, help_text="Detected chlorophyll percentage (0-100)")
+    turbidity_index = models.FloatField(null=True, blank=True, help_text="Detected turbidity percentage (0-100)")
+    risk_score = models.FloatField(null=True, blank=True, help_text="Calculated risk score (0-100)")
     location_name = models.CharField(max_length=255, default="Unknown Location")
+    # Area covered by the scan; known for Sentinel fetches, empty for manual uploads
+    min_lon = models.FloatField(null=True, blank=True)
+    min_lat = models.FloatField(null=True, blank=True)
+    max_lon = models.FloatField(null=True, blank=True)
+    max_lat = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-captured_at'], name='satellite_captured_idx'),
+        ]
+
+    @property
+    def bbox(self):
+        if self.min_lon is None:
+            return None
+        return [self.min_lon, self.min_lat, self.max_lon, self.max_lat]
 
     def __str__(self):
         return f"Satellite Scan - {self.location_name} ({self.captured_at})"
 
+class AnalysisJob(models.Model):
+    """
+    Queued satellite work, executed by `manage.py run_analysis_worker`.
+    """
+    KINDS = [
+        ('analyze', 'Analyze uploaded image'),
+        ('sentinel', 'Fetch and analyze Sentinel-2 scene'),
+        ('sweep', 'Fetch and analyze many Sentinel-2 regions'),
+    ]
+    STATUSES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KINDS)
+    status = models.CharField(max_length=10, choices=STATUSES, default='queued')
+    satellite_image = models.ForeignKey(SatelliteImage, null=True, blank=True, on_delete=models.SET_NULL, related_name='analysis_jobs')
+    payload = models.JSONField(default=dict, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=3)
+    last_error = models.TextField(blank=True, default='')
+    run_after = models.DateTimeField(default=timezone.now, help_text="Earliest run time; for running jobs, when the worker lease expires")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='analysis_job_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"Analysis Job {self.id} ({self.kind}, {self.status})"
+
 class WaterSensor(models.Model):
     sensor_id = models.CharField(max_length=50)
     timestamp = models.DateTimeField(auto_now_add=True)
@@ -19,10 +73,65 @@ class WaterSensor(models.Model):
     temperature = models.FloatField()
     dissolved_oxygen = models.FloatField()
     conductivity = models.FloatField()
+    # P(safe) from the potability model, filled in shortly after ingest (monitor.scoring)
+    potability = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['sensor_id', '-timestamp'], name='sensor_id_timestamp_idx'),
+            models.Index(fields=['-timestamp'], name='sensor_timestamp_idx'),
+        ]
+
+    @property
+    def is_critical(self):
+        # WHO Standards: pH 6.5-8.5, Turbidity < 5 NTU
+        return self.ph < 6.5 or self.ph > 8.5 or self.turbidity > 5.0
     
     def __str__(self):
         return f"Sensor {self.sensor_id} at {self.timestamp}"
 
+class SensorReadingRollup(models.Model):
+    """
+    Compacted WaterSensor readings: one row per sensor per bucket, written by
+    the retention job (monitor.retention) once raw readings age out.
+    Sums are stored instead of means so buckets can be merged exactly.
+    """
+    BUCKETS = [
+        ('1h', '1 hour'),
+        ('1d', '1 day'),
+    ]
+
+    sensor_id = models.CharField(max_length=50)
+    bucket = models.CharField(max_length=4, choices=BUCKETS)
+    bucket_start = models.DateTimeField()
+    count = models.IntegerField(default=0)
+    ph_min = models.FloatField()
+    ph_max = models.FloatField()
+    ph_sum = models.FloatField()
+    turbidity_min = models.FloatField()
+    turbidity_max = models.FloatField()
+    turbidity_sum = models.FloatField()
+    temperature_min = models.FloatField()
+    temperature_max = models.FloatField()
+    temperature_sum = models.FloatField()
+    dissolved_oxygen_min = models.FloatField()
+    dissolved_oxygen_max = models.FloatField()
+    dissolved_oxygen_sum = models.FloatField()
+    conductivity_min = models.FloatField()
+    conductivity_max = models.FloatField()
+    conductivity_sum = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['sensor_id', 'bucket', 'bucket_start'], name='unique_sensor_rollup_bucket'),
+        ]
+        indexes = [
+            models.Index(fields=['bucket', 'bucket_start'], name='sensor_rollup_bucket_idx'),
+        ]
+
+    def __str__(self):
+        return f"Sensor {self.sensor_id} {self.bucket} rollup at {self.bucket_start}"
+
 class HealthReport(models.Model):
     SYMPTOM_TYPES = [
         ('GI', 'Gastrointestinal (Diarrhea, Vomiting)'),
@@ -38,5 +147,69 @@ class HealthReport(models.Model):
     longitude = models.FloatField()
     notes = models.TextField(blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-submitted_at'], name='health_submitted_idx'),
+            # Spatial lookups (see monitor.spatial): a latitude range scan that filters
+            # longitude from the index itself, without touching the table rows
+            models.Index(fields=['latitude', 'longitude'], name='health_lat_lon_idx'),
+        ]
+
+    @property
+    def is_severe(self):
+        return self.severity > 5
+
     def __str__(self):
         return f"Health Report: {self.symptom_type} (Severity: {self.severity})"
+
+class DashboardRollup(models.Model):
+    """
+    Single-row summary of the three layers, maintained on write (see monitor.rollups)
+    so the dashboard never counts or scans the raw tables.
+    """
+    health_report_count = models.IntegerField(default=0)
+    latest_satellite_id = models.BigIntegerField(null=True, blank=True)
+    latest_satellite_risk = models.FloatField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Dashboard Rollup (updated {self.updated_at})"
+
+class AlertDeadLetter(models.Model):
+    """
+    Alert digests that could not be delivered (see monitor.email_service), kept for manual follow-up.
+    """
+    created_at = models.DateTimeField(auto_now_add=True)
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    recipients = models.JSONField(default=list)
+    report_ids = models.JSONField(default=list, help_text="HealthReport ids covered by this digest")
+    attempts = models.IntegerField(default=0)
+    error = models.TextField(blank=True, default='')
+
+    def __str__(self):
+        return f"Undelivered Alert: {self.subject} ({self.created_at})"
+
+class ReportCellBucket(models.Model):
+    """
+    Health report counts per grid cell, symptom type and hour, incremented as reports
+    arrive (see monitor.clusters). Cluster detection reads these instead of the reports.
+    """
+    cell_lat = models.IntegerField(help_text="floor(latitude / CELL_DEGREES)")
+    cell_lon = models.IntegerField(help_text="floor(longitude / CELL_DEGREES)")
+    symptom_type = models.CharField(max_length=10)
+    hour = models.DateTimeField()
+    count = models.IntegerField(default=0)
+    severity_sum = models.IntegerField(default=0)
+    max_severity = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['cell_lat', 'cell_lon', 'symptom_type', 'hour'], name='unique_report_cell_bucket'),
+        ]
+        indexes = [
+            models.Index(fields=['hour'], name='report_cell_hour_idx'),
+        ]
+
+    def __str__(self):
+        return f"Report Cell ({self.cell_lat}, {self.cell_lon}) {self.symptom_type} @ {self.hour}: {self.count}"
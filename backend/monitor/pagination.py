@@ -0,0 +1,18 @@
+from rest_framework.pagination import CursorPagination
+
+class TimeSeriesCursorPagination(CursorPagination):
+    """
+    Keyset (cursor) pagination for the time-series endpoints.
+    Each page is an indexed range scan from the cursor position, so the
+    cost stays flat no matter how deep the client pages or how big the table is.
+    The ordering comes from the view's `ordering` attribute (newest first).
+    """
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+    def get_ordering(self, request, queryset, view):
+        ordering = getattr(view, 'ordering', None)
+        if ordering:
+            return (ordering,) if isinstance(ordering, str) else tuple(ordering)
+        return super().get_ordering(request, queryset, view)
@@ -0,0 +1,11 @@
+from django.conf import settings
+from aquasentry_ml.artifacts import registry
+
+def get_artifact():
+    """
+    Current potability model artifact. Loaded on first use in each worker process
+    and swapped when a new version is published (see settings.POTABILITY_MODEL).
+    Raises aquasentry_ml.artifacts.ArtifactNotFound if no model has been trained.
+    """
+    config = settings.POTABILITY_MODEL
+    return registry(config['ARTIFACT_DIR'], config['RELOAD_CHECK_SECONDS']).current()
@@ -0,0 +1,213 @@
+import time
+from datetime import timedelta
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Min, Sum
+from django.db.models.functions import TruncDay
+from django.utils import timezone
+from .downsampling import METRICS, raw_buckets
+from .models import SensorReadingRollup, WaterSensor
+
+DEFAULT_SLICE_ROWS = 5000
+
+# Time column used to age out each model's rows
+TIME_FIELDS = {
+    'WaterSensor': 'timestamp',
+    'HealthReport': 'submitted_at',
+    'SatelliteImage': 'captured_at',
+    'ReportCellBucket': 'hour',
+}
+
+class RetentionStats:
+    def __init__(self, model_name):
+        self.model_name = model_name
+        self.rows_compacted = 0
+        self.rows_deleted = 0
+        self.rollups_written = 0
+        self.slices = 0
+        self.seconds = 0.0
+
+    @property
+    def rows_per_second(self):
+        return (self.rows_compacted + self.rows_deleted) / self.seconds if self.seconds else 0.0
+
+def get_policies():
+    return getattr(settings, 'MONITOR_RETENTION', {})
+
+def _floor_hour(dt):
+    return dt.replace(minute=0, second=0, microsecond=0)
+
+def _slices(queryset, time_field, cutoff, max_rows):
+    """
+    Yields [start, end) time ranges covering every row older than cutoff,
+    oldest first, each holding at most max_rows rows (unless more rows share
+    one timestamp). Boundaries come from short index scans, so each slice is
+    a bounded range-delete and the write lock is only held briefly.
+    """
+    older = queryset.filter(**{f'{time_field}__lt': cutoff}).order_by(time_field)
+    start = older.values_list(time_field, flat=True).first()
+    while start is not None:
+        boundary = list(older.filter(**{f'{time_field}__gte': start}).values_list(time_field, flat=True)[max_rows:max_rows + 1])
+        if not boundary:
+            end = cutoff
+        elif boundary[0] > start:
+            end = boundary[0]
+        else:
+            end = start + timedelta(microseconds=1)
+        yield start, end
+        start = older.filter(**{f'{time_field}__gte': end}).values_list(time_field, flat=True).first()
+
+def _merge_into_rollups(bucket, rows):
+    """
+    Upserts aggregated rows ({'sensor_id', 'bucket_start', 'count', '<metric>_min/_max/_sum'})
+    into SensorReadingRollup, merging with any partial bucket already stored.
+    """
+    rows = list(rows)
+    if not rows:
+        return 0
+
+    existing = {
+        (r.sensor_id, r.bucket_start): r
+        for r in SensorReadingRollup.objects.filter(
+            bucket=bucket,
+            sensor_id__in={row['sensor_id'] for row in rows},
+            bucket_start__in={row['bucket_start'] for row in rows},
+        )
+    }
+
+    to_create, to_update = [], []
+    for row in rows:
+        rollup = existing.get((row['sensor_id'], row['bucket_start']))
+        if rollup is None:
+            rollup = SensorReadingRollup(sensor_id=row['sensor_id'], bucket=bucket, bucket_start=row['bucket_start'])
+            rollup.count = row['count']
+            for metric in METRICS:
+                for agg in ('min', 'max', 'sum'):
+                    setattr(rollup, f'{metric}_{agg}', row[f'{metric}_{agg}'])
+            to_create.append(rollup)
+            continue
+
+        rollup.count += row['count']
+        for metric in METRICS:
+            setattr(rollup, f'{metric}_min', min(getattr(rollup, f'{metric}_min'), row[f'{metric}_min']))
+            setattr(rollup, f'{metric}_max', max(getattr(rollup, f'{metric}_max'), row[f'{metric}_max']))
+            setattr(rollup, f'{metric}_sum', getattr(rollup, f'{metric}_sum') + row[f'{metric}_sum'])
+        to_update.append(rollup)
+
+    SensorReadingRollup.objects.bulk_create(to_create)
+    if to_update:
+        fields = ['count'] + [f'{m}_{agg}' for m in METRICS for agg in ('min', 'max', 'sum')]
+        SensorReadingRollup.objects.bulk_update(to_update, fields)
+    return len(rows)
+
+def compact_raw_readings(cutoff, slice_rows, pause=0.0, dry_run=False):
+    """
+    Tier 1: folds raw WaterSensor readings older than cutoff into hourly rollups,
+    one bounded time slice per transaction, and deletes the raw rows.
+    """
+    stats = RetentionStats('WaterSensor')
+    started = time.perf_counter()
+    for start, end in _slices(WaterSensor.objects.all(), 'timestamp', cutoff, slice_rows):
+        raw = WaterSensor.objects.filter(timestamp__gte=start, timestamp__lt=end)
+        if dry_run:
+            stats.rows_compacted += raw.count()
+            stats.slices += 1
+            continue
+        with transaction.atomic():
+            stats.rollups_written += _merge_into_rollups('1h', raw_buckets('1h', start, end))
+            deleted, _ = raw.delete()
+        stats.rows_compacted += deleted
+        stats.slices += 1
+        if pause:
+            time.sleep(pause)  # Let ingest take the write lock between slices
+    stats.seconds = time.perf_counter() - started
+    return stats
+
+def compact_hourly_rollups(cutoff, slice_rows, pause=0.0, dry_run=False):
+    """
+    Tier 2: folds hourly rollups older than cutoff into daily rollups, one bounded slice per transaction.
+    """
+    stats = RetentionStats('SensorReadingRollup (1h)')
+    started = time.perf_counter()
+    hourly = SensorReadingRollup.objects.filter(bucket='1h')
+    for start, end in _slices(hourly, 'bucket_start', cutoff, slice_rows):
+        day = hourly.filter(bucket_start__gte=start, bucket_start__lt=end)
+        if dry_run:
+            stats.rows_compacted += day.count()
+            stats.slices += 1
+            continue
+
+        aggregates = {'count': Sum('count')}
+        for metric in METRICS:
+            aggregates[f'{metric}_min'] = Min(f'{metric}_min')
+            aggregates[f'{metric}_max'] = Max(f'{metric}_max')
+            aggregates[f'{metric}_sum'] = Sum(f'{metric}_sum')
+        rows = (
+            day.annotate(day_start=TruncDay('bucket_start'))
+            .values('sensor_id', 'day_start')
+            .annotate(**aggregates)
+        )
+        with transaction.atomic():
+            merged = [dict(row, bucket_start=row['day_start']) for row in rows]
+            stats.rollups_written += _merge_into_rollups('1d', merged)
+            deleted, _ = day.delete()
+        stats.rows_compacted += deleted
+        stats.slices += 1
+        if pause:
+            time.sleep(pause)
+    stats.seconds = time.perf_counter() - started
+    return stats
+
+def delete_expired(model_name, cutoff, slice_rows, pause=0.0, dry_run=False):
+    """
+    Range-deletes rows of model_name older than cutoff, one time slice per transaction.
+    """
+    model = apps.get_model('monitor', model_name)
+    time_field = TIME_FIELDS[model_name]
+    stats = RetentionStats(model_name)
+    started = time.perf_counter()
+    for start, end in _slices(model.objects.all(), time_field, cutoff, slice_rows):
+        expired = model.objects.filter(**{f'{time_field}__gte': start, f'{time_field}__lt': end})
+        if dry_run:
+            stats.rows_deleted += expired.count()
+        else:
+            with transaction.atomic():
+                deleted, _ = expired.delete()
+            stats.rows_deleted += deleted
+        stats.slices += 1
+        if pause and not dry_run:
+            time.sleep(pause)
+    stats.seconds = time.perf_counter() - started
+    return stats
+
+def apply_policies(models=None, pause=0.0, dry_run=False, now=None):
+    """
+    Runs every configured retention policy.
+    Returns:
+        list: RetentionStats, one per tier that was processed
+    """
+    now = now or timezone.now()
+    results = []
+    for model_name, policy in get_policies().items():
+        if models and model_name not in models:
+            continue
+        slice_rows = policy.get('slice_rows', DEFAULT_SLICE_ROWS)
+
+        if model_name == 'WaterSensor':
+            if policy.get('raw_days') is not None:
+                cutoff = _floor_hour(now - timedelta(days=policy['raw_days']))
+                results.append(compact_raw_readings(cutoff, slice_rows, pause, dry_run))
+            if policy.get('hourly_days') is not None:
+                cutoff = (now - timedelta(days=policy['hourly_days'])).replace(hour=0, minute=0, second=0, microsecond=0)
+                results.append(compact_hourly_rollups(cutoff, slice_rows, pause, dry_run))
+            if policy.get('daily_days') is not None:
+                cutoff = now - timedelta(days=policy['daily_days'])
+                expired = SensorReadingRollup.objects.filter(bucket='1d', bucket_start__lt=cutoff)
+                stats = RetentionStats('SensorReadingRollup (1d)')
+                stats.rows_deleted = expired.count() if dry_run else expired.delete()[0]
+                results.append(stats)
+        elif policy.get('raw_days') is not None:
+            cutoff = now - timedelta(days=policy['raw_days'])
+            results.append(delete_expired(model_name, cutoff, slice_rows, pause, dry_run))
+    return results
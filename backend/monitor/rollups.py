@@ -0,0 +1,139 @@
+from django.db import transaction
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from .models import DashboardRollup, SatelliteImage, WaterSensor, HealthReport
+
+# Size of the rolling windows the dashboard looks at
+SENSOR_WINDOW = 10
+REPORT_WINDOW = 10
+
+ROLLUP_PK = 1
+
+# Writers never lock or read the rollup row: counters change with F() expressions and
+# the latest satellite scan with a conditional UPDATE, so concurrent writers (including
+# bulk ingest) do not queue up behind one another. The "newest N" flag windows are
+# not stored; they are read through the timestamp indexes (LIMIT N) when the
+# dashboard is served, which also keeps them right after readings are edited.
+
+def _update(queryset=None, **fields):
+    # update() skips auto_now fields
+    if queryset is None:
+        queryset = DashboardRollup.objects.filter(pk=ROLLUP_PK)
+    return queryset.update(updated_at=timezone.now(), **fields)
+
+def _stored(rollup):
+    return {name: getattr(rollup, name) for name in ('health_report_count', 'latest_satellite_id', 'latest_satellite_risk')}
+
+def _create_rollup():
+    """
+    Inserts the rollup row built from the raw tables.
+    Returns (row, created); created is False if a concurrent writer inserted it first.
+    """
+    return DashboardRollup.objects.get_or_create(pk=ROLLUP_PK, defaults=_stored(compute_rollup()))
+
+def _write(queryset=None, **fields):
+    if _update(queryset, **fields):
+        return
+    # First write ever: build the row from the raw tables (this write is already included).
+    # If another first write inserted it meanwhile, apply this change to that row instead.
+    _, created = _create_rollup()
+    if not created:
+        _update(queryset, **fields)
+
+def recent_flags(rollup):
+    """
+    Attaches recent_sensor_flags / recent_report_flags ([id, flag] in id order) to a rollup.
+    """
+    recent_sensors = WaterSensor.objects.order_by('-timestamp', '-id').only('id', 'ph', 'turbidity')[:SENSOR_WINDOW]
+    recent_reports = HealthReport.objects.order_by('-submitted_at', '-id').only('id', 'severity')[:REPORT_WINDOW]
+    rollup.recent_sensor_flags = sorted([s.id, s.is_critical] for s in recent_sensors)
+    rollup.recent_report_flags = sorted([h.id, h.is_severe] for h in recent_reports)
+    return rollup
+
+def compute_rollup():
+    """
+    Builds the rollup from the raw tables (used on first use and by rebuild_rollups).
+    """
+    recent_sat = SatelliteImage.objects.exclude(risk_score=None).order_by('-captured_at', '-id').first()
+    return recent_flags(DashboardRollup(
+        pk=ROLLUP_PK,
+        health_report_count=HealthReport.objects.count(),
+        latest_satellite_id=recent_sat.id if recent_sat else None,
+        latest_satellite_risk=recent_sat.risk_score if recent_sat else 0,
+    ))
+
+def record_health_report(report):
+    _write(health_report_count=F('health_report_count') + 1)
+
+def forget_health_report(report):
+    _write(health_report_count=Greatest(F('health_report_count') - 1, 0))
+
+def record_satellite_image(image):
+    # Images are saved once on upload and again once analysis fills in the scores
+    if image.risk_score is None:
+        return
+    newer = DashboardRollup.objects.filter(pk=ROLLUP_PK).filter(
+        Q(latest_satellite_id__isnull=True) | Q(latest_satellite_id__lte=image.id)
+    )
+    _write(newer, latest_satellite_id=image.id, latest_satellite_risk=image.risk_score)
+
+def forget_satellite_image(image):
+    recent_sat = SatelliteImage.objects.exclude(risk_score=None).exclude(pk=image.id).order_by('-captured_at', '-id').first()
+    _update(
+        DashboardRollup.objects.filter(pk=ROLLUP_PK, latest_satellite_id=image.id),
+        latest_satellite_id=recent_sat.id if recent_sat else None,
+        latest_satellite_risk=recent_sat.risk_score if recent_sat else 0,
+    )
+
+def rebuild():
+    """
+    Recomputes the rollup from the raw tables.
+    Returns:
+        tuple: (stored rollup before the rebuild or None, rebuilt rollup)
+    """
+    with transaction.atomic():
+        previous = DashboardRollup.objects.select_for_update().filter(pk=ROLLUP_PK).first()
+        rebuilt = compute_rollup()
+        DashboardRollup.objects.update_or_create(pk=ROLLUP_PK, defaults=_stored(rebuilt))
+    return previous, rebuilt
+
+def snapshot():
+    rollup = DashboardRollup.objects.filter(pk=ROLLUP_PK).first()
+    if rollup is None:
+        rollup, _ = _create_rollup()
+    return recent_flags(rollup)
+
+def dashboard_payload(rollup, outbreak_clusters=0):
+    """
+    Turns a rollup (plus the current hot cluster count, see monitor.clusters)
+    into the dashboard-stats response.
+    """
+    sat_risk = rollup.latest_satellite_risk
+    sensor_issues = sum(1 for _, critical in rollup.recent_sensor_flags if critical)
+    health_issues = sum(1 for _, severe in rollup.recent_report_flags if severe)
+
+    # Determine Overall Status
+    overall_status = "LOW"
+    status_color = "text-green-400"
+    status_message = "Systems Nominal"
+
+    # Severe reports only raise the level on their own; an escalation needs a spatial cluster
+    if sat_risk > 70 or sensor_issues > 2 or outbreak_clusters > 0:
+        overall_status = "CRITICAL"
+        status_color = "text-red-500"
+        status_message = "Immediate Action Required"
+    elif sat_risk > 40 or sensor_issues > 0 or health_issues > 0:
+        overall_status = "MODERATE"
+        status_color = "text-yellow-400"
+        status_message = "Elevated Risk Detected"
+
+    return {
+        "overallRisk": overall_status,
+        "statusMessage": status_message,
+        "statusColor": status_color,
+        "satelliteAlerts": 1 if sat_risk > 50 else 0,
+        "sensorAnomalies": sensor_issues,
+        "healthReports": rollup.health_report_count,
+        "outbreakClusters": outbreak_clusters,
+    }
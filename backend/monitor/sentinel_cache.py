@@ -0,0 +1,115 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+class ImageryCache:
+    """
+    Content-addressed on-disk cache for Sentinel Hub imagery.
+
+    Entries are named by the sha256 of the request that produced them. The file
+    mtime is the write time (TTL) and the atime is bumped on every hit (LRU), so
+    no index has to be kept in sync; several processes can share one directory.
+
+    Each process keeps a running total of the directory size: the first put scans
+    the directory, later puts only add their own size. evict() rescans when the
+    total goes over max_bytes, or after SCAN_INTERVAL seconds so that expired
+    entries and other processes' writes are picked up.
+    """
+    SCAN_INTERVAL = 600
+
+    def __init__(self, directory, ttl, max_bytes):
+        self.directory = str(directory)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total = None  # bytes as of the last scan plus puts since; None until the first scan
+        self._scanned_at = 0.0
+
+    @staticmethod
+    def key(bbox, time_range, evalscript, size):
+        request = json.dumps(
+            {'bbox': list(bbox), 'time_range': list(time_range), 'evalscript': evalscript.strip(), 'size': list(size)},
+            sort_keys=True,
+        )
+        return hashlib.sha256(request.encode()).hexdigest()
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            stat = os.stat(path)
+            if time.time() - stat.st_mtime > self.ttl:
+                os.remove(path)
+                self._add(-stat.st_size)
+                return None
+            with open(path, 'rb') as f:
+                data = f.read()
+            # Explicit atime bump: many filesystems are mounted noatime/relatime
+            os.utime(path, (time.time(), stat.st_mtime))
+            return data
+        except FileNotFoundError:
+            return None
+
+    def put(self, key, data):
+        os.makedirs(self.directory, exist_ok=True)
+        # Write then rename so readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        path = self._path(key)
+        try:
+            replaced = os.stat(path).st_size
+        except FileNotFoundError:
+            replaced = 0
+        os.replace(tmp_path, path)
+        self._add(len(data) - replaced)
+        with self._lock:
+            due = (self._total is None or self._total > self.max_bytes
+                   or time.time() - self._scanned_at > self.SCAN_INTERVAL)
+        if due:
+            self.evict()
+
+    def _add(self, size):
+        with self._lock:
+            if self._total is not None:
+                self._total += size
+
+    def evict(self):
+        """
+        Drops expired entries, then the least recently used until the cache fits in max_bytes.
+        """
+        with self._lock:
+            now = time.time()
+            entries = []
+            total = 0
+            for entry in os.scandir(self.directory):
+                if not entry.name.endswith('.png'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                if now - stat.st_mtime > self.ttl:
+                    _remove(entry.path)
+                    continue
+                entries.append((stat.st_atime, stat.st_size, entry.path))
+                total += stat.st_size
+
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                _remove(path)
+                total -= size
+            self._total = total
+            self._scanned_at = now
+
+    def _path(self, key):
+        return os.path.join(self.directory, f'{key}.png')
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass  # Evicted by another process
@@ -1,11 +1,78 @@
+import io
 import requests
 import os
+import threading
+import numpy as np
+from PIL import Image
 from django.conf import settings
+from requests.adapters import HTTPAdapter
 from .models import SatelliteImage
-from .utils import analyze_water_image
+from .sentinel_cache import ImageryCache
 from django.core.files.base import ContentFile
 import time
 
+# Evalscript to get True Color (RGB)
+TRUE_COLOR_EVALSCRIPT = """
+//VERSION=3
+function setup() {
+  return {
+    input: ["B04", "B03", "B02"],
+    output: { bands: 3 }
+  };
+}
+
+function evaluatePixel(sample) {
+  return [2.5 * sample.B04, 2.5 * sample.B03, 2.5 * sample.B02];
+}
+"""
+
+DEFAULT_TIME_RANGE = ("2024-01-01T00:00:00Z", "2024-02-14T23:59:59Z")  # Adjust dynamically in production
+
+class SentinelRateLimited(Exception):
+    """
+    Raised on HTTP 429; retry_after is the server's Retry-After in seconds (None if absent).
+    """
+    def __init__(self, retry_after=None):
+        super().__init__(f"Sentinel Hub rate limit hit (retry after {retry_after}s)")
+        self.retry_after = retry_after
+
+def simulated_scene(width=512, height=512):
+    """
+    Synthetic RGB water scene with algae (green) and turbidity (brown) blobs,
+    used when no Sentinel Hub credentials are configured.
+    """
+    # Create a random noise image with some "water blue" and "algae green"
+    # Base blue water
+    data = np.zeros((height, width, 3), dtype=np.uint8)
+    data[:, :] = [0, 100, 200] # Blue (RGB somewhat)
+    
+    # Add some "Algae" (Green) blobs
+    for _ in range(10):
+        cx, cy = np.random.randint(0, width), np.random.randint(0, height)
+        radius = np.random.randint(20, 100)
+        y, x = np.ogrid[-cy:height-cy, -cx:width-cx]
+        mask = x*x + y*y <= radius*radius
+        data[mask] = [34, 139, 34] # Forest Green
+
+    # Add some "Turbidity" (Brown) blobs
+    for _ in range(5):
+        cx, cy = np.random.randint(0, width), np.random.randint(0, height)
+        radius = np.random.randint(20, 80)
+        y, x = np.ogrid[-cy:height-cy, -cx:width-cx]
+        mask = x*x + y*y <= radius*radius
+        data[mask] = [139, 69, 19] # Saddle Brown
+
+    return data
+
+def bbox_fields(bbox):
+    min_lon, min_lat, max_lon, max_lat = bbox
+    return {'min_lon': min_lon, 'min_lat': min_lat, 'max_lon': max_lon, 'max_lat': max_lat}
+
+def encode_png(data):
+    buffer = io.BytesIO()
+    Image.fromarray(data, 'RGB').save(buffer, format='PNG')
+    return buffer.getvalue()
+
 class SentinelService:
     # ------------------------------------------------------------------
     # TODO: REPLACE THESE PLACEHOLDERS WITH YOUR ACTUAL SENTINEL HUB KEYS
@@ -14,156 +81,157 @@ class SentinelService:
     CLIENT_ID = os.environ.get('SENTINEL_CLIENT_ID', 'YOUR_CLIENT_ID_HERE')
     CLIENT_SECRET = os.environ.get('SENTINEL_CLIENT_SECRET', 'YOUR_CLIENT_SECRET_HERE')
     
-    TOKEN_URL = "https://services.sentinel-hub.com/oauth/token"
-    PROCESS_URL = "https://services.sentinel-hub.com/api/v1/process"
+    TOKEN_PATH = "/oauth/token"
+    PROCESS_PATH = "/api/v1/process"
+
+    # Refresh the token this many seconds before Sentinel Hub says it expires
+    TOKEN_EXPIRY_MARGIN = 60
+
+    _session = None
+    _cache = None
+    _token = None
+    _token_expires_at = 0.0
+    _lock = threading.Lock()
+    _token_lock = threading.Lock()
 
     @classmethod
-    def get_token(cls):
-        if cls.CLIENT_ID == 'YOUR_CLIENT_ID_HERE':
-            print("WARNING: Sentinel Hub Client ID not set. Using mock data path.")
-            return None
-            
-        data = {
-            "grant_type": "client_credentials",
-            "client_id": cls.CLIENT_ID,
-            "client_secret": cls.CLIENT_SECRET
-        }
-        try:
-            response = requests.post(cls.TOKEN_URL, data=data)
-            response.raise_for_status()
-            return response.json()['access_token']
-        except Exception as e:
-            print(f"Failed to get Sentinel token: {e}")
-            return None
+    def is_configured(cls):
+        return cls.CLIENT_ID != 'YOUR_CLIENT_ID_HERE'
 
     @classmethod
-    def fetch_satellite_image(cls, bbox, location_name="Target Area"):
+    def session(cls):
         """
-        Fetches an image from Sentinel-2 for the given Bounding Box (bbox).
-        bbox format: [min_lon, min_lat, max_lon, max_lat]
+        Shared requests.Session, so TLS connections to Sentinel Hub are reused across fetches.
         """
-        token = cls.get_token()
-        
-        # MOCK FALLBACK if no token (so the app doesn't crash during demo)
-        if not token:
-            print("Simulating Sentinel Fetch...")
-            # Generate a synthetic image (Simulating a water body)
-            import numpy as np
-            from PIL import Image
-            import io
-            
-            # Create a random noise image with some "water blue" and "algae green"
-            width, height = 512, 512
-            # Base blue water
-            data = np.zeros((height, width, 3), dtype=np.uint8)
-            data[:, :] = [0, 100, 200] # Blue (RGB somewhat)
-            
-            # Add some "Algae" (Green) blobs
-            for _ in range(10):
-                cx, cy = np.random.randint(0, width), np.random.randint(0, height)
-                radius = np.random.randint(20, 100)
-                y, x = np.ogrid[-cy:height-cy, -cx:width-cx]
-                mask = x*x + y*y <= radius*radius
-                data[mask] = [34, 139, 34] # Forest Green
-
-            # Add some "Turbidity" (Brown) blobs
-            for _ in range(5):
-                cx, cy = np.random.randint(0, width), np.random.randint(0, height)
-                radius = np.random.randint(20, 80)
-                y, x = np.ogrid[-cy:height-cy, -cx:width-cx]
-                mask = x*x + y*y <= radius*radius
-                data[mask] = [139, 69, 19] # Saddle Brown
-
-            img = Image.fromarray(data, 'RGB')
-            
-            # Save to buffer
-            buffer = io.BytesIO()
-            img.save(buffer, format='PNG')
-            
-            # Save to Django Model
-            file_name = f"simulated_sentinel_{location_name.replace(' ', '_')}_{int(time.time())}.png"
-            image_content = ContentFile(buffer.getvalue(), name=file_name)
-            
-            instance = SatelliteImage(location_name=f"[SIM] {location_name}")
-            instance.image.save(file_name, image_content)
-            instance.save()
-            
-            # Run analysis
-            analysis = analyze_water_image(instance.image.path)
-            instance.chlorophyll_index = analysis['chlorophyll_index']
-            instance.turbidity_index = analysis['turbidity_index']
-            instance.risk_score = analysis['risk_score']
-            instance.save()
-            
-            return instance
-
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json",
-            "Accept": "image/png"
-        }
+        with cls._lock:
+            if cls._session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=2, pool_maxsize=16)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                cls._session = session
+            return cls._session
 
-        # Evalscript to get True Color (RGB)
-        evalscript = """
-        //VERSION=3
-        function setup() {
-          return {
-            input: ["B04", "B03", "B02"],
-            output: { bands: 3 }
-          };
-        }
+    @classmethod
+    def cache(cls):
+        config = settings.SENTINEL_HUB
+        with cls._lock:
+            if cls._cache is None or cls._cache.directory != str(config['CACHE_DIR']):
+                cls._cache = ImageryCache(config['CACHE_DIR'], config['CACHE_TTL'], config['CACHE_MAX_BYTES'])
+            return cls._cache
 
-        function evaluatePixel(sample) {
-          return [2.5 * sample.B04, 2.5 * sample.B03, 2.5 * sample.B02];
-        }
+    @classmethod
+    def get_token(cls):
+        if not cls.is_configured():
+            print("WARNING: Sentinel Hub Client ID not set. Using mock data path.")
+            return None
+
+        # Reuse the cached token until it is about to expire. The lock is held across the
+        # request so concurrent fetches (see monitor.sweep) wait for one token instead of each getting their own.
+        with cls._token_lock:
+            if cls._token and time.time() < cls._token_expires_at:
+                return cls._token
+
+            data = {
+                "grant_type": "client_credentials",
+                "client_id": cls.CLIENT_ID,
+                "client_secret": cls.CLIENT_SECRET
+            }
+            try:
+                response = cls.session().post(cls._url(cls.TOKEN_PATH), data=data, timeout=settings.SENTINEL_HUB['TIMEOUT'])
+                response.raise_for_status()
+                body = response.json()
+            except Exception as e:
+                print(f"Failed to get Sentinel token: {e}")
+                return None
+
+            cls._token = body['access_token']
+            cls._token_expires_at = time.time() + body.get('expires_in', 3600) - cls.TOKEN_EXPIRY_MARGIN
+            return cls._token
+
+    @classmethod
+    def invalidate_token(cls):
+        with cls._token_lock:
+            cls._token = None
+            cls._token_expires_at = 0.0
+
+    @classmethod
+    def fetch_imagery_bytes(cls, bbox, time_range=DEFAULT_TIME_RANGE, size=(512, 512), evalscript=TRUE_COLOR_EVALSCRIPT):
         """
+        Returns the PNG bytes for bbox from the Process API, served from the on-disk
+        cache when the same request was made within CACHE_TTL.
+        Raises SentinelRateLimited on HTTP 429, and on other HTTP or authentication errors.
+        """
+        cache = cls.cache()
+        key = ImageryCache.key(bbox, time_range, evalscript, size)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
 
         payload = {
             "input": {
                 "bounds": {
-                    "bbox": bbox,
+                    "bbox": list(bbox),
                     "properties": { "crs": "http://www.opengis.net/def/crs/EPSG/0/4326" }
                 },
                 "data": [{
                     "type": "sentinel-2-l2a",
                     "dataFilter": {
                         "timeRange": {
-                            "from": "2024-01-01T00:00:00Z",
-                            "to": "2024-02-14T23:59:59Z"  # Adjust dynamically in production
+                            "from": time_range[0],
+                            "to": time_range[1]
                         },
                         "mosaickingOrder": "leastCC" # Least cloud cover
                     }
                 }]
             },
             "output": {
-                "width": 512,
-                "height": 512,
+                "width": size[0],
+                "height": size[1],
                 "responses": [{ "identifier": "default", "format": { "type": "image/png" } }]
             },
             "evalscript": evalscript
         }
 
-        try:
-            response = requests.post(cls.PROCESS_URL, headers=headers, json=payload)
-            response.raise_for_status()
-            
-            # Save the image to Django Model
+        response = None
+        for attempt in range(2):
+            token = cls.get_token()
+            if not token:
+                raise RuntimeError("Could not obtain a Sentinel Hub token")
+            headers = {
+                "Authorization": f"Bearer {token}",
+                "Content-Type": "application/json",
+                "Accept": "image/png"
+            }
+            response = cls.session().post(
+                cls._url(cls.PROCESS_PATH), headers=headers, json=payload, timeout=settings.SENTINEL_HUB['TIMEOUT']
+            )
+            if response.status_code == 429:
+                retry_after = response.headers.get('Retry-After')
+                raise SentinelRateLimited(float(retry_after) if retry_after else None)
+            if response.status_code != 401:
+                break
+            # Token revoked or expired early; fetch a new one once
+            cls.invalidate_token()
+        response.raise_for_status()
+
+        cache.put(key, response.content)
+        return response.content
+
+    @classmethod
+    def _url(cls, path):
+        return settings.SENTINEL_HUB['BASE_URL'].rstrip('/') + path
+
+    @classmethod
+    def store_image(cls, content, analysis, bbox, location_name="Target Area", simulated=False):
+        """
+        Saves fetched PNG bytes and their analysis as one SatelliteImage (single INSERT, scores included).
+        """
+        if simulated:
+            file_name = f"simulated_sentinel_{location_name.replace(' ', '_')}_{int(time.time())}.png"
+            location_name = f"[SIM] {location_name}"
+        else:
             file_name = f"sentinel_{location_name.replace(' ', '_')}.png"
-            image_content = ContentFile(response.content, name=file_name)
-            
-            instance = SatelliteImage(location_name=location_name)
-            instance.image.save(file_name, image_content)
-            instance.save()
-            
-            # Run our OpenCV analysis on this new image
-            analysis = analyze_water_image(instance.image.path)
-            instance.chlorophyll_index = analysis['chlorophyll_index']
-            instance.turbidity_index = analysis['turbidity_index']
-            instance.risk_score = analysis['risk_score']
-            instance.save()
-            
-            return instance
-
-        except Exception as e:
-            print(f"Error fetching from Sentinel: {e}")
-            return None
+        instance = SatelliteImage(location_name=location_name, **analysis, **bbox_fields(bbox))
+        instance.image.save(file_name, ContentFile(content, name=file_name))
+        return instance
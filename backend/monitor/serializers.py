@@ -1,10 +1,17 @@
 from rest_framework import serializers
-from .models import SatelliteImage, WaterSensor, HealthReport
+from .models import SatelliteImage, WaterSensor, HealthReport, AnalysisJob
 
 class SatelliteImageSerializer(serializers.ModelSerializer):
     class Meta:
         model = SatelliteImage
         fields = '__all__'
+        # Scores are filled in by the analysis worker
+        read_only_fields = ['chlorophyll_index', 'turbidity_index', 'risk_score']
+
+class AnalysisJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AnalysisJob
+        fields = '__all__'
 
 class WaterSensorSerializer(serializers.ModelSerializer):
     status = serializers.SerializerMethodField()
@@ -12,12 +19,10 @@ class WaterSensorSerializer(serializers.ModelSerializer):
     class Meta:
         model = WaterSensor
         fields = '__all__'
+        read_only_fields = ['potability']
 
     def get_status(self, obj):
-        # WHO Standards: pH 6.5-8.5, Turbidity < 5 NTU
-        if obj.ph < 6.5 or obj.ph > 8.5 or obj.turbidity > 5.0:
-            return "CRITICAL"
-        return "SAFE"
+        return "CRITICAL" if obj.is_critical else "SAFE"
 
 class HealthReportSerializer(serializers.ModelSerializer):
     class Meta:
@@ -0,0 +1,59 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+from .models import SatelliteImage, WaterSensor, HealthReport
+from . import clusters, rollups
+from .scoring import SENSOR_FEATURES, scorer
+from .stream import hub
+
+# Keep the dashboard rollup current on every single-row write, wake the live stream
+# and queue new or edited sensor readings for potability scoring.
+# Bulk ingestion bypasses these signals and does both itself (see monitor.ingest).
+
+@receiver(post_save, sender=WaterSensor)
+def sensor_saved(sender, instance, created, update_fields=None, **kwargs):
+    # Edits (PUT/PATCH) change the dashboard's critical flags and may change the score.
+    # The dashboard window is read live, so both cases only need a push and a rescore.
+    transaction.on_commit(hub.notify)
+    if created or update_fields is None or set(update_fields) & set(SENSOR_FEATURES):
+        transaction.on_commit(lambda: scorer.submit([instance]))
+
+# The fields that place a report in its cluster bucket, and its weight there
+CLUSTER_FIELDS = ['latitude', 'longitude', 'symptom_type', 'severity', 'submitted_at']
+
+@receiver(pre_save, sender=HealthReport)
+def health_report_saving(sender, instance, update_fields=None, **kwargs):
+    # Edits can move a report to another cluster bucket: keep the values it was counted with
+    instance._counted_as = None
+    if instance._state.adding or (update_fields is not None and not set(update_fields) & set(CLUSTER_FIELDS)):
+        return
+    counted = HealthReport.objects.filter(pk=instance.pk).values(*CLUSTER_FIELDS).first()
+    if counted:
+        instance._counted_as = HealthReport(**counted)
+
+@receiver(post_save, sender=HealthReport)
+def health_report_saved(sender, instance, created, **kwargs):
+    if created:
+        rollups.record_health_report(instance)
+        clusters.record_report(instance)
+        transaction.on_commit(hub.notify)
+    elif getattr(instance, '_counted_as', None):
+        clusters.move_report(instance._counted_as, instance)
+        instance._counted_as = None
+        transaction.on_commit(hub.notify)
+
+@receiver(post_delete, sender=HealthReport)
+def health_report_deleted(sender, instance, **kwargs):
+    rollups.forget_health_report(instance)
+    clusters.forget_report(instance)
+    transaction.on_commit(hub.notify)
+
+@receiver(post_save, sender=SatelliteImage)
+def satellite_image_saved(sender, instance, **kwargs):
+    rollups.record_satellite_image(instance)
+    transaction.on_commit(hub.notify)
+
+@receiver(post_delete, sender=SatelliteImage)
+def satellite_image_deleted(sender, instance, **kwargs):
+    rollups.forget_satellite_image(instance)
+    transaction.on_commit(hub.notify)
@@ -0,0 +1,81 @@
+import math
+from datetime import timedelta
+from django.db.models import ExpressionWrapper, F, FloatField, IntegerField, OuterRef, Subquery, Value
+from . import geo
+from .models import HealthReport
+
+# Hard cap on rows returned by reports_within, whatever limit the caller asks for
+MAX_RESULTS = 5000
+# reports_within ranks candidates in SQL by an approximate distance and checks the
+# nearest limit * CANDIDATE_FACTOR exactly, which absorbs the approximation's error
+CANDIDATE_FACTOR = 2
+
+class _SubqueryCount(Subquery):
+    template = "(SELECT COUNT(*) FROM (%(subquery)s) _count)"
+    output_field = IntegerField()
+
+def reports_in_bbox(bbox, queryset=None):
+    """
+    HealthReports inside [min_lon, min_lat, max_lon, max_lat].
+    Served by health_lat_lon_idx: one latitude range scan, longitude checked in the index.
+    """
+    min_lon, min_lat, max_lon, max_lat = bbox
+    queryset = HealthReport.objects.all() if queryset is None else queryset
+    return queryset.filter(
+        latitude__gte=min_lat, latitude__lte=max_lat,
+        longitude__gte=min_lon, longitude__lte=max_lon,
+    )
+
+def reports_within(lat, lon, radius_km, queryset=None, limit=None):
+    """
+    HealthReports within radius_km of (lat, lon), nearest first, at most
+    limit (capped at MAX_RESULTS).
+    The database orders the bbox candidates by squared degree distance, with longitude
+    scaled by cos(lat), and returns only the nearest limit * CANDIDATE_FACTOR; those
+    are then filtered and sorted by exact haversine distance.
+    Returns:
+        list: [(report, distance_km), ...]
+    """
+    limit = min(limit or MAX_RESULTS, MAX_RESULTS)
+    lon_scale = math.cos(math.radians(lat))
+    d_lat = F('latitude') - Value(lat)
+    d_lon = (F('longitude') - Value(lon)) * Value(lon_scale)
+    candidates = reports_in_bbox(geo.bbox_around(lat, lon, radius_km), queryset).annotate(
+        approx_distance=ExpressionWrapper(d_lat * d_lat + d_lon * d_lon, output_field=FloatField()),
+    ).order_by('approx_distance', 'id')[:limit * CANDIDATE_FACTOR]
+    matches = []
+    for report in candidates:
+        distance = geo.haversine_km(lat, lon, report.latitude, report.longitude)
+        if distance <= radius_km:
+            matches.append((report, distance))
+    matches.sort(key=lambda match: match[1])
+    return matches[:limit]
+
+def expand_bbox(bbox, radius_km):
+    """
+    Grows bbox by radius_km on every side.
+    """
+    min_lon, min_lat, max_lon, max_lat = bbox
+    # Degrees of longitude per km grow towards the poles, so size the margin at the edge nearest one
+    edge_lat = min_lat if abs(min_lat) > abs(max_lat) else max_lat
+    dlon = geo.bbox_around(edge_lat, 0.0, radius_km)[2]
+    dlat = geo.bbox_around(0.0, 0.0, radius_km)[3]
+    return [max(min_lon - dlon, -180.0), max(min_lat - dlat, -90.0), min(max_lon + dlon, 180.0), min(max_lat + dlat, 90.0)]
+
+def correlate_scans(images, days=7):
+    """
+    Annotates SatelliteImages that have a bbox with the health reports filed inside
+    it within +/- days of the scan: report_count and max_severity. Runs as one query
+    (a correlated subquery per scan on health_lat_lon_idx), not an N x M scan.
+    """
+    window = timedelta(days=days)
+    reports = HealthReport.objects.filter(
+        latitude__gte=OuterRef('min_lat'), latitude__lte=OuterRef('max_lat'),
+        longitude__gte=OuterRef('min_lon'), longitude__lte=OuterRef('max_lon'),
+        submitted_at__gte=OuterRef('captured_at') - window,
+        submitted_at__lte=OuterRef('captured_at') + window,
+    ).order_by()
+    return images.filter(min_lon__isnull=False).annotate(
+        report_count=_SubqueryCount(reports.values('id')),
+        max_severity=Subquery(reports.order_by('-severity').values('severity')[:1]),
+    )
@@ -0,0 +1,148 @@
+import asyncio
+import json
+from asgiref.sync import sync_to_async
+from .models import WaterSensor
+from .serializers import WaterSensorSerializer
+from . import clusters, rollups
+
+class SensorStreamHub:
+    """
+    Pushes new WaterSensor rows and dashboard status changes to every
+    connected client as Server-Sent Events.
+
+    Each process runs a single tail over the sensor table and fans the
+    rows out to per-client queues, so database load follows the write
+    rate instead of the number of viewers. Writes made in this process
+    wake the tail immediately (see notify); writes from other processes,
+    such as start_simulation, are picked up on the next poll.
+    """
+    POLL_INTERVAL = 1.0      # seconds between tail queries when idle
+    KEEPALIVE_INTERVAL = 15  # seconds between SSE comments on a quiet stream
+    FETCH_LIMIT = 500        # rows per tail query
+    REPLAY_LIMIT = 1000      # newest rows replayed to a reconnecting client
+    QUEUE_SIZE = 1000        # buffered events per client before it is dropped
+
+    def __init__(self):
+        self._subscribers = set()
+        self._loop = None
+        self._wake = None
+        self._task = None
+        self._last_id = 0
+        self._dashboard = None
+
+    def notify(self):
+        """
+        Wakes the tail after a write. Safe to call from any thread.
+        """
+        loop, wake = self._loop, self._wake
+        if loop is None or wake is None:
+            return
+        try:
+            loop.call_soon_threadsafe(wake.set)
+        except RuntimeError:
+            pass  # Event loop already closed
+
+    async def subscribe(self, last_event_id=None):
+        """
+        Async generator of SSE frames for one client.
+        If last_event_id is given, readings after it are replayed first.
+        """
+        queue = asyncio.Queue(maxsize=self.QUEUE_SIZE)
+        self._subscribers.add(queue)
+        self._ensure_running()
+        try:
+            replayed_id = last_event_id or 0
+            if last_event_id is not None:
+                rows = await sync_to_async(_newest_readings_after)(last_event_id, self.REPLAY_LIMIT)
+                for row in rows:
+                    yield _frame('reading', row, event_id=row['id'])
+                if rows:
+                    replayed_id = rows[-1]['id']
+
+            dashboard = self._dashboard or await sync_to_async(_dashboard_payload)()
+            yield _frame('dashboard', dashboard)
+
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=self.KEEPALIVE_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if event is None:
+                    # Client fell too far behind; it will reconnect with Last-Event-ID and replay
+                    return
+                kind, data = event
+                if kind == 'reading':
+                    if data['id'] <= replayed_id:
+                        continue
+                    yield _frame(kind, data, event_id=data['id'])
+                else:
+                    yield _frame(kind, data)
+        finally:
+            self._subscribers.discard(queue)
+
+    def _ensure_running(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._wake = asyncio.Event()
+            self._task = None
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._tail())
+
+    def _broadcast(self, event):
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self._subscribers.discard(queue)
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+
+    async def _tail(self):
+        self._last_id = await sync_to_async(_latest_reading_id)()
+        self._dashboard = await sync_to_async(_dashboard_payload)()
+
+        while self._subscribers:
+            self._wake.clear()
+            rows = await sync_to_async(_readings_after)(self._last_id, self.FETCH_LIMIT)
+            for row in rows:
+                self._broadcast(('reading', row))
+            if rows:
+                self._last_id = rows[-1]['id']
+
+            dashboard = await sync_to_async(_dashboard_payload)()
+            if dashboard != self._dashboard:
+                self._dashboard = dashboard
+                self._broadcast(('dashboard', dashboard))
+
+            if len(rows) < self.FETCH_LIMIT:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=self.POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+
+def _frame(event, data, event_id=None):
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
+
+def _latest_reading_id():
+    return WaterSensor.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+def _readings_after(last_id, limit):
+    rows = WaterSensor.objects.filter(id__gt=last_id).order_by('id')[:limit]
+    return WaterSensorSerializer(rows, many=True).data
+
+def _newest_readings_after(last_id, limit):
+    rows = WaterSensor.objects.filter(id__gt=last_id).order_by('-id')[:limit]
+    return WaterSensorSerializer(reversed(list(rows)), many=True).data
+
+def _dashboard_payload():
+    return rollups.dashboard_payload(rollups.snapshot(), clusters.hot_cluster_count())
+
+hub = SensorStreamHub()
@@ -0,0 +1,184 @@
+import math
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from django.core.files.base import ContentFile
+from .models import SatelliteImage
+from .sentinel_service import SentinelService, SentinelRateLimited, simulated_scene, encode_png, bbox_fields
+from .utils import analyze_image_array, analyze_image_bytes
+
+DEFAULT_STEP = 0.1          # tile edge in degrees (~11 km)
+DEFAULT_CONCURRENCY = 8     # simultaneous Process API requests per sweep
+MAX_CONCURRENCY = 32        # ... and across all sweeps running in this process
+MAX_REGIONS = 500           # per sweep
+MAX_GRID_TILES = 50_000     # tiles considered while clipping a polygon
+MAX_RETRIES = 5             # rate-limit retries per region
+BACKOFF_BASE = 1.0          # seconds; doubled per retry when no Retry-After is sent
+BACKOFF_CAP = 60.0
+
+# Held for the duration of each Process API request, so concurrent sweep jobs
+# (one per worker thread) share the MAX_CONCURRENCY budget instead of each using it
+_requests_in_flight = threading.BoundedSemaphore(MAX_CONCURRENCY)
+
+def validate_bbox(bbox):
+    if len(bbox) != 4:
+        raise ValueError(f"Invalid bbox {bbox}: expected [min_lon, min_lat, max_lon, max_lat]")
+    min_lon, min_lat, max_lon, max_lat = [float(v) for v in bbox]
+    if not (-180 <= min_lon < max_lon <= 180 and -90 <= min_lat < max_lat <= 90):
+        raise ValueError(f"Invalid bbox {bbox}: expected [min_lon, min_lat, max_lon, max_lat]")
+    return [min_lon, min_lat, max_lon, max_lat]
+
+def tile_bbox(bbox, step=DEFAULT_STEP):
+    """
+    Splits [min_lon, min_lat, max_lon, max_lat] into step x step degree tiles
+    (edge tiles are clipped to the bbox).
+    """
+    if step <= 0:
+        raise ValueError("step must be positive")
+    min_lon, min_lat, max_lon, max_lat = validate_bbox(bbox)
+    if math.ceil((max_lon - min_lon) / step) * math.ceil((max_lat - min_lat) / step) > MAX_GRID_TILES:
+        raise ValueError(f"step {step} splits the area into more than {MAX_GRID_TILES} tiles")
+    tiles = []
+    lat = min_lat
+    while lat < max_lat:
+        lon = min_lon
+        while lon < max_lon:
+            tiles.append([round(lon, 6), round(lat, 6), round(min(lon + step, max_lon), 6), round(min(lat + step, max_lat), 6)])
+            lon += step
+        lat += step
+    return tiles
+
+def validate_polygon(polygon):
+    """
+    Returns the polygon as [[lon, lat], ...] floats, or raises ValueError.
+    """
+    if not isinstance(polygon, (list, tuple)) or len(polygon) < 3:
+        raise ValueError("Polygon needs at least 3 [lon, lat] points")
+    points = []
+    for point in polygon:
+        if not isinstance(point, (list, tuple)) or len(point) != 2:
+            raise ValueError(f"Invalid polygon point {point}: expected [lon, lat]")
+        lon, lat = float(point[0]), float(point[1])
+        if not (-180 <= lon <= 180 and -90 <= lat <= 90):
+            raise ValueError(f"Invalid polygon point {point}: expected [lon, lat]")
+        points.append([lon, lat])
+    return points
+
+def tile_polygon(polygon, step=DEFAULT_STEP):
+    """
+    Tiles the polygon's bounding box and keeps the tiles that overlap the polygon:
+    the tile center is inside it (tile inside or mostly inside the polygon), or one
+    of its edges crosses or lies inside the tile (the polygon only clips the tile).
+    polygon: [[lon, lat], ...], closed or open ring
+    """
+    polygon = validate_polygon(polygon)
+    lons = [p[0] for p in polygon]
+    lats = [p[1] for p in polygon]
+    edges = list(zip(polygon, polygon[1:] + polygon[:1]))
+    tiles = []
+    for tile in tile_bbox([min(lons), min(lats), max(lons), max(lats)], step):
+        center = ((tile[0] + tile[2]) / 2, (tile[1] + tile[3]) / 2)
+        if _point_in_polygon(center, polygon) or any(_segment_hits_rectangle(a, b, tile) for a, b in edges):
+            tiles.append(tile)
+    return tiles
+
+def _segment_hits_rectangle(a, b, rect):
+    # Liang-Barsky: clip the segment a-b to [min_lon, min_lat, max_lon, max_lat]
+    (x0, y0), (x1, y1) = a, b
+    dx, dy = x1 - x0, y1 - y0
+    t0, t1 = 0.0, 1.0
+    for p, q in ((-dx, x0 - rect[0]), (dx, rect[2] - x0), (-dy, y0 - rect[1]), (dy, rect[3] - y0)):
+        if p == 0:
+            if q < 0:
+                return False  # parallel to this edge and outside it
+            continue
+        t = q / p
+        if p < 0:
+            t0 = max(t0, t)
+        else:
+            t1 = min(t1, t)
+        if t0 > t1:
+            return False
+    return True
+
+def _point_in_polygon(point, polygon):
+    # Ray casting
+    x, y = point
+    inside = False
+    j = len(polygon) - 1
+    for i in range(len(polygon)):
+        xi, yi = polygon[i][0], polygon[i][1]
+        xj, yj = polygon[j][0], polygon[j][1]
+        if (yi > y) != (yj > y) and x < (xj - xi) * (y - yi) / (yj - yi) + xi:
+            inside = not inside
+        j = i
+    return inside
+
+def regions_from_polygon(polygon, step=DEFAULT_STEP, name='Sweep'):
+    return [{'name': f"{name} #{i + 1}", 'bbox': bbox} for i, bbox in enumerate(tile_polygon(polygon, step))]
+
+def _fetch_region(region, max_retries):
+    """
+    Runs on a pool thread: fetches and analyzes one region, backing off on HTTP 429.
+    Returns (analysis, png_bytes, attempts, latency_seconds).
+    """
+    started = time.perf_counter()
+    attempts = 0
+    if not SentinelService.is_configured():
+        data = simulated_scene()
+        return analyze_image_array(data, color_order='rgb'), encode_png(data), 1, time.perf_counter() - started
+
+    while True:
+        attempts += 1
+        try:
+            # Not held while backing off, so a rate-limited region does not block the others
+            with _requests_in_flight:
+                content = SentinelService.fetch_imagery_bytes(region['bbox'])
+            break
+        except SentinelRateLimited as e:
+            if attempts > max_retries:
+                raise
+            delay = e.retry_after if e.retry_after is not None else min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_CAP)
+            time.sleep(delay * random.uniform(1.0, 1.25))  # jitter so threads do not retry in lockstep
+    # OpenCV releases the GIL, so analysis overlaps with the other threads' downloads
+    return analyze_image_bytes(content), content, attempts, time.perf_counter() - started
+
+def run_sweep(regions, concurrency=DEFAULT_CONCURRENCY, max_retries=MAX_RETRIES, on_result=None):
+    """
+    Fetches and analyzes every region concurrently (at most `concurrency` requests in
+    flight for this sweep, MAX_CONCURRENCY for all sweeps together) and stores a SatelliteImage per region as soon as its analysis finishes.
+    regions: [{'name': str, 'bbox': [min_lon, min_lat, max_lon, max_lat]}, ...]
+    Returns:
+        dict: {'regions', 'succeeded', 'failed', 'wall_time', 'results': [per-region dicts]}
+    """
+    prefix = '' if SentinelService.is_configured() else '[SIM] '
+    started = time.perf_counter()
+    results = []
+    with ThreadPoolExecutor(min(concurrency, MAX_CONCURRENCY)) as pool:
+        futures = {pool.submit(_fetch_region, region, max_retries): region for region in regions}
+        for future in as_completed(futures):
+            region = futures[future]
+            result = {'name': region['name'], 'bbox': region['bbox']}
+            try:
+                analysis, content, attempts, latency = future.result()
+            except Exception as e:
+                result.update(error=str(e))
+            else:
+                # Saved here rather than on the pool threads, so they never open database connections of their own
+                file_name = f"sweep_{region['name'].replace(' ', '_').replace('#', '')}_{int(time.time())}.png"
+                instance = SatelliteImage(location_name=f"{prefix}{region['name']}", **analysis, **bbox_fields(region['bbox']))
+                instance.image.save(file_name, ContentFile(content, name=file_name))
+                result.update(analysis, satellite_image=instance.id, attempts=attempts, latency=round(latency, 3))
+            results.append(result)
+            if on_result:
+                on_result(result)
+
+    failed = sum(1 for r in results if 'error' in r)
+    return {
+        'regions': len(regions),
+        'succeeded': len(results) - failed,
+        'failed': failed,
+        'wall_time': round(time.perf_counter() - started, 3),
+        'results': results,
+    }
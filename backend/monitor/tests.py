@@ -1,3 +1,910 @@
-from django.test import TestCase
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+import io
+import itertools
+import os
+import queue
+import smtplib
+import shutil
+import tempfile
+import random
+import threading
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import redirect_stdout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+from PIL import Image
+from aquasentry_ml import FEATURES, TARGET, compiled, data, search, train
+from aquasentry_ml.artifacts import save_artifact
+from aquasentry_ml.cache import PredictionCache
+from aquasentry_ml.imputation import ConditionalImputer, fit_imputer
+from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier
+
+from django.conf import settings
+from django.core import mail
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.mail.backends.locmem import EmailBackend
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from monitor import clusters, downsampling, geo, ingest, jobs, retention, rollups, spatial, sweep, utils
+from monitor.management.commands import reanalyze_images
+from monitor.email_service import AlertDispatcher, _alert_from_report
+from monitor.models import (AlertDeadLetter, AnalysisJob, DashboardRollup, HealthReport, ReportCellBucket,
+                            SatelliteImage, SensorReadingRollup, WaterSensor)
+from monitor.scoring import PotabilityScorer
+from monitor.sentinel_cache import ImageryCache
+from monitor.stream import SensorStreamHub
+from monitor.sentinel_service import SentinelRateLimited, SentinelService, encode_png, simulated_scene
+from monitor.utils import analyze_image_bytes
+
+class SentinelStandIn(BaseHTTPRequestHandler):
+    """
+    Local stand-in for the Sentinel Hub token and Process endpoints. Every request
+    is recorded on the server as (path, Authorization header).
+    """
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.server.calls.append((self.path, self.headers.get('Authorization')))
+        if self.path == SentinelService.TOKEN_PATH:
+            self._reply(200, 'application/json', json.dumps({'access_token': 'token-1', 'expires_in': 3600}).encode())
+        elif self.server.rate_limited:
+            self.send_response(429)
+            self.send_header('Retry-After', '7')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+        else:
+            self._reply(200, 'image/png', self.server.scene)
+
+    def _reply(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class SentinelServiceTests(SimpleTestCase):
+    def setUp(self):
+        # 1. Stand-in server on a free port
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), SentinelStandIn)
+        self.server.calls = []
+        self.server.rate_limited = False
+        self.server.scene = encode_png(simulated_scene(32, 32))
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        # 2. Point the service at it, with a fresh token, session and cache directory
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+        settings_override = override_settings(SENTINEL_HUB={
+            'BASE_URL': f'http://127.0.0.1:{self.server.server_address[1]}',
+            'TIMEOUT': 5,
+            'CACHE_DIR': cache_dir,
+            'CACHE_TTL': 3600,
+            'CACHE_MAX_BYTES': 10 * 1024 * 1024,
+        })
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        for name, value in [('CLIENT_ID', 'test-client'), ('_token', None), ('_token_expires_at', 0.0),
+                            ('_session', None), ('_cache', None)]:
+            patcher = mock.patch.object(SentinelService, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_token_is_reused_and_repeated_fetch_hits_the_cache(self):
+        first = SentinelService.fetch_imagery_bytes([80.0, 13.0, 80.1, 13.1])
+        again = SentinelService.fetch_imagery_bytes([80.0, 13.0, 80.1, 13.1])
+        other = SentinelService.fetch_imagery_bytes([80.1, 13.0, 80.2, 13.1])
+
+        self.assertEqual(first, self.server.scene)
+        self.assertEqual(again, first)
+        self.assertEqual(other, self.server.scene)
+        self.assertEqual(self.server.calls, [
+            (SentinelService.TOKEN_PATH, None),
+            (SentinelService.PROCESS_PATH, 'Bearer token-1'),
+            (SentinelService.PROCESS_PATH, 'Bearer token-1'),
+        ])
+
+    def test_rate_limit_raises_with_retry_after_and_is_not_cached(self):
+        self.server.rate_limited = True
+        with self.assertRaises(SentinelRateLimited) as raised:
+            SentinelService.fetch_imagery_bytes([80.0, 13.0, 80.1, 13.1])
+        self.assertEqual(raised.exception.retry_after, 7.0)
+
+        self.server.rate_limited = False
+        self.assertEqual(SentinelService.fetch_imagery_bytes([80.0, 13.0, 80.1, 13.1]), self.server.scene)
+        self.assertEqual([path for path, _ in self.server.calls].count(SentinelService.PROCESS_PATH), 2)
+
+class ImageryCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def test_evicts_least_recently_used_over_max_bytes(self):
+        cache = ImageryCache(self.directory, ttl=3600, max_bytes=250)
+        for i, key in enumerate(['a', 'b', 'c']):
+            cache.put(key, b'x' * 100)
+            path = os.path.join(self.directory, f'{key}.png')
+            os.utime(path, (1000 + i, os.stat(path).st_mtime))  # deterministic LRU order
+
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.get('c'), b'x' * 100)
+        self.assertEqual(cache._total, 200)
+
+    def test_put_scans_the_directory_only_when_due(self):
+        cache = ImageryCache(self.directory, ttl=3600, max_bytes=10_000)
+        with mock.patch('monitor.sentinel_cache.os.scandir', wraps=os.scandir) as scandir:
+            for key in ['a', 'b', 'c']:
+                cache.put(key, b'x' * 100)
+        self.assertEqual(scandir.call_count, 1)
+        self.assertEqual(cache._total, 300)
+
+class TilePolygonTests(SimpleTestCase):
+    def test_keeps_tiles_an_edge_crosses_without_a_vertex_or_center_inside(self):
+        # Thin diagonal sliver over a 3x3 grid. Its lower edge clips the corner of the
+        # tile east of the first diagonal tile: no vertex there, center outside.
+        sliver = [[0.0, 0.0], [3.0, 2.9], [3.0, 3.0], [0.1, 0.2]]
+        tiles = sweep.tile_polygon(sliver, step=1.0)
+        self.assertIn([1.0, 0.0, 2.0, 1.0], tiles)
+        for diagonal in ([0.0, 0.0, 1.0, 1.0], [1.0, 1.0, 2.0, 2.0], [2.0, 2.0, 3.0, 3.0]):
+            self.assertIn(diagonal, tiles)
+        self.assertNotIn([2.0, 0.0, 3.0, 1.0], tiles)
+        self.assertNotIn([0.0, 2.0, 1.0, 3.0], tiles)
+
+    def test_rejects_malformed_points(self):
+        for polygon in [[[0, 0], [1, 0]], [[0, 0], [1], [1, 1]], [[0, 0], 5, [1, 1]], [[0, 0], [1, 0], ['a', 1]], 'abc']:
+            with self.assertRaises(ValueError):
+                sweep.tile_polygon(polygon)
+
+class ImageAnalysisTests(SimpleTestCase):
+    def test_images_above_the_tiled_threshold_are_scored_at_full_resolution(self):
+        scene = simulated_scene(width=600, height=400)
+        png = encode_png(scene)
+        expected = utils.analyze_image_array(scene, color_order='rgb')
+        with mock.patch('monitor.utils.TILED_THRESHOLD_PIXELS', 100 * 100), \
+                mock.patch('monitor.utils.analyze_image_tiled', wraps=utils.analyze_image_tiled) as tiled:
+            self.assertEqual(analyze_image_bytes(png), expected)
+            with tempfile.NamedTemporaryFile(suffix='.png') as f:
+                f.write(png)
+                f.flush()
+                self.assertEqual(utils.analyze_water_image(f.name), expected)
+        self.assertEqual(tiled.call_count, 2)
+
+    def test_rejects_decompression_bombs(self):
+        png = encode_png(simulated_scene(width=64, height=64))
+        with mock.patch.object(Image, 'MAX_IMAGE_PIXELS', 1000):
+            with self.assertRaises(ValueError):
+                analyze_image_bytes(png)
+
+class SweepRequestTests(TestCase):
+    def test_malformed_bodies_are_rejected_with_400(self):
+        for body in [
+            [1, 2, 3],
+            {'regions': {'bbox': [0, 0, 1, 1]}},
+            {'regions': ['not a region']},
+            {'regions': [{'bbox': 5}]},
+            {'polygon': [[0, 0], [1], [1, 1]]},
+            {'polygon': [[0, 0], 'x', [1, 1]]},
+            {'polygon': 7},
+        ]:
+            response = self.client.post('/api/satellite/sweep/', body, content_type='application/json')
+            self.assertEqual(response.status_code, 400, body)
+        self.assertFalse(AnalysisJob.objects.exists())
+
+    def test_polygon_sweep_is_queued(self):
+        response = self.client.post('/api/satellite/sweep/', {'polygon': [[80, 13], [80.2, 13], [80.1, 13.2]], 'step': 0.1},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 202)
+        regions = AnalysisJob.objects.get().payload['regions']
+        self.assertEqual([r['bbox'] for r in regions], sweep.tile_polygon([[80, 13], [80.2, 13], [80.1, 13.2]], 0.1))
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    EMAIL_HOST_USER='alerts@example.com',
+    MONITOR_ALERTS={'COALESCE_SECONDS': 60, 'REGION_CELL': 0.1, 'QUEUE_SIZE': 10,
+                    'MAX_ATTEMPTS': 2, 'RETRY_SECONDS': 60},
+)
+class AlertDispatcherTests(TestCase):
+    def setUp(self):
+        # A private dispatcher; the tests drive _add/_send_due on this thread
+        self.dispatcher = AlertDispatcher()
+
+    def report(self, report_id, symptom_type='GI', latitude=13.01, longitude=80.01):
+        return HealthReport(id=report_id, symptom_type=symptom_type, severity=8,
+                            latitude=latitude, longitude=longitude, notes=f"report {report_id}")
+
+    def add(self, *reports):
+        for report in reports:
+            self.dispatcher._add(_alert_from_report(report))
+
+    def test_alerts_are_coalesced_per_region_cell_and_symptom(self):
+        self.add(self.report(1), self.report(2, latitude=13.05, longitude=80.08),
+                 self.report(3, symptom_type='NEURO'), self.report(4, latitude=14.5))
+        self.dispatcher._send_due()
+        self.assertEqual(mail.outbox, [])  # still inside the coalescing window
+
+        self.dispatcher._send_due(force=True)
+        self.assertEqual(len(mail.outbox), 3)
+        digest = next(m for m in mail.outbox if m.subject.startswith('🚨 URGENT: 2 Health Alerts'))
+        self.assertIn('report 1', digest.body)
+        self.assertIn('report 2', digest.body)
+        self.assertEqual(self.dispatcher._pending, {})
+
+    def test_failed_digest_is_retried_then_dead_lettered(self):
+        self.add(self.report(1), self.report(2))
+        with mock.patch.object(EmailBackend, 'send_messages', side_effect=smtplib.SMTPException('down')):
+            self.dispatcher._send_due(force=True)
+            (group,) = self.dispatcher._pending.values()
+            self.assertEqual(group['attempts'], 1)
+            self.dispatcher._send_due()  # backing off: not due yet
+            self.assertEqual(group['attempts'], 1)
+            self.assertFalse(AlertDeadLetter.objects.exists())
+
+            self.dispatcher._send_due(force=True)
+
+        self.assertEqual(self.dispatcher._pending, {})
+        dead = AlertDeadLetter.objects.get()
+        self.assertEqual((dead.report_ids, dead.attempts, dead.error), ([1, 2], 2, 'down'))
+        self.assertEqual(mail.outbox, [])
+
+    def test_group_is_dropped_when_digest_and_dead_letter_both_fail(self):
+        self.add(self.report(1))
+        with mock.patch('monitor.email_service.build_digest', side_effect=RuntimeError('bad template')), \
+             mock.patch.object(AlertDeadLetter.objects, 'create', side_effect=RuntimeError('db down')):
+            self.dispatcher._send_due(force=True)
+        self.assertEqual(self.dispatcher._pending, {})
+
+    def test_submit_and_flush_through_the_dispatcher_thread(self):
+        self.dispatcher.submit(self.report(1))
+        self.dispatcher.submit(self.report(2))
+        self.assertTrue(self.dispatcher.flush(timeout=5))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn('2 Health Alerts', mail.outbox[0].subject)
+
+    def test_full_queue_sheds_without_blocking_and_the_dispatcher_dead_letters(self):
+        self.dispatcher._queue = queue.Queue(maxsize=1)
+        with mock.patch.object(self.dispatcher, '_ensure_running'), CaptureQueriesContext(connection) as queries:
+            self.dispatcher.submit(self.report(1))
+            self.dispatcher.submit(self.report(2))
+        self.assertEqual(len(queries), 0)
+        self.assertFalse(AlertDeadLetter.objects.exists())
+
+        self.dispatcher._dead_letter_shed()
+        dead = AlertDeadLetter.objects.get()
+        self.assertEqual((dead.report_ids, dead.error), ([2], 'Alert queue full'))
+        self.assertEqual(self.dispatcher._queue.get_nowait()['id'], 1)
+
+class ReportsWithinTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(7)
+        HealthReport.objects.bulk_create([
+            HealthReport(symptom_type='GI', severity=5, latitude=13.0 + rng.uniform(-1, 1), longitude=80.0 + rng.uniform(-1, 1))
+            for _ in range(400)
+        ])
+
+    def brute_force(self, lat, lon, radius_km):
+        distances = [(geo.haversine_km(lat, lon, r.latitude, r.longitude), r.id) for r in HealthReport.objects.all()]
+        return [report_id for distance, report_id in sorted(distances) if distance <= radius_km]
+
+    def test_nearest_first_matches_a_full_scan(self):
+        for radius_km, limit in [(50, 10), (120, 25), (300, None)]:
+            matches = spatial.reports_within(13.2, 80.1, radius_km, limit=limit)
+            expected = self.brute_force(13.2, 80.1, radius_km)
+            self.assertEqual([r.id for r, _ in matches], expected[:limit] if limit else expected)
+            self.assertEqual([d for _, d in matches], sorted(d for _, d in matches))
+
+    def test_candidates_are_limited_in_sql_and_results_capped(self):
+        with CaptureQueriesContext(connection) as queries:
+            spatial.reports_within(13.0, 80.0, 300, limit=5)
+        self.assertEqual(len(queries), 1)
+        self.assertIn(f'LIMIT {5 * spatial.CANDIDATE_FACTOR}', queries[0]['sql'])
+        with mock.patch.object(spatial, 'MAX_RESULTS', 30):
+            self.assertEqual(len(spatial.reports_within(13.0, 80.0, 300, limit=1000)), 30)
+
+class ReportCellBucketTests(TestCase):
+    def buckets(self):
+        return sorted(ReportCellBucket.objects.filter(count__gt=0).values_list('cell_lat', 'symptom_type', 'count', 'severity_sum'))
+
+    def test_edits_move_the_report_and_delete_leaves_no_negative_counts(self):
+        report = HealthReport.objects.create(**health_report(latitude=13.05, severity=3))
+        HealthReport.objects.create(**health_report(latitude=13.25, severity=5))
+        self.assertEqual(self.buckets(), [(1305, 'GI', 1, 3), (1325, 'GI', 1, 5)])
+
+        report.latitude, report.severity = 13.25, 8
+        report.save()
+        self.assertEqual(self.buckets(), [(1325, 'GI', 2, 13)])
+
+        report.symptom_type = 'DERM'
+        report.save(update_fields=['symptom_type'])
+        report.notes = 'only the notes'
+        report.save()
+        self.assertEqual(self.buckets(), [(1325, 'DERM', 1, 8), (1325, 'GI', 1, 5)])
+
+        report.delete()
+        self.assertEqual(self.buckets(), [(1325, 'GI', 1, 5)])
+        self.assertFalse(ReportCellBucket.objects.filter(count__lt=0).exists())
+        clusters.rebuild()
+        self.assertEqual(self.buckets(), [(1325, 'GI', 1, 5)])
+
+class PotabilityScorerTests(SimpleTestCase):
+    def test_full_queue_keeps_offering_and_reports_drops_once(self):
+        scorer = PotabilityScorer()
+        scorer._queue = queue.Queue(maxsize=2)
+        readings = [WaterSensor(id=i, ph=7.0, conductivity=400.0, turbidity=3.0) for i in range(1, 6)]
+        output = io.StringIO()
+        with mock.patch.object(scorer, '_ensure_running'), redirect_stdout(output):
+            scorer.submit(readings)
+            scorer._queue.get_nowait()  # the thread drains one
+            scorer.submit(readings[4:])
+
+        self.assertEqual([scorer._queue.get_nowait()[0] for _ in range(2)], [2, 5])
+        self.assertEqual(output.getvalue().splitlines(), [
+            "⚠️ Scoring queue full; 3 reading(s) left unscored (ids 3..5; run `manage.py score_readings`)",
+        ])
+
+class CompiledForestParityTests(SimpleTestCase):
+    """
+    CompiledForest.predict_proba must match the fitted forest bit for bit, on every
+    code path: flat traversal (batch of 1), per-tree predict, and threaded chunks.
+    """
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        rng = np.random.default_rng(0)
+        X = rng.normal(size=(600, 9))
+        y = (X[:, 0] + X[:, 1] * X[:, 2] + rng.normal(scale=0.5, size=600) > 0).astype(int)
+        X[rng.random(X.shape) < 0.15] = np.nan  # NaNs at fit time give nodes a learned missing direction
+        cls.models = [
+            RandomForestClassifier(n_estimators=15, max_depth=8, random_state=0).fit(X, y),
+            ExtraTreesClassifier(n_estimators=15, random_state=0).fit(X, y),
+        ]
+        X_test = rng.normal(size=(300, 9))
+        cls.inputs = {'complete': X_test, 'with NaN': np.where(rng.random(X_test.shape) < 0.2, np.nan, X_test)}
+
+    def assertParity(self, model, X):
+        forest = compiled.compile_model(model)
+        self.assertTrue(np.array_equal(forest.predict_proba(X), model.predict_proba(X)))
+        self.assertTrue(np.array_equal(forest.predict(X), model.predict(X)))
+
+    def test_single_rows_and_batches(self):
+        for model in self.models:
+            for name, X in self.inputs.items():
+                with self.subTest(model=type(model).__name__, inputs=name):
+                    for row in X[:20]:
+                        self.assertParity(model, row[None, :])
+                    self.assertParity(model, X)
+
+    def test_flat_traversal_and_threaded_chunks_on_batches(self):
+        for model, (name, X) in itertools.product(self.models, self.inputs.items()):
+            with self.subTest(model=type(model).__name__, inputs=name):
+                with mock.patch.object(compiled, 'FLAT_MAX_BATCH', len(X)):
+                    self.assertParity(model, X)
+                with mock.patch.object(compiled, 'CHUNK_SIZE', 64):
+                    self.assertParity(model, X)
+
+def sensor_reading(**overrides):
+    return {'sensor_id': 'S-1', 'ph': 7.2, 'turbidity': 2.0, 'temperature': 21.5,
+            'dissolved_oxygen': 8.1, 'conductivity': 410.0, **overrides}
+
+class PredictPotabilityTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # A small forest where only pH decides: safe inside 6.5-8.5
+        rng = np.random.default_rng(3)
+        means = {'ph': 7.5, 'Solids': 20000.0, 'Sulfate': 330.0, 'Turbidity': 7.0}
+        X = np.column_stack([rng.normal(means.get(name, 100.0), 1.5 if name == 'ph' else 10.0, 400) for name in FEATURES])
+        y = ((X[:, 0] >= 6.5) & (X[:, 0] <= 8.5)).astype(int)
+        model = RandomForestClassifier(n_estimators=10, random_state=0).fit(X, y)
+        imputer = ConditionalImputer(FEATURES, X.mean(axis=0), np.cov(X, rowvar=False))
+        cls.artifact_dir = tempfile.mkdtemp()
+        cls.version = save_artifact(model, dict(zip(FEATURES, X.mean(axis=0))), {}, directory=cls.artifact_dir,
+                                    extra={'imputation': imputer.to_meta()})
+        cls.model_settings = override_settings(POTABILITY_MODEL={**settings.POTABILITY_MODEL, 'MAX_BATCH': 3,
+                                                           'ARTIFACT_DIR': cls.artifact_dir})
+        cls.model_settings.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.model_settings.disable()
+        shutil.rmtree(cls.artifact_dir)
+        super().tearDownClass()
+
+    def post(self, body):
+        return self.client.post('/api/predict/', body, content_type='application/json')
+
+    def sample(self, **overrides):
+        return {**{name: 100.0 for name in FEATURES}, 'ph': 7.4, 'Solids': 20000.0, 'Sulfate': 330.0, 'Turbidity': 7.0, **overrides}
+
+    def test_single_object_list_and_samples_bodies(self):
+        single = self.post(self.sample())
+        self.assertEqual(single.status_code, 200)
+        self.assertEqual(single.data['model_version'], self.version)
+        self.assertTrue(single.data['potable'])
+        self.assertEqual((single.data['imputed'], single.data['reliability']), ([], 1.0))
+
+        samples = [self.sample(), self.sample(ph=9.5)]
+        listed = self.post(samples)
+        wrapped = self.post({'samples': samples})
+        self.assertEqual(listed.status_code, 200)
+        self.assertEqual(listed.data, wrapped.data)
+        self.assertEqual(listed.data['count'], 2)
+        self.assertEqual([r['potable'] for r in listed.data['results']], [True, False])
+        self.assertEqual(listed.data['results'][0], {k: v for k, v in single.data.items() if k != 'model_version'})
+
+    def test_missing_features_are_imputed_and_only_supplied_values_give_reasons(self):
+        response = self.post({'ph': 9.5, 'Sulfate': None})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.data['potable'])
+        self.assertEqual(response.data['imputed'], [name for name in FEATURES if name != 'ph'])
+        self.assertLess(response.data['reliability'], 1.0)
+        # The imputed Solids, Sulfate and Turbidity break their rules too, but were not supplied
+        self.assertEqual(response.data['reasons'], ['pH level (9.50) is outside the safe range'])
+
+        supplied = self.post(self.sample(ph=9.5, Turbidity=12.0)).data['reasons']
+        self.assertEqual(len(supplied), 4)
+
+    def test_rejects_bad_bodies(self):
+        for body in [
+            {'ph': 7.0, 'Lead': 0.1},
+            {'ph': 'seven'},
+            {'ph': True},
+            [self.sample(), 'not a sample'],
+            [],
+            [self.sample()] * 4,
+        ]:
+            response = self.post(body)
+            self.assertEqual(response.status_code, 400, body)
+            self.assertIn('error', response.data)
+
+    def test_no_artifact_is_503(self):
+        empty = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, empty)
+        with override_settings(POTABILITY_MODEL={**settings.POTABILITY_MODEL, 'ARTIFACT_DIR': empty}):
+            response = self.post(self.sample())
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('No model artifact', response.data['error'])
+
+class PredictionCacheTests(SimpleTestCase):
+    def artifact(self, version):
+        def predict_proba(X):
+            safe = 1 / (1 + np.exp(-(X[:, 0] - 7.0)))
+            return np.column_stack([1 - safe, safe])
+        model = mock.Mock(classes_=np.array([0, 1]))
+        return mock.Mock(version=version, features=['ph', 'Turbidity'], model=model,
+                         predict_proba=mock.Mock(side_effect=predict_proba))
+
+    def test_hit_matches_miss_and_skips_the_model(self):
+        cache, artifact = PredictionCache(), self.artifact('v1')
+        X = np.array([[7.123, 3.0], [6.5, 1.0]])
+        missed = cache.predict_proba(artifact, X)
+        hit = cache.predict_proba(artifact, X + 0.0004)  # same quantized rows
+        np.testing.assert_array_equal(hit, missed)
+        self.assertEqual(artifact.predict_proba.call_count, 1)
+        self.assertEqual((cache.hits, cache.misses), (2, 2))
+
+    def test_new_model_version_empties_the_cache(self):
+        cache, old, new = PredictionCache(), self.artifact('v1'), self.artifact('v2')
+        X = np.array([[7.0, 3.0]])
+        cache.predict_proba(old, X)
+        cache.predict_proba(new, X)
+        self.assertEqual(new.predict_proba.call_count, 1)
+        self.assertEqual(cache.stats()['model_version'], 'v2')
+        self.assertEqual(cache.stats()['entries'], 1)
+        cache.predict_proba(old, X)  # and back: the v2 entry is not served for v1
+        self.assertEqual(old.predict_proba.call_count, 2)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache, artifact = PredictionCache(max_entries=2), self.artifact('v1')
+        a, b, c = np.array([[6.0, 1.0]]), np.array([[7.0, 1.0]]), np.array([[8.0, 1.0]])
+        cache.predict_proba(artifact, a)
+        cache.predict_proba(artifact, b)
+        cache.predict_proba(artifact, a)  # a is now the most recent
+        cache.predict_proba(artifact, c)
+        self.assertEqual(cache.stats()['entries'], 2)
+        calls = artifact.predict_proba.call_count
+        cache.predict_proba(artifact, a)
+        self.assertEqual(artifact.predict_proba.call_count, calls)
+        cache.predict_proba(artifact, b)
+        self.assertEqual(artifact.predict_proba.call_count, calls + 1)
+
+class TrainingDataTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.csv = os.path.join(directory, 'water.csv')
+
+    def write_csv(self, rows):
+        rng = np.random.default_rng(len(rows))
+        df = pd.DataFrame(rng.normal(10.0, 2.0, (len(rows), len(FEATURES))), columns=FEATURES)
+        df[TARGET] = rows
+        df.loc[::3, 'ph'] = np.nan
+        df.to_csv(self.csv, index=False)
+        return df
+
+    def test_partial_rows_are_kept_and_unlabelled_rows_dropped(self):
+        df = self.write_csv([1, 0, None, 1, 0, 1])
+        dataset = data.load_dataset(self.csv, chunk_rows=2)
+        labelled = df[df[TARGET].notna()]
+        self.assertEqual(len(dataset), 5)
+        np.testing.assert_array_equal(np.isnan(dataset.X[:, 0]), labelled['ph'].isna().to_numpy())
+        np.testing.assert_array_equal(dataset.y, labelled[TARGET].to_numpy())
+        self.assertAlmostEqual(dataset.feature_means['ph'], labelled['ph'].mean(), places=5)
+        self.assertEqual(dataset.meta['missing']['ph'], labelled['ph'].isna().sum())
+
+    def test_changed_csv_is_converted_again(self):
+        self.write_csv([1, 0, 1])
+        self.assertEqual(len(data.load_dataset(self.csv)), 3)
+        with mock.patch.object(data, 'convert', wraps=data.convert) as convert:
+            self.assertEqual(len(data.load_dataset(self.csv)), 3)
+            convert.assert_not_called()
+            self.write_csv([1, 0, 1, 0])
+            self.assertEqual(len(data.load_dataset(self.csv)), 4)
+            convert.assert_called_once()
+
+    def test_out_of_core_fit_builds_exactly_n_estimators(self):
+        self.write_csv([i % 2 for i in range(200)])
+        dataset = data.load_dataset(self.csv)
+        model, _ = train.train_model(dataset, n_estimators=25, max_fit_rows=50)
+        self.assertTrue(model.warm_start)
+        self.assertEqual((model.n_estimators, len(model.estimators_)), (25, 25))
+
+    def test_search_candidates_are_filled_by_the_shared_imputer(self):
+        self.write_csv([i % 2 for i in range(200)])
+        imputation = fit_imputer(data.load_dataset(self.csv)).to_meta()
+        candidate = {'family': 'random_forest', 'params': {'n_estimators': 5, 'max_depth': 3}}
+        with mock.patch.object(data.Dataset, 'impute') as mean_fill, \
+                mock.patch.object(ConditionalImputer, 'impute', autospec=True, side_effect=ConditionalImputer.impute) as conditional:
+            result = search.evaluate_candidate(self.csv, candidate, 100, 42, imputation)
+        mean_fill.assert_not_called()
+        self.assertEqual(conditional.call_count, 3)  # fit, validation and test rows
+        self.assertEqual(result['rows'], 100)
+
+class ConditionalImputerTests(SimpleTestCase):
+    def setUp(self):
+        rng = np.random.default_rng(5)
+        A = rng.normal(size=(len(FEATURES), len(FEATURES)))
+        self.mean = rng.normal(10.0, 3.0, len(FEATURES))
+        self.cov = A @ A.T + np.eye(len(FEATURES))
+        self.imputer = ConditionalImputer(FEATURES, self.mean, self.cov)
+
+    def test_matches_the_conditional_mean_for_every_mask_kind(self):
+        rng = np.random.default_rng(6)
+        X = rng.normal(10.0, 3.0, (40, len(FEATURES)))
+        X[rng.random(X.shape) < 0.4] = np.nan
+        X[0] = np.nan  # nothing known
+        X[1] = self.mean + 1.0  # nothing missing
+        imputed, known, reliability = self.imputer.impute(X)
+
+        cov = self.imputer.cov
+        for i, (row, k) in enumerate(zip(X, known)):
+            K, M = np.flatnonzero(k), np.flatnonzero(~k)
+            # x_M = mean_M + cov_MK cov_KK^-1 (x_K - mean_K)
+            expected = row.copy()
+            expected[M] = self.mean[M]
+            if len(K) and len(M):
+                expected[M] += cov[np.ix_(M, K)] @ np.linalg.solve(cov[np.ix_(K, K)], row[K] - self.mean[K])
+            np.testing.assert_allclose(imputed[i], expected, rtol=1e-9)
+        self.assertEqual((reliability[0], reliability[1]), (0.0, 1.0))
+        self.assertTrue(((reliability > 0) & (reliability < 1))[known.any(axis=1) & ~known.all(axis=1)].all())
+
+    def test_round_trip_through_meta_is_exact(self):
+        # Pairwise-complete covariances can be indefinite; the repair must happen once
+        indefinite = self.cov.copy()
+        indefinite[0, 1] = indefinite[1, 0] = 10 * np.sqrt(indefinite[0, 0] * indefinite[1, 1])
+        imputer = ConditionalImputer(FEATURES, self.mean, indefinite)
+        loaded = ConditionalImputer.from_meta(json.loads(json.dumps(imputer.to_meta())))
+        np.testing.assert_array_equal(loaded.cov, imputer.cov)
+        np.testing.assert_array_equal(loaded.coef, imputer.coef)
+
+class BulkIngestTests(TestCase):
+    def test_valid_readings_are_stored_in_batches_and_invalid_ones_reported(self):
+        items = [sensor_reading(sensor_id=f'S-{i}') for i in range(5)] + [sensor_reading(ph='acid'), 'not an object']
+        with mock.patch.object(ingest, 'BULK_BATCH_SIZE', 2), CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/sensors/bulk/', items, content_type='application/json')
+
+        self.assertEqual(response.status_code, 201)
+        body = response.json()
+        self.assertEqual(body['created'], 5)
+        self.assertEqual(sorted(WaterSensor.objects.values_list('id', flat=True)), sorted(body['ids']))
+        self.assertEqual([e['index'] for e in body['errors']], [5, 6])
+        self.assertIn('ph', body['errors'][0]['errors'])
+        inserts = [q for q in queries if q['sql'].startswith('INSERT INTO "monitor_watersensor"')]
+        self.assertEqual(len(inserts), 3)  # 5 rows in batches of 2
+
+    def test_ndjson_body(self):
+        body = "\n".join(json.dumps(sensor_reading(sensor_id=f'S-{i}')) for i in range(3)) + "\n\n"
+        response = self.client.post('/api/sensors/bulk/', body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(WaterSensor.objects.count(), 3)
+
+    def test_rejected_requests_store_nothing(self):
+        response = self.client.post('/api/sensors/bulk/', [sensor_reading(ph=None)], content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        with mock.patch('monitor.views.MAX_BULK_ITEMS', 2):
+            response = self.client.post('/api/sensors/bulk/', [sensor_reading()] * 3, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post('/api/sensors/bulk/', '{"sensor_id": ', content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(WaterSensor.objects.exists())
+
+class TimeSeriesListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.base = datetime(2025, 3, 1, 12, 0, tzinfo=dt_timezone.utc)
+        readings = WaterSensor.objects.bulk_create([WaterSensor(**sensor_reading(sensor_id=f'S-{i}')) for i in range(5)])
+        # auto_now_add ignores explicit values on create
+        for i, reading in enumerate(readings):
+            WaterSensor.objects.filter(pk=reading.pk).update(timestamp=cls.base + timedelta(minutes=i))
+        cls.ids = [r.pk for r in readings]
+
+    def test_cursor_pages_are_newest_first_and_complete(self):
+        seen = []
+        url = '/api/sensors/?page_size=2'
+        pages = 0
+        while url:
+            body = self.client.get(url).json()
+            seen += [row['id'] for row in body['results']]
+            url = body['next']
+            pages += 1
+        self.assertEqual(pages, 3)
+        self.assertEqual(seen, self.ids[::-1])
+
+    def test_since_returns_only_newer_rows(self):
+        since = (self.base + timedelta(minutes=2)).isoformat()
+        body = self.client.get('/api/sensors/', {'since': since}).json()
+        self.assertEqual([row['id'] for row in body['results']], self.ids[:2:-1])
+        self.assertEqual(self.client.get('/api/sensors/', {'since': 'yesterday'}).status_code, 400)
+
+def health_report(**overrides):
+    return {'symptom_type': 'GI', 'severity': 3, 'latitude': 13.05, 'longitude': 80.05, 'notes': '', **overrides}
+
+@mock.patch('monitor.views.send_alert_email')
+class DashboardRollupTests(TestCase):
+    def stats(self):
+        return self.client.get('/api/dashboard-stats/').json()
+
+    def test_counts_and_flags_follow_create_edit_and_delete(self, _send_alert):
+        first = self.client.post('/api/health-reports/', health_report(), content_type='application/json').json()
+        self.client.post('/api/health-reports/', health_report(severity=2), content_type='application/json')
+        self.assertEqual(self.stats()['healthReports'], 2)
+        self.assertEqual(self.stats()['overallRisk'], 'LOW')
+
+        self.client.patch(f"/api/health-reports/{first['id']}/", {'severity': 9}, content_type='application/json')
+        self.assertEqual((self.stats()['healthReports'], self.stats()['overallRisk']), (2, 'MODERATE'))
+
+        sensor = self.client.post('/api/sensors/', sensor_reading(), content_type='application/json').json()
+        self.client.patch(f"/api/sensors/{sensor['id']}/", {'ph': 4.0}, content_type='application/json')
+        self.assertEqual(self.stats()['sensorAnomalies'], 1)
+
+        self.client.delete(f"/api/health-reports/{first['id']}/")
+        self.assertEqual(self.stats()['healthReports'], 1)
+        self.assertEqual(DashboardRollup.objects.get().health_report_count, HealthReport.objects.count())
+
+    def test_latest_scan_and_deleted_scan(self, _send_alert):
+        older = SatelliteImage.objects.create(image='a.png', risk_score=80)
+        newer = SatelliteImage.objects.create(image='b.png', risk_score=20)
+        self.assertEqual(self.stats()['satelliteAlerts'], 0)
+        newer.delete()
+        self.assertEqual(DashboardRollup.objects.get().latest_satellite_id, older.id)
+        self.assertEqual(self.stats()['satelliteAlerts'], 1)
+
+    def test_first_write_racing_another_first_write(self, _send_alert):
+        compute = rollups.compute_rollup
+
+        def other_writer_inserts_first():
+            # Another process's first report inserts the row (counting only its own,
+            # uncommitted report) between our failed UPDATE and our INSERT
+            DashboardRollup.objects.create(pk=rollups.ROLLUP_PK, health_report_count=1)
+            return compute()
+
+        with mock.patch.object(rollups, 'compute_rollup', side_effect=other_writer_inserts_first):
+            HealthReport.objects.create(**health_report())
+        self.assertEqual(DashboardRollup.objects.get().health_report_count, 2)
+
+class SensorStreamTests(TestCase):
+    async def test_replays_after_last_event_id_then_pushes_new_readings(self):
+        readings = [await WaterSensor.objects.acreate(**sensor_reading(sensor_id=f'S-{i}')) for i in range(3)]
+        hub = SensorStreamHub()
+        hub.POLL_INTERVAL = 0.05
+        stream = hub.subscribe(last_event_id=readings[0].id)
+        try:
+            replayed = [await anext(stream) for _ in range(2)]
+            self.assertEqual([frame.splitlines()[0] for frame in replayed], [f"id: {r.id}" for r in readings[1:]])
+            dashboard = await anext(stream)
+            self.assertTrue(dashboard.startswith("event: dashboard\n"))
+            self.assertEqual(json.loads(dashboard.split("data: ", 1)[1])['overallRisk'], 'LOW')
+
+            new = await WaterSensor.objects.acreate(**sensor_reading(ph=4.0))
+            hub.notify()
+            frames = [await anext(stream) for _ in range(2)]
+        finally:
+            await stream.aclose()
+        reading = next(f for f in frames if f.startswith(f"id: {new.id}\nevent: reading\n"))
+        self.assertEqual(json.loads(reading.split("data: ", 1)[1])['status'], 'CRITICAL')
+        # The critical reading also changes the dashboard status, pushed as its own event
+        self.assertTrue(any(f.startswith("event: dashboard\n") and '"MODERATE"' in f for f in frames))
+
+    def test_rejects_a_non_integer_last_id(self):
+        self.assertEqual(self.client.get('/api/stream/sensors/', {'last_id': 'abc'}).status_code, 400)
+
+def create_readings(sensor_id, timestamps_and_ph):
+    readings = WaterSensor.objects.bulk_create([WaterSensor(**sensor_reading(sensor_id=sensor_id, ph=ph)) for _, ph in timestamps_and_ph])
+    for reading, (timestamp, _) in zip(readings, timestamps_and_ph):
+        WaterSensor.objects.filter(pk=reading.pk).update(timestamp=timestamp)
+
+def compacted(sensor_id, bucket, bucket_start, count, ph_min, ph_max, ph_sum):
+    # Other metrics as if every reading were sensor_reading()
+    fields = {f'{m}_{agg}': value * (count if agg == 'sum' else 1)
+              for m, value in sensor_reading().items() if m != 'sensor_id' for agg in ('min', 'max', 'sum')}
+    fields.update(ph_min=ph_min, ph_max=ph_max, ph_sum=ph_sum)
+    return SensorReadingRollup.objects.create(sensor_id=sensor_id, bucket=bucket, bucket_start=bucket_start, count=count, **fields)
+
+class SensorHistoryTests(TestCase):
+    base = datetime(2025, 3, 1, 10, 0, tzinfo=dt_timezone.utc)
+
+    def history(self, **params):
+        params = {'start': self.base.isoformat(), 'end': (self.base + timedelta(hours=3)).isoformat(), **params}
+        return self.client.get('/api/sensors/history/', params)
+
+    def test_hourly_buckets_merge_raw_readings_and_compacted_rollups(self):
+        create_readings('A', [(self.base + timedelta(minutes=5), 7.0), (self.base + timedelta(minutes=50), 8.0),
+                              (self.base + timedelta(hours=1, minutes=1), 6.0)])
+        create_readings('B', [(self.base + timedelta(minutes=20), 9.0)])
+        # Part of A's first hour was already compacted by the retention job
+        compacted('A', '1h', self.base, count=2, ph_min=6.5, ph_max=7.5, ph_sum=14.0)
+
+        series = self.history(bucket='1h').json()['series']
+        summary = [(p['sensor_id'], p['bucket_start'], p['count'], p['ph']) for p in series]
+        self.assertEqual(summary, [
+            ('A', '2025-03-01T10:00:00Z', 4, {'min': 6.5, 'max': 8.0, 'mean': 7.25}),
+            ('A', '2025-03-01T11:00:00Z', 1, {'min': 6.0, 'max': 6.0, 'mean': 6.0}),
+            ('B', '2025-03-01T10:00:00Z', 1, {'min': 9.0, 'max': 9.0, 'mean': 9.0}),
+        ])
+        self.assertEqual([p['sensor_id'] for p in self.history(bucket='1h', sensor_id='B').json()['series']], ['B'])
+
+    def test_minute_and_day_buckets(self):
+        create_readings('A', [(self.base + timedelta(seconds=10), 7.0), (self.base + timedelta(seconds=40), 8.0),
+                              (self.base + timedelta(minutes=1), 6.0)])
+        minutes = self.history(bucket='1m').json()['series']
+        self.assertEqual([(p['count'], p['ph']['mean']) for p in minutes], [(2, 7.5), (1, 6.0)])
+        days = self.history(bucket='1d', start=datetime(2025, 3, 1, tzinfo=dt_timezone.utc).isoformat()).json()['series']
+        self.assertEqual([(p['bucket_start'], p['count']) for p in days], [('2025-03-01T00:00:00Z', 3)])
+
+    def test_invalid_ranges(self):
+        self.assertEqual(self.history(bucket='5m').status_code, 400)
+        self.assertEqual(self.history(end=self.base.isoformat()).status_code, 400)
+        self.assertEqual(self.history(bucket='1m', end=(self.base + timedelta(days=30)).isoformat()).status_code, 400)
+
+@override_settings(MONITOR_RETENTION={
+    'WaterSensor': {'raw_days': 7, 'hourly_days': 10, 'daily_days': 30, 'slice_rows': 1},
+    'HealthReport': {'raw_days': 5, 'slice_rows': 1},
+})
+class RetentionTests(TestCase):
+    now = datetime(2025, 3, 20, 12, 30, tzinfo=dt_timezone.utc)
+
+    def at(self, day, hour=0, minute=0):
+        return datetime(2025, 3, day, hour, minute, tzinfo=dt_timezone.utc)
+
+    def test_each_tier_stops_at_its_cutoff(self):
+        # Raw cutoff: 7 days back, floored to the hour (13th 12:00)
+        create_readings('A', [(self.at(13, 11, 10), 7.0), (self.at(13, 11, 50), 8.0), (self.at(13, 12, 10), 6.0)])
+        # Hourly cutoff: 10 days back, floored to the day (10th 00:00)
+        compacted('A', '1h', self.at(9, 5), count=2, ph_min=6.0, ph_max=7.0, ph_sum=13.0)
+        compacted('A', '1h', self.at(9, 7), count=1, ph_min=8.0, ph_max=8.0, ph_sum=8.0)
+        compacted('A', '1h', self.at(10, 1), count=1, ph_min=7.0, ph_max=7.0, ph_sum=7.0)
+        # Daily cutoff: 30 days back
+        compacted('A', '1d', datetime(2025, 2, 15, tzinfo=dt_timezone.utc), count=5, ph_min=7.0, ph_max=7.0, ph_sum=35.0)
+        compacted('A', '1d', datetime(2025, 2, 25, tzinfo=dt_timezone.utc), count=5, ph_min=7.0, ph_max=7.0, ph_sum=35.0)
+        for day in (14, 16):
+            report = HealthReport.objects.create(**health_report())
+            HealthReport.objects.filter(pk=report.pk).update(submitted_at=self.at(day, 12))
+        before = downsampling.bucketed_history('1h', self.at(13), self.at(14))
+
+        results = retention.apply_policies(now=self.now)
+
+        self.assertEqual(list(WaterSensor.objects.values_list('timestamp', flat=True)), [self.at(13, 12, 10)])
+        rollup_rows = SensorReadingRollup.objects.order_by('bucket', 'bucket_start').values_list('bucket', 'bucket_start', 'count', 'ph_sum')
+        self.assertEqual(list(rollup_rows), [
+            ('1d', datetime(2025, 2, 25, tzinfo=dt_timezone.utc), 5, 35.0),
+            ('1d', self.at(9), 3, 21.0),
+            ('1h', self.at(10, 1), 1, 7.0),
+            ('1h', self.at(13, 11), 2, 15.0),
+        ])
+        self.assertEqual(list(HealthReport.objects.values_list('submitted_at', flat=True)), [self.at(16, 12)])
+        # Compaction does not change what the history endpoint reports
+        self.assertEqual(downsampling.bucketed_history('1h', self.at(13), self.at(14)), before)
+        self.assertEqual({r.model_name: r.rows_compacted + r.rows_deleted for r in results}, {
+            'WaterSensor': 2, 'SensorReadingRollup (1h)': 2, 'SensorReadingRollup (1d)': 1, 'HealthReport': 1,
+        })
+
+    def test_dry_run_changes_nothing(self):
+        create_readings('A', [(self.at(1), 7.0)])
+        results = retention.apply_policies(now=self.now, dry_run=True)
+        self.assertEqual(results[0].rows_compacted, 1)
+        self.assertEqual(WaterSensor.objects.count(), 1)
+        self.assertFalse(SensorReadingRollup.objects.exists())
+
+class AnalysisWorkerTests(TestCase):
+    def test_storage_errors_fail_only_that_job(self):
+        missing = jobs.enqueue_analysis(SatelliteImage.objects.create(image='satellite_images/missing.png'))
+        outside = jobs.enqueue_analysis(SatelliteImage.objects.create(image='../outside.png'))
+        log = []
+        jobs.AnalysisWorker(processes=1, threads=1, poll_interval=0.01, log=log.append).run(once=True)
+
+        for job in (missing, outside):
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.attempts), ('queued', 1))
+        self.assertIn('outside.png', outside.last_error)
+        self.assertEqual(len(log), 2)
+
+    def test_simulated_scene_is_analyzed_from_its_pixels(self):
+        with mock.patch.object(SentinelService, 'is_configured', return_value=False):
+            fetched = jobs._fetch_sentinel([80.0, 13.0, 80.1, 13.1])
+        content, pixels, simulated = fetched
+        self.assertTrue(simulated)
+        with mock.patch('monitor.jobs.analyze_image_bytes') as decode:
+            pool = mock.Mock(submit=lambda fn, *args, **kwargs: fn(*args, **kwargs))
+            analysis = jobs._analyze_fetched(pool, fetched)
+        decode.assert_not_called()
+        # Same scores as the PNG that gets stored
+        self.assertEqual(analysis, analyze_image_bytes(content))
+
+class ReanalyzeImagesTests(TestCase):
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        media_settings = override_settings(MEDIA_ROOT=media)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+        self.checkpoint = os.path.join(media, 'checkpoint.json')
+        self.png = encode_png(simulated_scene(width=64, height=64))
+
+    def image(self, name):
+        stored = default_storage.save(f'satellite_images/{name}', io.BytesIO(self.png))
+        return SatelliteImage.objects.create(image=stored)
+
+    def reanalyze(self):
+        out, err = io.StringIO(), io.StringIO()
+        call_command('reanalyze_images', processes=1, checkpoint=self.checkpoint, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_any_per_image_error_is_counted_and_skipped(self):
+        good = self.image('good.png')
+        outside = SatelliteImage.objects.create(image='../outside.png')
+        out, err = self.reanalyze()
+
+        good.refresh_from_db()
+        self.assertEqual(good.risk_score, analyze_image_bytes(self.png)['risk_score'])
+        self.assertIn(f'Image {outside.id}', err)
+        self.assertIn('1 updated, 1 failed', out)
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+    def test_progress_is_saved_when_the_run_dies(self):
+        first, second = self.image('first.png'), self.image('second.png')
+        read = reanalyze_images._read
+        def read_or_break(name):
+            if name == second.image.name:
+                raise BrokenProcessPool('worker died')
+            return read(name)
+
+        with mock.patch.object(reanalyze_images, '_read', side_effect=read_or_break):
+            with self.assertRaises(BrokenProcessPool):
+                self.reanalyze()
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertIsNotNone(first.risk_score)
+        self.assertIsNone(second.risk_score)
+        with open(self.checkpoint) as f:
+            self.assertEqual(json.load(f)['last_id'], first.id)
@@ -1,13 +1,16 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import SatelliteImageViewSet, WaterSensorViewSet, HealthReportViewSet, dashboard_stats
+from .views import SatelliteImageViewSet, WaterSensorViewSet, HealthReportViewSet, AnalysisJobViewSet, dashboard_stats, predict_potability, sensor_stream
 
 router = DefaultRouter()
 router.register(r'satellite', SatelliteImageViewSet)
 router.register(r'sensors', WaterSensorViewSet)
 router.register(r'health-reports', HealthReportViewSet)
+router.register(r'jobs', AnalysisJobViewSet)
 
 urlpatterns = [
     path('', include(router.urls)),
     path('dashboard-stats/', dashboard_stats, name='dashboard-stats'),
+    path('predict/', predict_potability, name='predict'),
+    path('stream/sensors/', sensor_stream, name='sensor-stream'),
 ]
@@ -1,5 +1,54 @@
+import io
+import os
+import warnings
+from concurrent.futures import ThreadPoolExecutor
 import cv2
 import numpy as np
+from PIL import Image
+
+# Images above this size are analyzed tile by tile (see analyze_image_tiled)
+TILED_THRESHOLD_PIXELS = 16_000_000
+
+# Encoded images (PNG/JPEG) are decoded at full resolution; above TILED_THRESHOLD_PIXELS
+# they are scored tile by tile, so the decoded BGR array is the only full-size copy.
+# Images past PIL's decompression bomb limit (2 * Image.MAX_IMAGE_PIXELS) are rejected:
+# scenes that big go through analyze_image_tiled as .npy/memmap arrays.
+
+# Threads per analyze_image_tiled call when the caller does not say (None = CPU count).
+# Process-pool workers set it to 1 (see limit_tile_workers), so N processes do not
+# start N * CPU threads.
+_tile_workers = None
+
+def limit_tile_workers(workers=1):
+    """
+    ProcessPoolExecutor initializer for pools that run the analyzers.
+    """
+    global _tile_workers
+    _tile_workers = workers
+
+def _decode(data, source="image bytes"):
+    """
+    Decodes an encoded image to BGR at full resolution.
+    Raises ValueError if it cannot be decoded or is too large (see above).
+    """
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    try:
+        # Header only: PIL does not decode pixels on open
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', Image.DecompressionBombWarning)
+            Image.open(io.BytesIO(buffer)).close()
+    except Image.DecompressionBombError as e:
+        raise ValueError(f"{source} is too large to decode ({e}); convert it to a .npy array for analyze_image_tiled")
+    except Exception:
+        pass  # Unknown to PIL; let OpenCV try
+    img = cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError(f"Could not decode {source}")
+    return img
+
+def _read(image_path):
+    with open(image_path, 'rb') as f:
+        return _decode(f.read(), f"image {image_path}")
 
 def analyze_water_image(image_path):
     """
@@ -12,42 +61,114 @@ def analyze_water_image(image_path):
         }
     """
     try:
-        img = cv2.imread(image_path)
-        if img is None:
-            return {'chlorophyll_index': 0, 'turbidity_index': 0, 'risk_score': 0}
-        
-        # Convert to HSV
-        hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
-        total_pixels = img.shape[0] * img.shape[1]
-
-        # 1. Chlorophyll (Green Algae) Detection
-        # Green hue range in HSV: approx 35-85
-        lower_green = np.array([35, 40, 40])
-        upper_green = np.array([85, 255, 255])
-        green_mask = cv2.inRange(hsv, lower_green, upper_green)
-        green_pixels = cv2.countNonZero(green_mask)
-        chlorophyll_index = (green_pixels / total_pixels) * 100
-
-        # 2. Turbidity (Brown/Muddy) Detection
-        # Brown/Yellow hue range: approx 10-30
-        lower_brown = np.array([10, 40, 40])
-        upper_brown = np.array([30, 255, 255])
-        brown_mask = cv2.inRange(hsv, lower_brown, upper_brown)
-        brown_pixels = cv2.countNonZero(brown_mask)
-        turbidity_index = (brown_pixels / total_pixels) * 100
-
-        # 3. Calculate Risk Score
-        # Weighted sum: Turbidity is often more critical for pathogens, but Algae is toxic.
-        # Let's say: 60% Turbidity + 40% Chlorophyll
-        base_risk = (turbidity_index * 1.5) + (chlorophyll_index * 1.2)
-        risk_score = min(max(base_risk, 0), 100) # Clamp between 0-100
-
-        return {
-            'chlorophyll_index': round(chlorophyll_index, 2),
-            'turbidity_index': round(turbidity_index, 2),
-            'risk_score': round(risk_score, 2)
-        }
-
+        return _analyze_bgr(_read(image_path))
     except Exception as e:
         print(f"Error analyzing image: {e}")
         return {'chlorophyll_index': 0, 'turbidity_index': 0, 'risk_score': 0}
+
+def analyze_image_bytes(data):
+    """
+    Analyzes an encoded image (PNG/JPEG bytes or any buffer) without touching disk.
+    Raises ValueError if the bytes cannot be decoded or are too large (see _decode).
+    """
+    return _analyze_bgr(_decode(data))
+
+def analyze_image_array(img, color_order='bgr'):
+    """
+    Analyzes an in-memory HxWx3 uint8 array. Pass color_order='rgb' for arrays
+    built with PIL/NumPy (e.g. the simulated Sentinel scene) to skip a copy.
+    """
+    if img.ndim != 3 or img.shape[2] != 3:
+        raise ValueError(f"Expected an HxWx3 image array, got shape {img.shape}")
+    return _analyze_bgr(img, cv2.COLOR_RGB2HSV if color_order == 'rgb' else cv2.COLOR_BGR2HSV)
+
+def analyze_image_tiled(source, tile_size=1024, workers=None, grid=False, color_order='bgr'):
+    """
+    Analyzes a large scene tile by tile across a thread pool (OpenCV releases the GIL).
+    Green/brown pixel counts are summed per tile, so the scores match analyze_image_array
+    exactly. Memory stays bounded by workers * tile_size^2 when `source` is a np.memmap
+    or a path to a .npy file (opened with mmap_mode='r'); other image paths are decoded
+    whole. workers defaults to the CPU count, or to 1 inside pools set up with
+    limit_tile_workers.
+    Returns:
+        dict: the usual scores, plus 'grid' (rows x cols of per-tile risk scores)
+              and 'tile_size' when grid=True
+    """
+    if isinstance(source, (str, os.PathLike)):
+        if str(source).endswith('.npy'):
+            img = np.load(source, mmap_mode='r')
+        else:
+            img = _read(source)
+            color_order = 'bgr'
+    else:
+        img = source
+    if img.ndim != 3 or img.shape[2] != 3:
+        raise ValueError(f"Expected an HxWx3 image array, got shape {img.shape}")
+
+    conversion = cv2.COLOR_RGB2HSV if color_order == 'rgb' else cv2.COLOR_BGR2HSV
+    height, width = img.shape[:2]
+    rows = range(0, height, tile_size)
+    cols = range(0, width, tile_size)
+
+    def count_tile(origin):
+        y, x = origin
+        # Slicing a memmap only pages in this tile
+        tile = np.ascontiguousarray(img[y:y + tile_size, x:x + tile_size])
+        return _count_pixels(tile, conversion)
+
+    origins = [(y, x) for y in rows for x in cols]
+    with ThreadPoolExecutor(workers or _tile_workers or os.cpu_count()) as pool:
+        counts = list(pool.map(count_tile, origins))
+
+    green = sum(c[0] for c in counts)
+    brown = sum(c[1] for c in counts)
+    result = _scores(green, brown, height * width)
+    if grid:
+        risks = [_scores(*c)['risk_score'] for c in counts]
+        result['grid'] = [risks[r * len(cols):(r + 1) * len(cols)] for r in range(len(rows))]
+        result['tile_size'] = tile_size
+    return result
+
+def _count_pixels(img, conversion=cv2.COLOR_BGR2HSV):
+    """
+    Returns (green_pixels, brown_pixels, total_pixels) for one image or tile.
+    """
+    # Convert to HSV
+    hsv = cv2.cvtColor(img, conversion)
+    total_pixels = img.shape[0] * img.shape[1]
+
+    # 1. Chlorophyll (Green Algae) Detection
+    # Green hue range in HSV: approx 35-85
+    lower_green = np.array([35, 40, 40])
+    upper_green = np.array([85, 255, 255])
+    green_pixels = cv2.countNonZero(cv2.inRange(hsv, lower_green, upper_green))
+
+    # 2. Turbidity (Brown/Muddy) Detection
+    # Brown/Yellow hue range: approx 10-30
+    lower_brown = np.array([10, 40, 40])
+    upper_brown = np.array([30, 255, 255])
+    brown_pixels = cv2.countNonZero(cv2.inRange(hsv, lower_brown, upper_brown))
+
+    return green_pixels, brown_pixels, total_pixels
+
+def _scores(green_pixels, brown_pixels, total_pixels):
+    chlorophyll_index = (green_pixels / total_pixels) * 100
+    turbidity_index = (brown_pixels / total_pixels) * 100
+
+    # 3. Calculate Risk Score
+    # Weighted sum: Turbidity is often more critical for pathogens, but Algae is toxic.
+    # Let's say: 60% Turbidity + 40% Chlorophyll
+    base_risk = (turbidity_index * 1.5) + (chlorophyll_index * 1.2)
+    risk_score = min(max(base_risk, 0), 100) # Clamp between 0-100
+
+    return {
+        'chlorophyll_index': round(chlorophyll_index, 2),
+        'turbidity_index': round(turbidity_index, 2),
+        'risk_score': round(risk_score, 2)
+    }
+
+def _analyze_bgr(img, conversion=cv2.COLOR_BGR2HSV):
+    if img.shape[0] * img.shape[1] > TILED_THRESHOLD_PIXELS:
+        # Avoid a full-size HSV copy (and use every core) for big scenes
+        return analyze_image_tiled(img, color_order='rgb' if conversion == cv2.COLOR_RGB2HSV else 'bgr')
+    return _scores(*_count_pixels(img, conversion))
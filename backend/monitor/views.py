@@ -1,17 +1,89 @@
 from rest_framework import viewsets, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from rest_framework.parsers import MultiPartParser, FormParser
-from .models import SatelliteImage, WaterSensor, HealthReport
-from .serializers import SatelliteImageSerializer, WaterSensorSerializer, HealthReportSerializer
-from .utils import analyze_water_image
-from .sentinel_service import SentinelService
+from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
+from rest_framework.exceptions import ValidationError
+from django.utils.dateparse import parse_datetime
+from .models import SatelliteImage, WaterSensor, HealthReport, AnalysisJob
+from .serializers import SatelliteImageSerializer, WaterSensorSerializer, HealthReportSerializer, AnalysisJobSerializer
+from .jobs import enqueue_analysis, enqueue_sentinel_fetch, enqueue_sweep
+from . import clusters, spatial, sweep
+from .parsers import NDJSONParser
+from .ingest import ingest_readings, MAX_BULK_ITEMS
+from .pagination import TimeSeriesCursorPagination
+from .downsampling import BUCKETS, MAX_BUCKETS, bucket_count, bucketed_history
+from django.conf import settings
+from django.utils import timezone
+from datetime import timedelta
 import os
 
-class SatelliteImageViewSet(viewsets.ModelViewSet):
+class TimeSeriesFilterMixin:
+    """
+    Cursor-paginated list endpoints with a `since=<ISO timestamp>` filter,
+    so polling clients only fetch rows newer than the last one they saw.
+    """
+    pagination_class = TimeSeriesCursorPagination
+    time_field = None
+
+    @property
+    def ordering(self):
+        return f"-{self.time_field}"
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action != 'list':
+            return queryset
+
+        since = self._parse_time_param('since')
+        if since:
+            queryset = queryset.filter(**{f"{self.time_field}__gt": since})
+        return queryset
+
+    def _parse_time_param(self, name):
+        value = self.request.query_params.get(name)
+        if not value:
+            return None
+        parsed = parse_datetime(value.replace(' ', '+'))
+        if parsed is None:
+            raise ValidationError({name: "Expected an ISO 8601 timestamp"})
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        return parsed
+
+# Caps for the spatial endpoints
+MAX_RADIUS_KM = 500
+DEFAULT_GEO_LIMIT = 500
+MAX_GEO_LIMIT = spatial.MAX_RESULTS
+
+def _float_param(request, name, low, high):
+    value = request.query_params.get(name)
+    if value is None:
+        raise ValueError(f"{name} is required")
+    try:
+        value = float(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a number")
+    if not low <= value <= high:
+        raise ValueError(f"{name} must be between {low} and {high}")
+    return value
+
+def _int_param(request, name, default, low, high):
+    value = request.query_params.get(name)
+    if value is None:
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer")
+    if not low <= value <= high:
+        raise ValueError(f"{name} must be between {low} and {high}")
+    return value
+
+class SatelliteImageViewSet(TimeSeriesFilterMixin, viewsets.ModelViewSet):
     queryset = SatelliteImage.objects.all().order_by('-captured_at')
     serializer_class = SatelliteImageSerializer
-    parser_classes = (MultiPartParser, FormParser)
+    time_field = 'captured_at'
+    parser_classes = (MultiPartParser, FormParser, JSONParser)
 
     @action(detail=False, methods=['post'])
     def fetch_live(self, request):
@@ -26,99 +98,332 @@ class SatelliteImageViewSet(viewsets.ModelViewSet):
             delta = 0.05
             bbox = [lon - delta, lat - delta, lon + delta, lat + delta]
             
-            instance = SentinelService.fetch_satellite_image(bbox, location_name)
-            
-            if instance:
-                serializer = self.get_serializer(instance)
-                return Response(serializer.data, status=status.HTTP_201_CREATED)
-            else:
-                return Response({"error": "Failed to fetch from Sentinel Hub (Check API Keys)"}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+            # Fetch + analysis run on the analysis worker; the client polls the job
+            job = enqueue_sentinel_fetch(bbox, location_name)
+            return Response(AnalysisJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
         
         return Response({"error": "Latitude and Longitude required"}, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(detail=False, methods=['post'])
+    def sweep(self, request):
+        """
+        Queues a multi-region sweep. Body is either
+        {"regions": [{"name": str, "bbox": [min_lon, min_lat, max_lon, max_lat]}, ...]} or
+        {"polygon": [[lon, lat], ...], "step": degrees, "name": str}; plus optional "concurrency".
+        """
+        try:
+            if not isinstance(request.data, dict):
+                raise ValueError("expected a JSON object")
+            if 'polygon' in request.data:
+                regions = sweep.regions_from_polygon(
+                    request.data['polygon'],
+                    float(request.data.get('step', sweep.DEFAULT_STEP)),
+                    str(request.data.get('name', 'Sweep')),
+                )
+            else:
+                regions = []
+                raw_regions = request.data.get('regions') or []
+                if not isinstance(raw_regions, list):
+                    raise ValueError("'regions' must be a list")
+                for i, region in enumerate(raw_regions):
+                    if not isinstance(region, dict) or not isinstance(region.get('bbox'), list):
+                        raise ValueError(f"region {i + 1} must be an object with a 'bbox' list")
+                    regions.append({'name': str(region.get('name') or f"Region {i + 1}"), 'bbox': sweep.validate_bbox(region['bbox'])})
+            concurrency = int(request.data.get('concurrency', sweep.DEFAULT_CONCURRENCY))
+        except (KeyError, TypeError, ValueError) as e:
+            return Response({"error": f"Invalid sweep request: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not regions:
+            return Response({"error": "Provide 'regions' or a 'polygon' covering at least one tile"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(regions) > sweep.MAX_REGIONS:
+            return Response({"error": f"Sweep covers {len(regions)} regions; the limit is {sweep.MAX_REGIONS}. Use a larger step."}, status=status.HTTP_400_BAD_REQUEST)
+        if not 1 <= concurrency <= sweep.MAX_CONCURRENCY:
+            return Response({"error": f"concurrency must be between 1 and {sweep.MAX_CONCURRENCY}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        job = enqueue_sweep(regions, concurrency)
+        return Response(AnalysisJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=['get'], url_path='nearby-reports')
+    def nearby_reports(self, request, pk=None):
+        """
+        Health reports inside this scan's bbox (grown by radius_km) filed within +/- days of it.
+        """
+        image = self.get_object()
+        if image.bbox is None:
+            return Response({"error": "This image has no bbox (manual upload)"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            radius_km = _float_param(request, 'radius_km', 0, MAX_RADIUS_KM) if 'radius_km' in request.query_params else 0
+            days = _int_param(request, 'days', 7, 0, 365)
+            limit = _int_param(request, 'limit', DEFAULT_GEO_LIMIT, 1, MAX_GEO_LIMIT)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        window = timedelta(days=days)
+        reports = spatial.reports_in_bbox(
+            spatial.expand_bbox(image.bbox, radius_km),
+            HealthReport.objects.filter(submitted_at__gte=image.captured_at - window, submitted_at__lte=image.captured_at + window),
+        ).order_by('-submitted_at')[:limit]
+        data = HealthReportSerializer(reports, many=True).data
+        return Response({"bbox": image.bbox, "count": len(data), "results": data})
+
+    @action(detail=False, methods=['get'])
+    def correlation(self, request):
+        """
+        Newest scans with a bbox, each with the number and worst severity of health
+        reports filed inside it within +/- days. Query params: days (default 7), limit.
+        """
+        try:
+            days = _int_param(request, 'days', 7, 0, 365)
+            limit = _int_param(request, 'limit', 50, 1, 500)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        scans = spatial.correlate_scans(SatelliteImage.objects.order_by('-captured_at'), days)[:limit]
+        return Response([{
+            "satellite_image": scan.id,
+            "location_name": scan.location_name,
+            "captured_at": scan.captured_at,
+            "bbox": scan.bbox,
+            "risk_score": scan.risk_score,
+            "report_count": scan.report_count,
+            "max_severity": scan.max_severity,
+        } for scan in scans])
+
     def create(self, request, *args, **kwargs):
-        # Intercept creation to perform OpenCV analysis
+        # Store the upload now; OpenCV analysis runs on the analysis worker
         file_serializer = self.get_serializer(data=request.data)
         if file_serializer.is_valid():
             instance = file_serializer.save()
-            
-            # Perform Analysis
-            image_path = instance.image.path
-            analysis_results = analyze_water_image(image_path)
-            
-            # Update instance with results
-            instance.chlorophyll_index = analysis_results['chlorophyll_index']
-            instance.turbidity_index = analysis_results['turbidity_index']
-            instance.risk_score = analysis_results['risk_score']
-            instance.save()
-            
-            # Return updated data
-            return Response(self.get_serializer(instance).data, status=status.HTTP_201_CREATED)
+            job = enqueue_analysis(instance)
+            return Response(AnalysisJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
         else:
             return Response(file_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-class WaterSensorViewSet(viewsets.ModelViewSet):
+class AnalysisJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Status of queued satellite analysis jobs (poll until status is 'done' or 'failed').
+    """
+    queryset = AnalysisJob.objects.all().order_by('-created_at')
+    serializer_class = AnalysisJobSerializer
+
+class WaterSensorViewSet(TimeSeriesFilterMixin, viewsets.ModelViewSet):
     queryset = WaterSensor.objects.all().order_by('-timestamp')
     serializer_class = WaterSensorSerializer
+    time_field = 'timestamp'
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        sensor_id = self.request.query_params.get('sensor_id')
+        if sensor_id and self.action == 'list':
+            queryset = queryset.filter(sensor_id=sensor_id)
+        return queryset
+
+    @action(detail=False, methods=['post'], parser_classes=[JSONParser, NDJSONParser])
+    def bulk(self, request):
+        """
+        Ingests many readings at once. Accepts a JSON array or an NDJSON body.
+        Valid readings are stored in one transaction; invalid ones are reported by index.
+        """
+        items = request.data
+        if isinstance(items, dict):
+            items = [items]
+        if not isinstance(items, list):
+            return Response({"error": "Expected a JSON array or NDJSON body"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > MAX_BULK_ITEMS:
+            return Response({"error": f"At most {MAX_BULK_ITEMS} readings per request"}, status=status.HTTP_400_BAD_REQUEST)
+
+        created, errors = ingest_readings(items)
+        response_status = status.HTTP_201_CREATED if created or not errors else status.HTTP_400_BAD_REQUEST
+        return Response({
+            "created": len(created),
+            "ids": [reading.id for reading in created],
+            "errors": errors,
+        }, status=response_status)
+
+    @action(detail=False, methods=['get'])
+    def history(self, request):
+        """
+        Downsampled history: per-sensor min/max/mean/count per bucket, computed in the database.
+        Query params: bucket=1m|1h|1d (default 1h), start, end (ISO timestamps), sensor_id.
+        """
+        bucket = request.query_params.get('bucket', '1h')
+        if bucket not in BUCKETS:
+            return Response({"error": f"bucket must be one of {', '.join(BUCKETS)}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        end = self._parse_time_param('end') or timezone.now()
+        start = self._parse_time_param('start') or end - timedelta(days=1)
+        if start >= end:
+            return Response({"error": "start must be before end"}, status=status.HTTP_400_BAD_REQUEST)
+        if bucket_count(bucket, start, end) > MAX_BUCKETS:
+            return Response({"error": f"Range too large for {bucket} buckets (max {MAX_BUCKETS}); use a coarser bucket"}, status=status.HTTP_400_BAD_REQUEST)
+
+        series = bucketed_history(bucket, start, end, request.query_params.get('sensor_id'))
+        return Response({
+            "bucket": bucket,
+            "start": start,
+            "end": end,
+            "series": series,
+        })
 
 from .email_service import send_alert_email
 
-class HealthReportViewSet(viewsets.ModelViewSet):
+class HealthReportViewSet(TimeSeriesFilterMixin, viewsets.ModelViewSet):
     queryset = HealthReport.objects.all().order_by('-submitted_at')
     serializer_class = HealthReportSerializer
+    time_field = 'submitted_at'
 
     def perform_create(self, serializer):
         instance = serializer.save()
         # Trigger email alert if severity is high
         send_alert_email(instance)
 
+    def _spatial_base(self):
+        # since= applies here too; ordering/pagination do not (results are capped by limit=)
+        queryset = HealthReport.objects.all()
+        since = self._parse_time_param('since')
+        if since:
+            queryset = queryset.filter(submitted_at__gt=since)
+        return queryset, _int_param(self.request, 'limit', DEFAULT_GEO_LIMIT, 1, MAX_GEO_LIMIT)
+
+    @action(detail=False, methods=['get'])
+    def within(self, request):
+        """
+        Reports within radius_km of a point, nearest first.
+        Query params: lat, lon, radius_km (max 500), since, limit.
+        """
+        try:
+            lat = _float_param(request, 'lat', -90, 90)
+            lon = _float_param(request, 'lon', -180, 180)
+            radius_km = _float_param(request, 'radius_km', 0, MAX_RADIUS_KM)
+            queryset, limit = self._spatial_base()
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        matches = spatial.reports_within(lat, lon, radius_km, queryset, limit)
+        data = HealthReportSerializer([report for report, _ in matches], many=True).data
+        for item, (_, distance) in zip(data, matches):
+            item['distance_km'] = round(distance, 3)
+        return Response({"count": len(data), "results": data})
+
+    @action(detail=False, methods=['get'], url_path='in-bbox')
+    def in_bbox(self, request):
+        """
+        Reports inside bbox=min_lon,min_lat,max_lon,max_lat, newest first.
+        Query params: bbox, since, limit.
+        """
+        try:
+            bbox = sweep.validate_bbox(request.query_params.get('bbox', '').split(','))
+            queryset, limit = self._spatial_base()
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        reports = spatial.reports_in_bbox(bbox, queryset).order_by('-submitted_at')[:limit]
+        data = HealthReportSerializer(reports, many=True).data
+        return Response({"count": len(data), "results": data})
+
+    @action(detail=False, methods=['get'])
+    def clusters(self, request):
+        """
+        Current outbreak clusters (see monitor.clusters), strongest first.
+        Query params: window_hours (default settings.MONITOR_CLUSTERS), symptom_type.
+        """
+        try:
+            window_hours = _int_param(request, 'window_hours', None, 1, 24 * 7)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        symptom_type = request.query_params.get('symptom_type')
+        if symptom_type and symptom_type not in dict(HealthReport.SYMPTOM_TYPES):
+            return Response({"error": f"symptom_type must be one of {', '.join(dict(HealthReport.SYMPTOM_TYPES))}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        found = clusters.hot_clusters(window_hours=window_hours, symptom_type=symptom_type)
+        return Response({"count": len(found), "clusters": found})
+
 from rest_framework.decorators import api_view
-from django.db.models import Avg
+from . import rollups
 
 @api_view(['GET'])
 def dashboard_stats(request):
     """
     Aggregates data from all layers to provide a system overview.
+    Served from the incrementally maintained rollup (see monitor.rollups).
     """
-    # 1. Satellite Risk
-    recent_sat = SatelliteImage.objects.order_by('-captured_at').first()
-    sat_risk = recent_sat.risk_score if recent_sat else 0
-    
-    # 2. Sensor Risk (Check last 10 readings for any critical status)
-    recent_sensors = WaterSensor.objects.order_by('-timestamp')[:10]
-    sensor_issues = 0
-    if recent_sensors:
-        for s in recent_sensors:
-            if s.ph < 6.5 or s.ph > 8.5 or s.turbidity > 5.0:
-                sensor_issues += 1
-    
-    # 3. Health Risk (Check reports from last 24h - simplified to last 10 for demo)
-    recent_reports = HealthReport.objects.order_by('-submitted_at')[:10]
-    health_issues = 0
-    if recent_reports:
-        for h in recent_reports:
-            if h.severity > 5:
-                health_issues += 1
-
-    # Determine Overall Status
-    overall_status = "LOW"
-    status_color = "text-green-400"
-    status_message = "Systems Nominal"
-
-    if sat_risk > 70 or sensor_issues > 2 or health_issues > 2:
-        overall_status = "CRITICAL"
-        status_color = "text-red-500"
-        status_message = "Immediate Action Required"
-    elif sat_risk > 40 or sensor_issues > 0 or health_issues > 0:
-        overall_status = "MODERATE"
-        status_color = "text-yellow-400"
-        status_message = "Elevated Risk Detected"
-
-    return Response({
-        "overallRisk": overall_status,
-        "statusMessage": status_message,
-        "statusColor": status_color,
-        "satelliteAlerts": 1 if sat_risk > 50 else 0,
-        "sensorAnomalies": sensor_issues,
-        "healthReports": HealthReport.objects.count()
-    })
+    return Response(rollups.dashboard_payload(rollups.snapshot(), clusters.hot_cluster_count()))
+
+from aquasentry_ml import predict as ml_predict
+from aquasentry_ml.artifacts import ArtifactNotFound
+from aquasentry_ml.cache import prediction_cache
+from . import potability
+
+@api_view(['GET', 'POST'])
+def predict_potability(request):
+    """
+    Scores water samples with the potability model.
+    Body: one sample {"ph": 7.1, "Turbidity": 3.2, ...} or a list of them (or
+    {"samples": [...]}). Missing or null features are estimated from the supplied
+    ones (aquasentry_ml.imputation); confidence is reduced by what they cost ("reliability").
+    Repeated samples are answered from the prediction cache; the rest of the batch
+    is scored with a single model call. GET returns the cache statistics.
+    """
+    if request.method == 'GET':
+        return Response({"cache": prediction_cache.stats()})
+
+    samples = request.data
+    if isinstance(samples, dict) and 'samples' in samples:
+        samples = samples['samples']
+    single = isinstance(samples, dict)
+    if single:
+        samples = [samples]
+    if not isinstance(samples, list) or not samples:
+        return Response({"error": "Expected a sample object or a non-empty list of samples"}, status=status.HTTP_400_BAD_REQUEST)
+    max_batch = settings.POTABILITY_MODEL['MAX_BATCH']
+    if len(samples) > max_batch:
+        return Response({"error": f"At most {max_batch} samples per request"}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        artifact = potability.get_artifact()
+    except ArtifactNotFound as e:
+        return Response({"error": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    try:
+        X = ml_predict.to_matrix(samples, artifact.features)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    scored = ml_predict.predict(artifact, X, cache=prediction_cache)
+    results = []
+    for i in range(len(samples)):
+        results.append({
+            "potable": bool(scored['labels'][i] == 1),
+            "probability": round(float(scored['probabilities'][i]), 4),
+            "confidence": round(float(scored['confidence'][i]), 4),
+            "reliability": round(float(scored['reliability'][i]), 4),
+            "imputed": [name for name, known in zip(artifact.features, scored['known'][i]) if not known],
+            "reasons": [
+                " ".join(ml_predict.format_reason(j, X[i, artifact.features.index(ml_predict.REASON_RULES[j][0])]))
+                for j in scored['reasons'][i].nonzero()[0]
+            ],
+        })
+
+    if single:
+        return Response({"model_version": artifact.version, **results[0]})
+    return Response({"model_version": artifact.version, "count": len(results), "results": results})
+
+from django.http import StreamingHttpResponse, JsonResponse
+from .stream import hub
+
+async def sensor_stream(request):
+    """
+    Server-Sent Events stream of new sensor readings ('reading' events) and
+    dashboard status changes ('dashboard' events). Needs an ASGI server.
+    Reconnecting clients resume via the Last-Event-ID header or ?last_id=.
+    """
+    last_id = request.headers.get('Last-Event-ID') or request.GET.get('last_id')
+    if last_id is not None:
+        try:
+            last_id = int(last_id)
+        except ValueError:
+            return JsonResponse({"error": "last_id must be an integer"}, status=400)
+
+    response = StreamingHttpResponse(hub.subscribe(last_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Disable proxy buffering (nginx)
+    return response